@@ -2,6 +2,20 @@ from datetime import datetime
 from typing import Optional
 
 class AccessLog:
+    __slots__ = (
+        "_source_ip",
+        "_date",
+        "_first_line_of_request",
+        "_http_status_code",
+        "_bytes_received",
+        "_bytes_sent",
+        "_user_agent",
+        "_timestamp",
+        "_ua_category",
+        "_weight",
+        "_vhost",
+    )
+
     def __init__(
         self,
         source_ip: str,
@@ -12,6 +26,9 @@ class AccessLog:
         bytes_sent: int,
         user_agent: str,
         timestamp: Optional[datetime] = None,
+        ua_category: Optional[str] = None,
+        weight: float = 1,
+        vhost: Optional[str] = None,
     ):
         self._source_ip = source_ip
         self._date = date
@@ -21,6 +38,9 @@ class AccessLog:
         self._bytes_sent = bytes_sent
         self._user_agent = user_agent
         self._timestamp = timestamp
+        self._ua_category = ua_category
+        self._weight = weight
+        self._vhost = vhost
 
     @property
     def source_ip(self):
@@ -52,3 +72,15 @@ class AccessLog:
     @property
     def timestamp(self):
         return self._timestamp
+
+    @property
+    def ua_category(self):
+        return self._ua_category
+
+    @property
+    def weight(self):
+        return self._weight
+
+    @property
+    def vhost(self):
+        return self._vhost
@@ -1,45 +1,178 @@
+import glob
+import mmap
 import os
+import random
 import re
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
+from heapq import merge
+from operator import attrgetter
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
 from AccessLog import AccessLog
+from LogFormats import FIELDS, FORMATS, LogFormat, detect_format, DEFAULT_FORMAT
+from LogWindow import LogWindow
+from UserAgentClassifier import UserAgentClassifier, load_signatures
+from TimeIndex import TimeIndex, minute_of
+from Checkpoint import encode_column, decode_column, pack_numbers, unpack_numbers
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+_by_timestamp = attrgetter("timestamp")
 
 
 class LogReader:
 
     LOG_DIR = "/var/log/apache2/"
     LOG_FILE_TEMPLATE = "access_log-%Y-%m-%d"
+    # minute index sidecars live with the analyzer's state, not next to the logs
+    INDEX_DIR = "analyzer-index"
+
+    DETECT_LINES = 20
+    # lines are logged when a request completes, so a range query reads this far past its end
+    INDEX_SLACK_MINUTES = 2
+    MAX_READ_WORKERS = 8
 
-    LOG_PATTERN = re.compile(
-        r'(?P<ip>\S+)\s+'
-        r'"(?P<datetime>[^"]+)"\s+'
-        r'"(?P<request>[^"]+)"\s+'
-        r'(?P<status>\d+)\s+'
-        r'(?P<bytes_received>\d+)\s+'
-        r'(?P<bytes_sent>\d+)\s+'
-        r'"(?P<user_agent>[^"]+)"'
-    )
-
-    def __init__(self, log_dir: Optional[str] = None):
+    def __init__(
+        self,
+        log_dir: Optional[str] = None,
+        ua_classifier: Optional[UserAgentClassifier] = None,
+        log_format: Optional[str] = None,
+        index_dir: Optional[str] = None,
+        sources: Optional[Sequence[str]] = None,
+        ua_signatures: Optional[str] = None,
+    ):
         if log_dir is not None:
             self.LOG_DIR = log_dir
+        if ua_classifier is None:
+            ua_classifier = UserAgentClassifier(load_signatures(ua_signatures) if ua_signatures else None)
+        self.ua_classifier = ua_classifier
+        self._random = random.Random()
+        self.window = LogWindow()
+        self._offsets: Dict[str, int] = {}
+        self.log_format: Optional[LogFormat] = FORMATS[log_format] if log_format else None
+        self._formats: Dict[str, LogFormat] = {}
+        if index_dir is not None:
+            self.INDEX_DIR = index_dir
+        self._indexes: Dict[str, TimeIndex] = {}
+        self._pruned_on = None
+        self._line_format = self.log_format or FORMATS[DEFAULT_FORMAT]
+        self.sources = list(sources) if sources else None
+        self._vhosts: Dict[str, str] = {}
+        self._pool = None
+        self.stats: Dict[str, float] = {
+            "bytes_read": 0,
+            "lines_read": 0,
+            "lines_parsed": 0,
+            "malformed_lines": 0,
+            "dropped_lines": 0,
+            "sampled_out_lines": 0,
+            "read_seconds": 0.0,
+            "parse_seconds": 0.0,
+        }
 
     def _build_log_path(self, date: datetime) -> str:
         filename = date.strftime(self.LOG_FILE_TEMPLATE)
         return os.path.join(self.LOG_DIR, filename)
 
-    def _extract_timestamp(self, raw: str) -> datetime:
-        cleaned = raw[:19]
-        return datetime.strptime(cleaned, "%d-%m-%Y %H:%M:%S")
+    def _source_paths(self, dates: Sequence[datetime]) -> List[str]:
+        if self.sources is None:
+            return [self._build_log_path(date) for date in dates]
+        paths: Dict[str, None] = {}
+        for pattern in self.sources:
+            for date in dates:
+                expanded = date.strftime(pattern) if "%" in pattern else pattern
+                for path in sorted(glob.glob(os.path.join(self.LOG_DIR, expanded))):
+                    if not path.endswith(TimeIndex.SUFFIX):
+                        paths[path] = None
+        return list(paths)
+
+    def _vhost_for(self, path: str) -> Optional[str]:
+        if self.sources is None:
+            return None
+        vhost = self._vhosts.get(path)
+        if vhost is None:
+            name = re.sub(r"[-_.]?\d{4}-?\d{2}-?\d{2}$", "", os.path.basename(path))
+            name = re.sub(r"\.log$", "", name)
+            name = re.sub(r"(^|[-_.])access(_log)?($|[-_.])", r"\1", name).strip("-_.")
+            vhost = self._vhosts[path] = name or os.path.basename(os.path.dirname(path))
+        return vhost
+
+    def _format_for(self, path: str) -> LogFormat:
+        if self.log_format is not None:
+            return self.log_format
+        log_format = self._formats.get(path)
+        if log_format is not None:
+            return log_format
+        try:
+            with open(path, "rb") as f:
+                head = [f.readline() for _ in range(self.DETECT_LINES)]
+        except OSError:
+            head = []
+        log_format = detect_format([line for line in head if line.strip()])
+        if log_format is None:
+            return FORMATS[DEFAULT_FORMAT]
+        self._formats[path] = log_format
+        return log_format
 
-    def _read_file(self, path: str) -> List[str]:
+    def _index_for(self, path: str) -> TimeIndex:
+        index = self._indexes.get(path)
+        if index is None:
+            index = self._indexes[path] = TimeIndex.open(path, self.INDEX_DIR)
+        index.validate()
+        return index
+
+    def save_indexes(self):
+        for index in self._indexes.values():
+            index.save(force=True)
+
+    def _read_file(self, path: str) -> bytes:
         if not os.path.isfile(path):
-            return []
-        with open(path, "r", encoding="utf-8") as f:
-            return f.readlines()
+            return b""
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _read_chunk(path: str, offset: int) -> Tuple[bytes, int]:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return b"", offset
+        if size < offset:
+            offset = 0
+        if size == offset:
+            return b"", offset
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.rfind(b"\n", offset) + 1
+            if not end:
+                return b"", offset
+            return mm[offset:end], end
 
-    def _parse_line(self, line: str):
-        return self.LOG_PATTERN.match(line.strip())
+    def _read_new_bytes(self, paths: Sequence[str]) -> List[bytes]:
+        offsets = [self._offsets.get(path, 0) for path in paths]
+        if len(paths) > 1:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(max_workers=self.MAX_READ_WORKERS, thread_name_prefix="log-reader")
+            chunks = list(self._pool.map(self._read_chunk, paths, offsets))
+        else:
+            chunks = [self._read_chunk(path, offset) for path, offset in zip(paths, offsets)]
+
+        result = []
+        for path, (data, end) in zip(paths, chunks):
+            self._offsets[path] = end
+            self.stats["bytes_read"] += len(data)
+            result.append(data)
+        return result
+
+    def _read_range(self, path: str, begin: int, end: int) -> bytes:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = min(end, len(mm))
+            if end < len(mm):
+                end = mm.rfind(b"\n", begin, end) + 1
+            else:
+                end = mm.rfind(b"\n", begin) + 1
+            return mm[begin:end] if end > begin else b""
 
     def _find_time_window(self, timestamps: List[datetime]) -> Optional[datetime]:
         if not timestamps:
@@ -49,91 +182,318 @@ class LogReader:
 
     def load_logs_for_day(self, date: datetime) -> List[AccessLog]:
         log_path = self._build_log_path(date)
-        lines = self._read_file(log_path)
+        log_format = self._format_for(log_path)
+        lines = self._read_file(log_path).splitlines()
 
         timestamps = []
-        parsed_matches = []
+        parsed_lines = []
 
         for line in lines:
-            match = self._parse_line(line)
-            if not match:
+            parsed = log_format.parse(line)
+            if not parsed:
+                continue
+            try:
+                dt = log_format.decode_time(parsed[1])
+            except (ValueError, KeyError):
                 continue
-            dt = self._extract_timestamp(match.group("datetime"))
             timestamps.append(dt)
-            parsed_matches.append((line, match, dt))
+            parsed_lines.append((parsed, dt))
 
         cutoff = self._find_time_window(timestamps)
         if cutoff is None:
             return []
 
-        result = []
-        for line, match, dt in parsed_matches:
-            if dt < cutoff:
+        return [self._build_log(parsed, dt) for parsed, dt in parsed_lines if dt >= cutoff]
+    
+    def load_logs_for_minutes(
+        self,
+        minutes: int = 15,
+        sample_rate: float = 1.0,
+        exact_ips: Optional[Collection[str]] = None,
+    ) -> LogWindow:
+        now = datetime.now()
+        cutoff = now - timedelta(minutes=minutes)
+        dates_to_check = [now - timedelta(days=1), now]
+        paths = self._source_paths(dates_to_check)
+
+        for cache in (self._offsets, self._formats, self._indexes, self._vhosts):
+            for path in list(cache):
+                if path not in paths:
+                    if cache is self._indexes:
+                        cache[path].save(force=True)
+                    del cache[path]
+        if self._pruned_on != now.date():
+            self._pruned_on = now.date()
+            TimeIndex.prune(self.INDEX_DIR)
+
+        stats = self.stats
+        sampling = sample_rate < 1.0
+        indexes = {}
+        for log_path in paths:
+            if not os.path.isfile(log_path):
+                continue
+            index = indexes[log_path] = self._index_for(log_path)
+            if log_path not in self._offsets and index.minutes:
+                self._offsets[log_path] = index.offset_for(minute_of(cutoff))
+
+        started = time.perf_counter()
+        chunks = self._read_new_bytes(list(indexes))
+        parse_started = time.perf_counter()
+        stats["read_seconds"] += parse_started - started
+
+        # one source goes straight into the window, several are merged by timestamp
+        sources = sum(1 for data in chunks if data)
+        row_lists = []
+        for (log_path, index), data in zip(indexes.items(), chunks):
+            if not data:
                 continue
+            stats["lines_read"] += data.count(b"\n")
+            log_format = self._format_for(log_path)
+            base = self._offsets[log_path] - len(data)
+
+            if sampling:
+                index = None
+            elif index.indexed_to < base:
+                index.build(log_format)
 
-            log = AccessLog(
-                source_ip=match.group("ip"),
-                date=match.group("datetime"),
-                first_line_of_request=match.group("request"),
-                http_status_code=int(match.group("status")),
-                bytes_received=int(match.group("bytes_received")),
-                bytes_sent=int(match.group("bytes_sent")),
-                user_agent=match.group("user_agent"),
+            rows = [] if sources > 1 else None
+            self._parse_into(
+                self.window, data, base, log_format, cutoff, None, sample_rate, exact_ips, index, stats,
+                self._vhost_for(log_path), rows,
             )
-            result.append(log)
+            if rows:
+                row_lists.append(rows)
+            if index is not None:
+                index.covered(base + len(data))
+                index.save()
 
-        return result
-    
-    def load_logs_for_minutes(self, minutes: int = 15) -> List[AccessLog]:
-        now = datetime.now()
-        cutoff = now - timedelta(minutes=minutes)
-        dates_to_check = [now, now - timedelta(days=1)]
-        all_logs = []
-
-        for date in dates_to_check:
-            log_path = self._build_log_path(date)
-            lines = self._read_file(log_path)
-            
-            for line in lines:
-                match = self._parse_line(line)
-                if not match:
+        if row_lists:
+            append = self.window.append
+            for log in merge(*row_lists, key=_by_timestamp):
+                append(log)
+        stats["parse_seconds"] += time.perf_counter() - parse_started
+
+        self.window.expire(cutoff)
+        return self.window
+
+    def _parse_into(
+        self,
+        window: LogWindow,
+        data: bytes,
+        base: int,
+        log_format: LogFormat,
+        start: datetime,
+        end: Optional[datetime],
+        sample_rate: float,
+        exact_ips: Optional[Collection[str]],
+        index: Optional[TimeIndex],
+        stats: Dict[str, float],
+        vhost: Optional[str] = None,
+        rows: Optional[List[AccessLog]] = None,
+    ):
+        sampling = sample_rate < 1.0
+        weight = 1.0 / sample_rate if sampling else 1
+        exact_ips = exact_ips or ()
+        keep = self._random.random
+
+        ips_table = window.ips_table
+        dates_table = window.dates_table
+        requests_table = window.requests_table
+        user_agents_table = window.user_agents_table
+        classify = self.ua_classifier.classify
+        match_line = log_format.match
+        decode_time = log_format.decode_time
+        ip_first = log_format.ip_first
+        append = rows.append if rows is not None else window.append
+        line_vhosts = "vhost" in log_format.fields
+        vhosts: Dict[bytes, str] = {}
+        last_raw_date = None
+        last_dt = None
+        high_water = index.high_water if index is not None else None
+        index_from = index.indexed_to - base if index is not None else 0
+
+        pos = 0
+        size = len(data)
+        while pos < size:
+            nl = data.find(b"\n", pos)
+            if nl < 0:
+                nl = size
+            line_start, pos = pos, nl + 1
+
+            row_weight = 1
+            match = None
+            if sampling:
+                if ip_first:
+                    space = data.find(b" ", line_start, nl)
+                    ip = data[line_start:space if space >= 0 else nl]
+                else:
+                    match = match_line(data, line_start, nl)
+                    ip = match.group("ip") if match else b""
+                if not exact_ips or ip.decode("utf-8", errors="replace") not in exact_ips:
+                    if keep() >= sample_rate:
+                        stats["sampled_out_lines"] += 1
+                        continue
+                    row_weight = weight
+
+            if match is None:
+                match = match_line(data, line_start, nl)
+                if match is None:
+                    stats["malformed_lines"] += 1
                     continue
-                
-                dt = self._extract_timestamp(match.group("datetime"))
-                
-                
-                if dt < cutoff:
+
+            ip, raw_date, request, status, received, sent, user_agent = match.group(*FIELDS)
+            if raw_date != last_raw_date:
+                try:
+                    last_dt = decode_time(raw_date)
+                except (ValueError, KeyError):
+                    stats["malformed_lines"] += 1
                     continue
-                
-                log = AccessLog(
-                    source_ip=match.group("ip"),
-                    date=match.group("datetime"),
-                    first_line_of_request=match.group("request"),
-                    http_status_code=int(match.group("status")),
-                    bytes_received=int(match.group("bytes_received")),
-                    bytes_sent=int(match.group("bytes_sent")),
-                    user_agent=match.group("user_agent"),
-                    timestamp=dt
-                )
-                all_logs.append(log)
-        
-        return all_logs
+                last_raw_date = raw_date
+                if high_water is not None and line_start >= index_from:
+                    minute = minute_of(last_dt)
+                    if minute > high_water:
+                        index.add(minute, base + line_start)
+                        high_water = minute
+            if last_dt < start or (end is not None and last_dt >= end):
+                stats["dropped_lines"] += 1
+                continue
 
-    def parse_log_line(self, line: str) -> Optional[AccessLog]:
-        match = self._parse_line(line)
-        if not match:
-            return None
+            if line_vhosts:
+                raw_vhost = match.group("vhost")
+                vhost = vhosts.get(raw_vhost)
+                if vhost is None:
+                    vhost = vhosts[raw_vhost] = raw_vhost.decode("utf-8", errors="replace")
+
+            user_agent = user_agents_table.intern_bytes(user_agent or b"-")
+            append(AccessLog(
+                source_ip=ips_table.intern_bytes(ip),
+                date=dates_table.intern_bytes(raw_date),
+                first_line_of_request=requests_table.intern_bytes(request),
+                http_status_code=int(status),
+                bytes_received=int(received) if received.isdigit() else 0,
+                bytes_sent=int(sent) if sent.isdigit() else 0,
+                user_agent=user_agent,
+                timestamp=last_dt,
+                ua_category=classify(user_agent),
+                weight=row_weight,
+                vhost=vhost,
+            ))
+            stats["lines_parsed"] += 1
 
-        dt = self._extract_timestamp(match.group("datetime"))
+    def load_logs_between(self, start: datetime, end: datetime) -> LogWindow:
+        window = LogWindow()
+        stats = dict.fromkeys(self.stats, 0)
+        first = minute_of(start)
+        last = minute_of(end) + self.INDEX_SLACK_MINUTES + 1
 
+        days = []
+        day = datetime(start.year, start.month, start.day)
+        while day <= end:
+            days.append(day)
+            day += timedelta(days=1)
+
+        row_lists = []
+        for log_path in self._source_paths(days):
+            if not os.path.isfile(log_path):
+                continue
+            log_format = self._format_for(log_path)
+            index = self._index_for(log_path)
+            index.build(log_format)
+            index.save()
+
+            begin = index.offset_for(first)
+            data = self._read_range(log_path, begin, index.offset_for(last))
+            rows: List[AccessLog] = []
+            self._parse_into(window, data, begin, log_format, start, end, 1.0, None, None, stats, self._vhost_for(log_path), rows)
+            row_lists.append(rows)
+
+        for log in merge(*row_lists, key=_by_timestamp):
+            window.append(log)
+        return window
+
+    def get_state(self) -> Dict[str, Any]:
+        rows = list(self.window)
+        state: Dict[str, Any] = {
+            "offsets": dict(self._offsets),
+            "rows": len(rows),
+            "status": pack_numbers("H", (log.http_status_code for log in rows)),
+            "bytes_received": pack_numbers("q", (log.bytes_received for log in rows)),
+            "bytes_sent": pack_numbers("q", (log.bytes_sent for log in rows)),
+            "timestamps": pack_numbers("d", ((log.timestamp - _EPOCH).total_seconds() for log in rows)),
+            "weights": pack_numbers("d", (log.weight for log in rows)),
+        }
+        for column, attr in (
+            ("ips", "source_ip"),
+            ("dates", "date"),
+            ("requests", "first_line_of_request"),
+            ("user_agents", "user_agent"),
+            ("vhosts", "vhost"),
+        ):
+            state[column] = encode_column([getattr(log, attr) for log in rows])
+        return state
+
+    def restore_state(self, state: Dict[str, Any]):
+        self._offsets = dict(state.get("offsets", {}))
+        self.window.clear()
+
+        window = self.window
+        ips = decode_column(*state["ips"])
+        dates = decode_column(*state["dates"])
+        requests = decode_column(*state["requests"])
+        user_agents = decode_column(*state["user_agents"])
+        status = unpack_numbers("H", state["status"])
+        bytes_received = unpack_numbers("q", state["bytes_received"])
+        bytes_sent = unpack_numbers("q", state["bytes_sent"])
+        timestamps = unpack_numbers("d", state["timestamps"])
+        weights = unpack_numbers("d", state["weights"])
+        vhosts = decode_column(*state["vhosts"]) if "vhosts" in state else [None] * state["rows"]
+
+        for i in range(state["rows"]):
+            user_agent = window.user_agents_table.intern(user_agents[i])
+            weight = weights[i]
+            window.append(AccessLog(
+                source_ip=window.ips_table.intern(ips[i]),
+                date=window.dates_table.intern(dates[i]),
+                first_line_of_request=window.requests_table.intern(requests[i]),
+                http_status_code=status[i],
+                bytes_received=bytes_received[i],
+                bytes_sent=bytes_sent[i],
+                user_agent=user_agent,
+                timestamp=_EPOCH + timedelta(seconds=timestamps[i]),
+                ua_category=self.ua_classifier.classify(user_agent),
+                weight=int(weight) if weight == 1 else weight,
+                vhost=vhosts[i],
+            ))
+
+    def _build_log(self, parsed, dt: datetime, weight: float = 1) -> AccessLog:
+        ip, raw_date, request, status, received, sent, user_agent = parsed
+        user_agent = user_agent.decode("utf-8", errors="replace")
         return AccessLog(
-            source_ip=match.group("ip"),
-            date=match.group("datetime"),
-            first_line_of_request=match.group("request"),
-            http_status_code=int(match.group("status")),
-            bytes_received=int(match.group("bytes_received")),
-            bytes_sent=int(match.group("bytes_sent")),
-            user_agent=match.group("user_agent"),
-            timestamp=dt
+            source_ip=ip.decode("utf-8", errors="replace"),
+            date=raw_date.decode("utf-8", errors="replace"),
+            first_line_of_request=request.decode("utf-8", errors="replace"),
+            http_status_code=status,
+            bytes_received=received,
+            bytes_sent=sent,
+            user_agent=user_agent,
+            timestamp=dt,
+            ua_category=self.ua_classifier.classify(user_agent),
+            weight=weight,
         )
 
+    def parse_log_line(self, line: str) -> Optional[AccessLog]:
+        raw = line.strip().encode("utf-8")
+        parsed = self._line_format.parse(raw)
+        if not parsed and self.log_format is None:
+            log_format = detect_format([raw])
+            if log_format is not None:
+                self._line_format = log_format
+                parsed = log_format.parse(raw)
+        if not parsed:
+            return None
+
+        try:
+            dt = self._line_format.decode_time(parsed[1])
+        except (ValueError, KeyError):
+            return None
+        return self._build_log(parsed, dt)
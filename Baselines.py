@@ -0,0 +1,168 @@
+import math
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from PathClustering import normalize_path
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+GLOBAL_KEY = "*"
+
+
+@lru_cache(maxsize=10000)
+def path_key(request: str) -> Optional[str]:
+    parts = request.split()
+    if len(parts) < 2:
+        return None
+    return normalize_path(parts[1])
+
+
+class EwmaTable:
+
+    MAX_DECAY_STEPS = 120
+
+    def __init__(self, max_keys: int = 10000, alpha: float = 0.1, min_periods: int = 10):
+        self.max_keys = int(max_keys)
+        self.alpha = float(alpha)
+        self.min_periods = int(min_periods)
+        self.evicted = 0
+        # key -> [mean, variance, periods, last_period]
+        self._entries: "OrderedDict[Any, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def _step(self, entry: List[float], value: float):
+        diff = value - entry[0]
+        increment = self.alpha * diff
+        entry[0] += increment
+        entry[1] = (1 - self.alpha) * (entry[1] + diff * increment)
+        entry[2] += 1
+
+    def update(self, key: Any, value: float, period: int) -> Optional[Tuple[float, float, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [float(value), 0.0, 1, period]
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            return None
+
+        self._entries.move_to_end(key)
+        # periods without any traffic count as zeros
+        for _ in range(min(period - entry[3] - 1, self.MAX_DECAY_STEPS)):
+            self._step(entry, 0.0)
+
+        score = None
+        if entry[2] >= self.min_periods:
+            mean = entry[0]
+            std = max(math.sqrt(entry[1]), math.sqrt(max(mean, 0.0)), 1.0)
+            score = ((value - mean) / std, mean, std)
+
+        self._step(entry, value)
+        entry[3] = period
+        return score
+
+    def baseline(self, key: Any) -> Optional[Tuple[float, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[0], math.sqrt(entry[1])
+
+    def get_state(self) -> List[List[Any]]:
+        return [[key] + entry for key, entry in self._entries.items()]
+
+    def restore_state(self, state: List[List[Any]]):
+        self._entries = OrderedDict((row[0], list(row[1:])) for row in state[-self.max_keys:])
+
+
+class BaselineTracker:
+
+    def __init__(
+        self,
+        alpha: float = 0.1,
+        z_threshold: float = 4.0,
+        min_periods: int = 10,
+        min_count: float = 10,
+        max_ips: int = 10000,
+        max_paths: int = 2000,
+    ):
+        self.z_threshold = float(z_threshold)
+        self.min_count = float(min_count)
+        self.tables = {
+            "ips": EwmaTable(max_ips, alpha, min_periods),
+            "paths": EwmaTable(max_paths, alpha, min_periods),
+            "global": EwmaTable(1, alpha, min_periods),
+        }
+        self.anomalies: Dict[str, Dict[str, Dict[str, Any]]] = {kind: {} for kind in self.tables}
+        self._minute: Optional[int] = None
+        self._counts: Dict[str, Dict[str, float]] = {kind: defaultdict(float) for kind in self.tables}
+        self._next_row = 0
+        self._last_timestamp: Optional[datetime] = None
+        self._last_minute = 0
+
+    def _roll(self, minute: int):
+        finished = self._minute
+        for kind, table in self.tables.items():
+            found = self.anomalies[kind]
+            for key, count in self._counts[kind].items():
+                score = table.update(key, count, finished)
+                if score is None:
+                    continue
+                z, mean, std = score
+                if z >= self.z_threshold and count >= self.min_count:
+                    found[key] = {
+                        "minute": finished,
+                        "count": count,
+                        "mean": mean,
+                        "std": std,
+                        "zscore": z,
+                    }
+            self._counts[kind] = defaultdict(float)
+        self._minute = minute
+
+    def observe(self, minute: int, ip: str, path: Optional[str], weight: float = 1):
+        if self._minute is None:
+            self._minute = minute
+        elif minute > self._minute:
+            self._roll(minute)
+        # late rows are counted in the minute that is still open
+        counts = self._counts
+        counts["ips"][ip] += weight
+        counts["global"][GLOBAL_KEY] += weight
+        if path is not None:
+            counts["paths"][path] += weight
+
+    def observe_window(self, window) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        self.anomalies = {kind: {} for kind in self.tables}
+        for log in window.since(self._next_row):
+            timestamp = log.timestamp
+            if timestamp is None:
+                continue
+            if timestamp is not self._last_timestamp:
+                self._last_timestamp = timestamp
+                self._last_minute = int((timestamp - _EPOCH).total_seconds()) // 60
+            self.observe(self._last_minute, log.source_ip, path_key(log.first_line_of_request), log.weight)
+        self._next_row = window.next_id
+        return self.anomalies
+
+    def mark_observed(self, window):
+        self._next_row = window.next_id
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "minute": self._minute,
+            "counts": {kind: dict(counts) for kind, counts in self._counts.items()},
+            "tables": {kind: table.get_state() for kind, table in self.tables.items()},
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        self._minute = state.get("minute")
+        for kind, table in self.tables.items():
+            table.restore_state(state.get("tables", {}).get(kind, []))
+            self._counts[kind] = defaultdict(float, state.get("counts", {}).get(kind, {}))
@@ -0,0 +1,326 @@
+import math
+import time
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Tuple
+from Baselines import path_key
+from Checkpoint import save_checkpoint, load_checkpoint
+from TimeIndex import minute_of
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+KINDS = ("ips", "paths")
+
+
+def key_hashes(key: str) -> Tuple[int, int]:
+    digest = blake2b(key.encode("utf-8", errors="replace"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = float(error_rate)
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(self.error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def contains_hashes(self, h1: int, h2: int) -> bool:
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add_hashes(self, h1: int, h2: int):
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return self.contains_hashes(*key_hashes(key))
+
+    def get_state(self) -> List[Any]:
+        return [self.capacity, self.error_rate, self.count, bytes(self.bits)]
+
+    @classmethod
+    def from_state(cls, state: List[Any]) -> "BloomFilter":
+        capacity, error_rate, count, bits = state
+        bloom = cls(capacity, error_rate)
+        if len(bits) == len(bloom.bits):
+            bloom.bits[:] = bits
+            bloom.count = count
+        return bloom
+
+
+class ScalableBloomFilter:
+
+    def __init__(
+        self,
+        initial_capacity: int = 10000,
+        error_rate: float = 0.001,
+        max_bytes: int = 4 * 1024 * 1024,
+        growth: int = 2,
+        tightening: float = 0.5,
+    ):
+        self.initial_capacity = int(initial_capacity)
+        self.error_rate = float(error_rate)
+        self.max_bytes = int(max_bytes)
+        self.growth = int(growth)
+        self.tightening = float(tightening)
+        self.saturated = False
+        self.filters: List[BloomFilter] = [self._next_filter(0)]
+
+    def _next_filter(self, i: int) -> BloomFilter:
+        # the per-filter error rates form a geometric series that sums to error_rate
+        error = self.error_rate * (1 - self.tightening) * self.tightening ** i
+        return BloomFilter(self.initial_capacity * self.growth ** i, error)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.nbytes for bloom in self.filters)
+
+    @property
+    def count(self) -> int:
+        return sum(bloom.count for bloom in self.filters)
+
+    def contains_hashes(self, h1: int, h2: int) -> bool:
+        for bloom in reversed(self.filters):
+            if bloom.contains_hashes(h1, h2):
+                return True
+        return False
+
+    def add_hashes(self, h1: int, h2: int):
+        current = self.filters[-1]
+        if current.full and not self.saturated:
+            candidate = self._next_filter(len(self.filters))
+            if self.nbytes + candidate.nbytes <= self.max_bytes:
+                current = candidate
+                self.filters.append(candidate)
+            else:
+                # out of budget: keep filling the last filter and accept a higher error rate
+                self.saturated = True
+        current.add_hashes(h1, h2)
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"saturated": self.saturated, "filters": [bloom.get_state() for bloom in self.filters]}
+
+    def restore_state(self, state: Dict[str, Any]):
+        filters = [BloomFilter.from_state(bloom) for bloom in state.get("filters", [])]
+        if filters:
+            self.filters = filters
+            self.saturated = state.get("saturated", False)
+
+
+class RotatingBloomFilter:
+
+    def __init__(
+        self,
+        generations: int = 30,
+        initial_capacity: int = 10000,
+        error_rate: float = 0.001,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.generations = max(1, int(generations))
+        self.initial_capacity = int(initial_capacity)
+        self.error_rate = float(error_rate)
+        self.max_bytes = int(max_bytes)
+        self._days: Dict[int, ScalableBloomFilter] = {}
+
+    def _generation(self, day: int) -> ScalableBloomFilter:
+        bloom = self._days.get(day)
+        if bloom is None:
+            bloom = self._days[day] = ScalableBloomFilter(
+                self.initial_capacity,
+                self.error_rate,
+                self.max_bytes // self.generations,
+            )
+            for old in sorted(self._days)[:-self.generations]:
+                del self._days[old]
+        return bloom
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.nbytes for bloom in self._days.values())
+
+    @property
+    def saturated(self) -> bool:
+        return any(bloom.saturated for bloom in self._days.values())
+
+    def add(self, key: str, day: int) -> bool:
+        h1, h2 = key_hashes(key)
+        current = self._generation(day)
+        if current.contains_hashes(h1, h2):
+            return False
+        current.add_hashes(h1, h2)
+        for generation, bloom in self._days.items():
+            if generation != day and generation > day - self.generations and bloom.contains_hashes(h1, h2):
+                return False
+        return True
+
+    def get_state(self) -> Dict[int, Dict[str, Any]]:
+        return {day: bloom.get_state() for day, bloom in self._days.items()}
+
+    def restore_state(self, state: Dict[int, Dict[str, Any]]):
+        self._days = {}
+        for day in sorted(state)[-self.generations:]:
+            self._generation(day).restore_state(state[day])
+
+
+class FirstSeenTracker:
+
+    # until the filters hold a full generation of traffic every key looks new
+    WARMUP_MINUTES = 1440
+    # the filters are large, so they are written when a generation rotates rather than every checkpoint
+    SAVE_INTERVAL = 3600
+
+    def __init__(
+        self,
+        path: Optional[str] = "first-seen.bloom",
+        days: int = 30,
+        initial_capacity: int = 10000,
+        error_rate: float = 0.001,
+        max_bytes: int = 32 * 1024 * 1024,
+        retain_minutes: int = 60,
+    ):
+        self.path = path
+        self.retain_minutes = int(retain_minutes)
+        self.filters = {
+            kind: RotatingBloomFilter(days, initial_capacity, error_rate, max_bytes // len(KINDS))
+            for kind in KINDS
+        }
+        self.new: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+        self.per_minute: Dict[int, List[int]] = {}
+        self._next_row = 0
+        self._last_timestamp: Optional[datetime] = None
+        self._last_minute = 0
+        self._known: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+        self.started: Optional[int] = None
+        self.newest: Optional[int] = None
+        self._dirty = False
+        self._saved_at: Optional[float] = None
+        self._saved_day: Optional[int] = None
+
+    @property
+    def warming_up(self) -> bool:
+        return self.started is None or self.newest - self.started < self.WARMUP_MINUTES
+
+    def _observe(self, kind: str, key: str, minute: int, record: bool) -> bool:
+        # keys already checked today skip the hashing
+        known = self._known[kind]
+        day = minute // 1440
+        if known.get(key) == day:
+            return False
+        known[key] = day
+        if len(known) > 100_000:
+            known.clear()
+        if not self.filters[kind].add(key, day) or not record:
+            return False
+        self.new[kind][key] = minute
+        counts = self.per_minute.get(minute)
+        if counts is None:
+            counts = self.per_minute[minute] = [0, 0]
+        counts[KINDS.index(kind)] += 1
+        return True
+
+    def observe_window(self, window) -> Dict[int, List[int]]:
+        newest = None
+        record = self.started is not None and self._last_minute - self.started >= self.WARMUP_MINUTES
+        for log in window.since(self._next_row):
+            timestamp = log.timestamp
+            if timestamp is None:
+                continue
+            if timestamp is not self._last_timestamp:
+                self._last_timestamp = timestamp
+                self._last_minute = minute_of(timestamp)
+                if self.started is None:
+                    self.started = self._last_minute
+                record = self._last_minute - self.started >= self.WARMUP_MINUTES
+            minute = newest = self._last_minute
+            self._observe("ips", log.source_ip, minute, record)
+            path = path_key(log.first_line_of_request)
+            if path is not None:
+                self._observe("paths", path, minute, record)
+            self._dirty = True
+        self._next_row = window.next_id
+        if newest is not None and (self.newest is None or newest > self.newest):
+            self.newest = newest
+
+        if newest is not None:
+            cutoff = newest - self.retain_minutes
+            for kind in KINDS:
+                self.new[kind] = {key: minute for key, minute in self.new[kind].items() if minute >= cutoff}
+            self.per_minute = {minute: counts for minute, counts in self.per_minute.items() if minute >= cutoff}
+        return self.per_minute
+
+    def mark_observed(self, window):
+        self._next_row = window.next_id
+
+    def first_seen(self, kind: str, key: str) -> Optional[datetime]:
+        minute = self.new[kind].get(key)
+        return None if minute is None else _EPOCH + timedelta(minutes=minute)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "new_ips": len(self.new["ips"]),
+            "new_paths": len(self.new["paths"]),
+            "per_minute": [
+                (_EPOCH + timedelta(minutes=minute), ips, paths)
+                for minute, (ips, paths) in sorted(self.per_minute.items())
+            ],
+            "memory_bytes": sum(bloom.nbytes for bloom in self.filters.values()),
+            "saturated": any(bloom.saturated for bloom in self.filters.values()),
+            "warming_up": self.warming_up,
+            "warm_at": None if self.started is None else _EPOCH + timedelta(minutes=self.started + self.WARMUP_MINUTES),
+        }
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "filters": {kind: bloom.get_state() for kind, bloom in self.filters.items()},
+            "new": self.new,
+            "per_minute": self.per_minute,
+            "started": self.started,
+            "newest": self.newest,
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        for kind, bloom in self.filters.items():
+            bloom.restore_state(state.get("filters", {}).get(kind, {}))
+            self.new[kind] = dict(state.get("new", {}).get(kind, {}))
+        self.per_minute = {minute: list(counts) for minute, counts in state.get("per_minute", {}).items()}
+        self.started = state.get("started")
+        self.newest = state.get("newest")
+
+    def load(self):
+        state = load_checkpoint(self.path) if self.path else None
+        if state is not None:
+            self.restore_state(state)
+            self._saved_at = time.monotonic()
+            self._saved_day = None if self.newest is None else self.newest // 1440
+
+    def save(self, force: bool = False) -> bool:
+        if not self.path or not self._dirty:
+            return False
+        day = None if self.newest is None else self.newest // 1440
+        due = self._saved_at is None or time.monotonic() - self._saved_at >= self.SAVE_INTERVAL
+        if not (force or due or day != self._saved_day):
+            return False
+        save_checkpoint(self.path, self.get_state())
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._saved_day = day
+        return True
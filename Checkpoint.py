@@ -0,0 +1,84 @@
+import marshal
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MAGIC = b"ALCK"
+VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+
+
+def encode_column(values: Sequence[str]) -> Tuple[List[str], bytes]:
+    symbols: Dict[str, int] = {}
+    codes = array("I")
+    for value in values:
+        code = symbols.get(value)
+        if code is None:
+            code = symbols[value] = len(symbols)
+        codes.append(code)
+    return list(symbols), codes.tobytes()
+
+
+def decode_column(symbols: List[str], raw: bytes) -> List[str]:
+    codes = array("I")
+    codes.frombytes(raw)
+    return [symbols[code] for code in codes]
+
+
+def pack_numbers(typecode: str, values) -> bytes:
+    return array(typecode, values).tobytes()
+
+
+def unpack_numbers(typecode: str, raw: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(raw)
+    return values
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    payload = zlib.compress(marshal.dumps(state), 6)
+    header = _HEADER.pack(MAGIC, VERSION, zlib.crc32(payload))
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, crc = _HEADER.unpack_from(data)
+    payload = data[_HEADER.size:]
+    if magic != MAGIC or version != VERSION or zlib.crc32(payload) != crc:
+        return None
+    try:
+        return marshal.loads(zlib.decompress(payload))
+    except (ValueError, EOFError, TypeError, zlib.error):
+        return None
@@ -1,73 +1,97 @@
-import mimetypes
+import math
 import os
-from collections import defaultdict, Counter
-from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any, Optional, Tuple
-from AccessLogReader import LogReader
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 from AccessLog import AccessLog
+from LogWindow import LogWindow
+from FileTypeClassifier import classify_file_type
+from PathClustering import PathTemplateTrie
+from SampleBuffer import NewestSampleBuffer
+from Baselines import path_key
+from BloomFilter import FirstSeenTracker
 
 class DetectHttpAuthError:
     REPORT_DIR = "/var/www/reports/"
 
-    def __init__(self, log_dir: str = None):
-        self.reader = LogReader(log_dir)
+    def __init__(
+        self,
+        exclude_ua_categories: Optional[List[str]] = None,
+        max_path_templates: int = 1000,
+        sample_size: int = 10,
+        first_seen: Optional[FirstSeenTracker] = None,
+    ):
+        self.exclude_ua_categories = frozenset(exclude_ua_categories or ())
+        self.max_path_templates = int(max_path_templates)
+        self.sample_size = int(sample_size)
+        self.first_seen = first_seen
         os.makedirs(self.REPORT_DIR, exist_ok=True)
 
     def get_file_type(self, path: str) -> str:
-        mime_type, _ = mimetypes.guess_type(path)
-        if mime_type:
-            main_type = mime_type.split('/')[0]
-            if main_type == 'image':
-                return 'image'
-            elif main_type == 'text':
-                return 'text file'
-            elif mime_type == 'application/pdf':
-                return 'pdf'
-            else:
-                return mime_type
-        return 'unknown'
-
-    @staticmethod
-    def _parse_log_date(date_str: str) -> Optional[datetime]:
-        if not date_str:
-            return None
-        raw = date_str[:19]
-        try:
-            return datetime.strptime(raw, "%d-%m-%Y %H:%M:%S")
-        except Exception:
-            return None
+        return classify_file_type(path)
 
     def analyze(self, logs: List["AccessLog"]) -> Dict[str, Any]:
-        errors = [log for log in logs if log.http_status_code in (401, 403)]
+        if isinstance(logs, LogWindow):
+            errors = logs.by_status(401, 403)
+        else:
+            errors = (log for log in logs if log.http_status_code in (401, 403))
+
+        new_paths = None
+        if self.first_seen is not None and isinstance(logs, LogWindow):
+            self.first_seen.observe_window(logs)
+            new_paths = self.first_seen.new["paths"]
+        new_templates = set()
 
-        report_data = []
-        parsed_any = False
+        path_trie = PathTemplateTrie(max_templates=self.max_path_templates)
+        samples = NewestSampleBuffer(self.sample_size)
+        ip_counter = Counter()
+        type_counter = Counter()
+        ua_counter = Counter()
+        category_counter = Counter()
+        vhost_counter = Counter()
+        variance = 0
+        total_errors = 0
+        parsed_errors = 0
+        excluded = 0
         for log in errors:
-            dt = self._parse_log_date(log.date)
+            total_errors += log.weight
+            if self.exclude_ua_categories and log.ua_category in self.exclude_ua_categories:
+                excluded += log.weight
+                continue
+            dt = log.timestamp
             if dt is None:
                 continue
-            parsed_any = True
             request = log.first_line_of_request
             parts = request.split()
             if len(parts) >= 2:
                 path = parts[1]
                 file_type = self.get_file_type(path)
-                report_data.append({
-                    'ip': log.source_ip,
-                    'date': log.date,
-                    'path': path,
-                    'file_type': file_type,
-                    'user_agent': log.user_agent,
-                    'status': log.http_status_code,
-                })
+                weight = log.weight
+                parsed_errors += weight
+                template = path_trie.add(path, log.source_ip, weight)
+                if new_paths and path_key(request) in new_paths:
+                    new_templates.add(template)
+                ip_counter[log.source_ip] += weight
+                type_counter[file_type] += weight
+                ua_counter[log.user_agent] += weight
+                category_counter[log.ua_category or 'unknown'] += weight
+                if log.vhost is not None:
+                    vhost_counter[log.vhost] += weight
+                variance += weight * weight - weight
+                if samples.accepts(dt):
+                    samples.offer(dt, {
+                        'ip': log.source_ip,
+                        'date': log.date,
+                        'timestamp': dt,
+                        'path': path,
+                        'file_type': file_type,
+                        'user_agent': log.user_agent,
+                        'ua_category': log.ua_category or 'unknown',
+                        'vhost': log.vhost,
+                        'status': log.http_status_code,
+                    })
 
-        if not parsed_any:
-            return {"path_freq": [], "ip_freq": [], "type_freq": [], "ua_freq": [], "sample_data": [], "stats": {"total_401_403_errors": 0, "parsed_errors": 0}}
-
-        path_counter = Counter(data['path'] for data in report_data)
-        ip_counter = Counter(data['ip'] for data in report_data)
-        type_counter = Counter(data['file_type'] for data in report_data)
-        ua_counter = Counter(data['user_agent'] for data in report_data)
+        path_templates = path_trie.top(10)
 
         def get_severity_list(counter: Counter) -> List[Dict[str, Any]]:
             most_common = counter.most_common(10)
@@ -80,30 +104,49 @@ class DetectHttpAuthError:
                     severity = max(1, min(5, int(5 * count / max_count)))
                 else:
                     severity = 1
-                severity_list.append({"item": item, "count": count, "severity": severity})
+                severity_list.append({"item": item, "count": round(count), "severity": severity})
             return severity_list
 
-        path_freq = get_severity_list(path_counter)
+        path_freq = get_severity_list(Counter({t["template"]: t["count"] for t in path_templates}))
+        template_ips = {t["template"]: t["unique_ips"] for t in path_templates}
+        for entry in path_freq:
+            entry["unique_ips"] = template_ips[entry["item"]]
         ip_freq = get_severity_list(ip_counter)
         type_freq = get_severity_list(type_counter)
         ua_freq = get_severity_list(ua_counter)
+        category_freq = get_severity_list(category_counter)
+        vhost_freq = get_severity_list(vhost_counter)
 
-        sample_data = sorted(
-            report_data,
-            key=lambda d: self._parse_log_date(d['date']) or datetime.min,
-            reverse=True
-        )[:10]
+        sample_data = samples.items()
 
         stats = {
-            "total_401_403_errors": len(errors),
-            "parsed_errors": len(report_data),
-            "unique_paths": len(path_counter),
+            "total_401_403_errors": round(total_errors),
+            "parsed_errors": round(parsed_errors),
+            "sampling": {
+                "active": variance > 0,
+                "error_bound": round(1.96 * math.sqrt(variance)),
+            },
+            "unique_path_templates": len(path_trie),
+            "evicted_path_templates": path_trie.evicted,
             "unique_ips": len(ip_counter),
             "unique_file_types": len(type_counter),
             "unique_user_agents": len(ua_counter),
+            "unique_vhosts": len(vhost_counter),
+            "excluded_by_ua_category": round(excluded),
         }
 
-        return {"path_freq": path_freq, "ip_freq": ip_freq, "type_freq": type_freq, "ua_freq": ua_freq, "sample_data": sample_data, "stats": stats}
+        if self.first_seen is not None and self.first_seen.warming_up:
+            stats["first_seen_warming_up"] = True
+        elif self.first_seen is not None:
+            new_ips = self.first_seen.new["ips"]
+            for entry in path_freq:
+                entry["new"] = entry["item"] in new_templates
+            for entry in ip_freq:
+                entry["new"] = entry["item"] in new_ips
+            stats["new_ips"] = sum(1 for ip in ip_counter if ip in new_ips)
+            stats["new_path_templates"] = len(new_templates)
+
+        return {"path_freq": path_freq, "ip_freq": ip_freq, "type_freq": type_freq, "ua_freq": ua_freq, "category_freq": category_freq, "vhost_freq": vhost_freq, "sample_data": sample_data, "stats": stats}
 
     def _build_report_path(self) -> str:
         ts = datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -117,6 +160,8 @@ class DetectHttpAuthError:
         ip_freq = analysis.get("ip_freq", [])
         type_freq = analysis.get("type_freq", [])
         ua_freq = analysis.get("ua_freq", [])
+        category_freq = analysis.get("category_freq", [])
+        vhost_freq = analysis.get("vhost_freq", [])
         sample_data = analysis.get("sample_data", [])
         now = datetime.now().astimezone()
         generated_at = now.strftime("%Y-%m-%d %H:%M:%S %Z")
@@ -133,19 +178,33 @@ class DetectHttpAuthError:
             "th{background:#f2f2f2}"
             ".muted{color:#666;font-size:0.9em}"
             ".error-row{background:#fff7f7}"
+            ".sampling{background:#fff3cd;padding:8px}"
             "</style></head><body>"
         )
         html.append(f"<h1>{title}</h1>")
         html.append(f"<p class='muted'>Generated: {generated_at}</p>")
+        sampling = stats.get("sampling", {})
+        if sampling.get("active"):
+            html.append(
+                "<p class='sampling'><strong>Sampling was active:</strong> the analyzer fell behind and parsed a "
+                "sample of the log lines. Counts are scaled-up estimates, accurate to about "
+                f"&plusmn;{sampling.get('error_bound')} errors in total (95%).</p>"
+            )
         html.append("<h2>Summary</h2>")
         html.append("<table>")
         html.append("<tr><th>Metric</th><th>Value</th></tr>")
         html.append(f"<tr><td>Total 401/403 Errors</td><td>{stats.get('total_401_403_errors')}</td></tr>")
         html.append(f"<tr><td>Parsed Errors</td><td>{stats.get('parsed_errors')}</td></tr>")
-        html.append(f"<tr><td>Unique Paths</td><td>{stats.get('unique_paths')}</td></tr>")
+        html.append(f"<tr><td>Unique Path Templates</td><td>{stats.get('unique_path_templates')}</td></tr>")
         html.append(f"<tr><td>Unique IPs</td><td>{stats.get('unique_ips')}</td></tr>")
         html.append(f"<tr><td>Unique File Types</td><td>{stats.get('unique_file_types')}</td></tr>")
         html.append(f"<tr><td>Unique User Agents</td><td>{stats.get('unique_user_agents')}</td></tr>")
+        html.append(f"<tr><td>Excluded By Client Category</td><td>{stats.get('excluded_by_ua_category', 0)}</td></tr>")
+        if "new_ips" in stats:
+            html.append(f"<tr><td>First-Seen IPs</td><td>{stats['new_ips']}</td></tr>")
+            html.append(f"<tr><td>First-Seen Path Templates</td><td>{stats['new_path_templates']}</td></tr>")
+        elif stats.get("first_seen_warming_up"):
+            html.append("<tr><td>First-Seen IPs and Paths</td><td>warming up</td></tr>")
         html.append("</table>")
         if not path_freq:
             html.append("<h2>No 401/403 errors detected</h2>")
@@ -156,16 +215,19 @@ class DetectHttpAuthError:
         html.append("<h2>Frequency Analysis</h2>")
         html.append("<h3>Most Requested Forbidden Paths</h3>")
         html.append("<table>")
-        html.append("<tr><th>Path</th><th>Count</th><th>Severity (1-5)</th></tr>")
+        html.append("<tr><th>Path Template</th><th>Count</th><th>Unique IPs</th><th>Severity (1-5)</th></tr>")
         for entry in path_freq:
             path_esc = entry['item'].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-            html.append(f"<tr class='error-row'><td>{path_esc}</td><td>{entry['count']}</td><td>{entry['severity']}</td></tr>")
+            if entry.get("new"):
+                path_esc += " <strong>(new)</strong>"
+            html.append(f"<tr class='error-row'><td>{path_esc}</td><td>{entry['count']}</td><td>{entry.get('unique_ips', '')}</td><td>{entry['severity']}</td></tr>")
         html.append("</table>")
         html.append("<h3>IPs Causing Most 401/403 Errors</h3>")
         html.append("<table>")
         html.append("<tr><th>IP</th><th>Count</th><th>Severity (1-5)</th></tr>")
         for entry in ip_freq:
-            html.append(f"<tr class='error-row'><td>{entry['item']}</td><td>{entry['count']}</td><td>{entry['severity']}</td></tr>")
+            label = f"{entry['item']} <strong>(new)</strong>" if entry.get("new") else entry['item']
+            html.append(f"<tr class='error-row'><td>{label}</td><td>{entry['count']}</td><td>{entry['severity']}</td></tr>")
         html.append("</table>")
         html.append("<h3>Frequency by File Type</h3>")
         html.append("<table>")
@@ -180,11 +242,24 @@ class DetectHttpAuthError:
             ua_esc = entry['item'].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
             html.append(f"<tr class='error-row'><td>{ua_esc}</td><td>{entry['count']}</td><td>{entry['severity']}</td></tr>")
         html.append("</table>")
+        html.append("<h3>Frequency by Client Category</h3>")
+        html.append("<table>")
+        html.append("<tr><th>Client Category</th><th>Count</th><th>Severity (1-5)</th></tr>")
+        for entry in category_freq:
+            html.append(f"<tr class='error-row'><td>{entry['item']}</td><td>{entry['count']}</td><td>{entry['severity']}</td></tr>")
+        html.append("</table>")
+        if vhost_freq:
+            html.append("<h3>Frequency by Virtual Host</h3>")
+            html.append("<table>")
+            html.append("<tr><th>Virtual Host</th><th>Count</th><th>Severity (1-5)</th></tr>")
+            for entry in vhost_freq:
+                html.append(f"<tr class='error-row'><td>{entry['item']}</td><td>{entry['count']}</td><td>{entry['severity']}</td></tr>")
+            html.append("</table>")
         html.append("<h2>Sample Detailed Errors (Most Recent)</h2>")
         html.append("<table>")
         html.append("<tr><th>Source IP</th><th>Date</th><th>Requested Path</th><th>Status</th><th>File Type</th><th>User Agent</th></tr>")
         for data in sample_data:
-            ts = self._parse_log_date(data['date'])
+            ts = data.get('timestamp')
             ts_str = ts.strftime("%Y-%m-%d %H:%M:%S") if ts else ""
             path_esc = data['path'].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
             ua_esc = data['user_agent'].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
@@ -1,112 +1,559 @@
+import math
 import os
 from collections import defaultdict, Counter
-from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
+from Baselines import BaselineTracker
+from BloomFilter import FirstSeenTracker
+from IpPrefix import PrefixTrie, pack_ip, prefix_of, format_prefix
+from LogWindow import LogWindow
+from SampleBuffer import NewestSampleBuffer
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+_RATE_SCALE = 1000
+
+_np = None
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _np = numpy
+    return _np or None
+
+
+class _WindowSamples:
+
+    def __init__(self, window: LogWindow, capacity: int, excluded: frozenset):
+        self.window = window
+        self.capacity = capacity
+        self.excluded = excluded
+
+    def __bool__(self) -> bool:
+        return True
+
+    def get(self, ip: str, default=None) -> Optional[NewestSampleBuffer]:
+        buffer = None
+        for entry in self.window.rows_for_ip(ip):
+            if self.excluded and entry.ua_category in self.excluded:
+                continue
+            if buffer is None:
+                buffer = NewestSampleBuffer(self.capacity)
+            buffer.offer(entry.timestamp, entry)
+        return buffer if buffer is not None else default
 
 
 class DoSDetector:
 
     REPORT_DIR = "/var/www/reports/"
 
+    DEFAULT_SUBNET_THRESHOLDS = {
+        (4, 24): {"requests_per_minute": 300, "total_requests": 1500, "bytes_sent": 30_000_000},
+        (4, 16): {"requests_per_minute": 1000, "total_requests": 5000, "bytes_sent": 100_000_000},
+        (6, 64): {"requests_per_minute": 300, "total_requests": 1500, "bytes_sent": 30_000_000},
+        (6, 48): {"requests_per_minute": 1000, "total_requests": 5000, "bytes_sent": 100_000_000},
+    }
+
+    DEFAULT_RATE_THRESHOLDS = {300: 400}
+    # a single page load fetches dozens of assets within a second, so these are opt-in
+    SUB_MINUTE_RATE_THRESHOLDS = {1: 20, 10: 60}
+
     def __init__(
         self,
         requests_per_minute_threshold: int = 100,
         total_requests_threshold: int = 500,
         bytes_sent_threshold: int = 10_000_000,
-        sample_lines_per_ip: int = 10
+        sample_lines_per_ip: int = 10,
+        subnet_thresholds: Optional[Dict[Tuple[int, int], Dict[str, int]]] = None,
+        allowlist: Optional[List[str]] = None,
+        denylist: Optional[List[str]] = None,
+        exclude_ua_categories: Optional[List[str]] = None,
+        ua_category_thresholds: Optional[Dict[str, Dict[str, int]]] = None,
+        vectorized: bool = False,
+        rate_thresholds: Optional[Dict[int, int]] = None,
+        baselines: Optional[BaselineTracker] = None,
+        first_seen: Optional[FirstSeenTracker] = None,
+        sub_minute_rates: bool = False,
     ):
         self.requests_per_minute_threshold = int(requests_per_minute_threshold)
         self.total_requests_threshold = int(total_requests_threshold)
         self.bytes_sent_threshold = int(bytes_sent_threshold)
         self.sample_lines_per_ip = int(sample_lines_per_ip)
+        if subnet_thresholds is None:
+            subnet_thresholds = self.DEFAULT_SUBNET_THRESHOLDS
+        self.subnet_thresholds = {key: dict(value) for key, value in subnet_thresholds.items()}
+        self.allowlist = PrefixTrie(allowlist)
+        self.denylist = PrefixTrie(denylist)
+        self.exclude_ua_categories = frozenset(exclude_ua_categories or ())
+        self.ua_category_thresholds = {key: dict(value) for key, value in (ua_category_thresholds or {}).items()}
+        self.vectorized = bool(vectorized)
+        if rate_thresholds is None:
+            rate_thresholds = {**self.DEFAULT_RATE_THRESHOLDS, 60: self.requests_per_minute_threshold}
+            if sub_minute_rates:
+                rate_thresholds.update(self.SUB_MINUTE_RATE_THRESHOLDS)
+        self.rate_thresholds = {int(seconds): threshold for seconds, threshold in sorted(rate_thresholds.items())}
+        self.baselines = baselines
+        self.first_seen = first_seen
 
         os.makedirs(self.REPORT_DIR, exist_ok=True)
 
     @staticmethod
-    def _parse_log_date(date_str: str) -> Optional[datetime]:
-        if not date_str:
-            return None
-        raw = date_str[:19]
-        try:
-            return datetime.strptime(raw, "%d-%m-%Y %H:%M:%S")
-        except Exception:
-            return None
+    def _dominant_category(categories: Counter) -> Optional[str]:
+        return categories.most_common(1)[0][0] if categories else None
+
+    def _thresholds_for(self, category: Optional[str]) -> Tuple[float, float, float]:
+        override = self.ua_category_thresholds.get(category, {}) if category else {}
+        return (
+            override.get("requests_per_minute", self.requests_per_minute_threshold),
+            override.get("total_requests", self.total_requests_threshold),
+            override.get("bytes_sent", self.bytes_sent_threshold),
+        )
 
-    def analyze(self, logs: List["AccessLog"]) -> Dict[str, Any]:
+    def _rate_thresholds_for(self, category: Optional[str]) -> Dict[int, float]:
+        override = self.ua_category_thresholds.get(category, {}) if category else {}
+        if "requests_per_minute" not in override or 60 not in self.rate_thresholds:
+            return self.rate_thresholds
+        return {**self.rate_thresholds, 60: override["requests_per_minute"]}
 
-        ip_timestamps: Dict[str, List[datetime]] = defaultdict(list)
-        ip_lines: Dict[str, List["AccessLog"]] = defaultdict(list)
-        ip_bytes_sent: Dict[str, int] = defaultdict(int)
+    @staticmethod
+    def _second_of(dt: datetime) -> int:
+        return int((dt - _EPOCH).total_seconds())
+
+    def _rate_peaks(self, per_second: Dict[int, float]) -> Dict[int, Tuple[float, int]]:
+        seconds = sorted(per_second)
+        prefix = list(accumulate((round(per_second[second] * _RATE_SCALE) for second in seconds), initial=0))
+        peaks: Dict[int, Tuple[float, int]] = {}
+
+        for window in self.rate_thresholds:
+            start = 0
+            peak, peak_start = 0, seconds[0]
+            for i, second in enumerate(seconds):
+                while seconds[start] <= second - window:
+                    start += 1
+                total = prefix[i + 1] - prefix[start]
+                if total > peak:
+                    peak, peak_start = total, seconds[start]
+            peaks[window] = (peak / _RATE_SCALE, peak_start)
+
+        return peaks
+
+    def summarize(
+        self,
+        logs: List["AccessLog"],
+        samples: Optional[Dict[str, NewestSampleBuffer]] = None,
+        categories: Optional[Dict[str, Counter]] = None,
+        rates: Optional[Dict[str, Dict[int, Tuple[float, int]]]] = None,
+        sites: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> Dict[str, Dict[int, List[float]]]:
+        summary: Dict[str, Dict[int, List[float]]] = defaultdict(dict)
+        seconds: Dict[str, Dict[int, float]] = defaultdict(dict)
 
-        parsed_any = False
+        excluded = self.exclude_ua_categories
 
         for entry in logs:
-            dt = self._parse_log_date(entry.date)
+            if excluded and entry.ua_category in excluded:
+                continue
+            dt = entry.timestamp
             if dt is None:
                 continue
-            parsed_any = True
             ip = entry.source_ip
 
-            ip_timestamps[ip].append(dt)
-            ip_lines[ip].append(entry)
+            if samples is not None:
+                buffer = samples.get(ip)
+                if buffer is None:
+                    buffer = samples[ip] = NewestSampleBuffer(self.sample_lines_per_ip)
+                buffer.offer(dt, entry)
+            if categories is not None and entry.ua_category:
+                counter = categories.get(ip)
+                if counter is None:
+                    counter = categories[ip] = Counter()
+                counter[entry.ua_category] += 1
+
+            second = self._second_of(dt)
+            minute = second // 60
+            buckets = summary[ip]
+            bucket = buckets.get(minute)
+            if bucket is None:
+                bucket = buckets[minute] = [0, 0, 0]
+            weight = entry.weight
+            if rates is not None:
+                per_second = seconds[ip]
+                per_second[second] = per_second.get(second, 0) + weight
+            bucket[0] += weight
+            if weight != 1:
+                bucket[2] += weight * weight - weight
             try:
-                ip_bytes_sent[ip] += int(entry.bytes_sent)
+                bucket[1] += int(entry.bytes_sent) * weight
             except Exception:
                 pass
+            if sites is not None and entry.vhost is not None:
+                site = sites.get(entry.vhost)
+                if site is None:
+                    site = sites[entry.vhost] = {"ips": Counter(), "minutes": Counter(), "bytes_sent": 0}
+                site["ips"][ip] += weight
+                site["minutes"][minute] += weight
+                site["bytes_sent"] += entry.bytes_sent * weight
+
+        if rates is not None and self.rate_thresholds:
+            for ip, per_second in seconds.items():
+                rates[ip] = self._rate_peaks(per_second)
 
-        if not parsed_any:
-            return {"offending": {}, "stats": {"total_logs": len(logs), "parsed_logs": 0}}
+        return dict(summary)
+
+    def summarize_window(
+        self,
+        window: LogWindow,
+        rates: Optional[Dict[str, Dict[int, Tuple[float, int]]]] = None,
+        sites: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> Dict[str, Dict[int, List[float]]]:
+        np = _numpy()
+        epochs, ip_codes, bytes_sent, weights = (np.frombuffer(column, dtype=dtype) for column, dtype in zip(
+            window.columns(), (np.int64, np.int64, np.int64, np.float64)
+        ))
+        vhost_codes = np.frombuffer(window.vhost_codes(), dtype=np.int64)
+        if self.exclude_ua_categories:
+            excluded = self.exclude_ua_categories
+            keep = np.fromiter((entry.ua_category not in excluded for entry in window), dtype=bool, count=len(window))
+            epochs, ip_codes, bytes_sent, weights = epochs[keep], ip_codes[keep], bytes_sent[keep], weights[keep]
+            vhost_codes = vhost_codes[keep]
+        if not len(epochs):
+            return {}
+
+        first_second = int(epochs.min())
+        span = int(epochs.max()) - first_second + 1 + max(self.rate_thresholds, default=0)
+        keys = ip_codes * span + (epochs - first_second)
+        second_keys, second_first_rows, second_of_row = np.unique(keys, return_index=True, return_inverse=True)
+        key_ips = second_keys // span
+        key_seconds = second_keys % span + first_second
+
+        new_minute = np.ones(len(second_keys), dtype=bool)
+        new_minute[1:] = (key_ips[1:] != key_ips[:-1]) | (key_seconds[1:] // 60 != key_seconds[:-1] // 60)
+        minute_starts = np.flatnonzero(new_minute)
+        minute_of_row = (np.cumsum(new_minute) - 1)[second_of_row]
+        first_rows = np.minimum.reduceat(second_first_rows, minute_starts)
+        ips = key_ips[minute_starts].tolist()
+        bucket_minutes = (key_seconds[minute_starts] // 60).tolist()
+
+        weighted = not np.all(weights == 1)
+        if weighted:
+            counts = np.bincount(minute_of_row, weights=weights).tolist()
+            sent = np.bincount(minute_of_row, weights=bytes_sent * weights).tolist()
+            variances = np.bincount(minute_of_row, weights=weights * weights - weights).tolist()
+        else:
+            counts = np.bincount(minute_of_row).tolist()
+            sent = np.bincount(minute_of_row, weights=bytes_sent).astype(np.int64).tolist()
+            variances = [0] * len(counts)
+
+        summary: Dict[str, Dict[int, List[float]]] = {}
+        value = window.ips_table.value
+        for i in np.argsort(first_rows, kind="stable").tolist():
+            ip = value(ips[i])
+            buckets = summary.get(ip)
+            if buckets is None:
+                buckets = summary[ip] = {}
+            buckets[bucket_minutes[i]] = [counts[i], sent[i], variances[i]]
+
+        if rates is not None and self.rate_thresholds:
+            if weighted:
+                per_second = np.rint(np.bincount(second_of_row, weights=weights) * _RATE_SCALE).astype(np.int64)
+            else:
+                per_second = np.bincount(second_of_row) * _RATE_SCALE
+            prefix = np.concatenate(([0], np.cumsum(per_second)))
+            ip_starts = np.flatnonzero(np.concatenate(([True], key_ips[1:] != key_ips[:-1])))
+            positions = np.arange(len(second_keys))
+            peaks_by_window = {}
+            for window_seconds in self.rate_thresholds:
+                window_starts = np.searchsorted(second_keys, second_keys - window_seconds, side="right")
+                totals = prefix[1:] - prefix[window_starts]
+                peaks = np.maximum.reduceat(totals, ip_starts)
+                is_peak = totals == np.repeat(peaks, np.diff(np.append(ip_starts, len(totals))))
+                first_peak = np.minimum.reduceat(np.where(is_peak, positions, len(positions)), ip_starts)
+                peaks_by_window[window_seconds] = zip(
+                    (peaks / _RATE_SCALE).tolist(), key_seconds[window_starts[first_peak]].tolist()
+                )
+            for code, *window_peaks in zip(key_ips[ip_starts].tolist(), *peaks_by_window.values()):
+                rates[value(code)] = dict(zip(peaks_by_window, window_peaks))
+
+        tagged = vhost_codes >= 0
+        if sites is not None and tagged.any():
+            self._summarize_sites(window, vhost_codes[tagged], ip_codes[tagged], epochs[tagged] // 60,
+                                  bytes_sent[tagged], weights[tagged] if weighted else None, sites)
+
+        return summary
+
+    @staticmethod
+    def _summarize_sites(window: LogWindow, vhost_codes, ip_codes, minutes, bytes_sent, weights, sites: Dict[str, Dict[str, Any]]):
+        np = _numpy()
+        ip_span = int(ip_codes.max()) + 1
+        keys, inverse = np.unique(vhost_codes * ip_span + ip_codes, return_inverse=True)
+        counts = np.bincount(inverse, weights=weights).tolist()
+
+        first_minute = int(minutes.min())
+        minute_span = int(minutes.max()) - first_minute + 1
+        minute_keys, minute_inverse = np.unique(vhost_codes * minute_span + (minutes - first_minute), return_inverse=True)
+        minute_counts = np.bincount(minute_inverse, weights=weights).tolist()
+
+        site_codes, site_inverse = np.unique(vhost_codes, return_inverse=True)
+        sent = np.bincount(site_inverse, weights=bytes_sent if weights is None else bytes_sent * weights).tolist()
+
+        vhost_name, ip_name = window.vhosts_table.value, window.ips_table.value
+        for code, total in zip(site_codes.tolist(), sent):
+            sites[vhost_name(code)] = {"ips": Counter(), "minutes": Counter(), "bytes_sent": round(total) if weights is None else total}
+        for key, count in zip(keys.tolist(), counts):
+            sites[vhost_name(key // ip_span)]["ips"][ip_name(key % ip_span)] = count
+        for key, count in zip(minute_keys.tolist(), minute_counts):
+            sites[vhost_name(key // minute_span)]["minutes"][key % minute_span + first_minute] = count
+
+    def evaluate(
+        self,
+        summary: Dict[str, Dict[int, List[float]]],
+        samples: Optional[Dict[str, NewestSampleBuffer]] = None,
+        categories: Optional[Dict[str, Counter]] = None,
+        rates: Optional[Dict[str, Dict[int, Tuple[float, int]]]] = None,
+        anomalies: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
 
         offending: Dict[str, Dict[str, Any]] = {}
-        overall_total_requests = 0
 
-        for ip, timestamps in ip_timestamps.items():
-            total_requests = len(timestamps)
-            overall_total_requests += total_requests
+        for ip, buckets in summary.items():
+            packed = pack_ip(ip)
+            if packed is not None and self.allowlist and self.allowlist.lookup_packed(*packed):
+                continue
+            denied = packed is not None and bool(self.denylist) and bool(self.denylist.lookup_packed(*packed))
 
             minute_buckets = Counter()
-            for dt in timestamps:
-                key = dt.replace(second=0, microsecond=0)
-                minute_buckets[key] += 1
+            total_requests = 0
+            total_bytes = 0
+            variance = 0
+            for minute, (count, sent, bucket_variance) in buckets.items():
+                minute_buckets[minute] += count
+                total_requests += count
+                total_bytes += sent
+                variance += bucket_variance
 
             max_requests_per_min = max(minute_buckets.values()) if minute_buckets else 0
-            total_bytes = ip_bytes_sent.get(ip, 0)
+
+            category = None
+            if categories and ip in categories:
+                category = self._dominant_category(categories[ip])
+            rpm_threshold, total_threshold, bytes_threshold = self._thresholds_for(category)
+            peaks = (rates or {}).get(ip, {})
+            rate_thresholds = self._rate_thresholds_for(category) if peaks else {}
+            exceeded = [
+                window for window, threshold in rate_thresholds.items()
+                if window in peaks and peaks[window][0] >= threshold
+            ]
+
+            anomaly = anomalies["ips"].get(ip) if anomalies else None
 
             is_suspicious = (
-                max_requests_per_min >= self.requests_per_minute_threshold
-                or total_requests >= self.total_requests_threshold
-                or total_bytes >= self.bytes_sent_threshold
+                denied
+                or max_requests_per_min >= rpm_threshold
+                or total_requests >= total_threshold
+                or total_bytes >= bytes_threshold
+                or bool(exceeded)
+                or anomaly is not None
             )
 
             if is_suspicious:
-                samples = sorted(
-                    ip_lines[ip],
-                    key=lambda e: self._parse_log_date(e.date) or datetime.min,
-                    reverse=True
-                )
-                samples = samples[: self.sample_lines_per_ip]
+                buffer = (samples or {}).get(ip)
+                ip_samples = buffer.items() if buffer is not None else []
+                if category is None and ip_samples:
+                    category = self._dominant_category(
+                        Counter(entry.ua_category for entry in ip_samples if entry.ua_category)
+                    )
 
                 offending[ip] = {
-                    "max_requests_per_min": int(max_requests_per_min),
-                    "total_requests": int(total_requests),
-                    "total_bytes_sent": int(total_bytes),
-                    "sample_lines": samples,
-                    "top_minute_buckets": minute_buckets.most_common(10),
+                    "max_requests_per_min": round(max_requests_per_min),
+                    "total_requests": round(total_requests),
+                    "total_bytes_sent": round(total_bytes),
+                    "sample_lines": ip_samples,
+                    "ua_category": category,
+                    "top_minute_buckets": [
+                        (_EPOCH + timedelta(minutes=minute), round(count))
+                        for minute, count in minute_buckets.most_common(10)
+                    ],
                 }
+                if peaks:
+                    offending[ip]["rate_peaks"] = {
+                        window: (_EPOCH + timedelta(seconds=start), round(peak))
+                        for window, (peak, start) in peaks.items()
+                    }
+                    offending[ip]["rate_windows_exceeded"] = exceeded
+                if anomaly is not None:
+                    offending[ip]["baseline"] = self._format_anomaly(anomaly)
+                if variance:
+                    offending[ip]["error_bound"] = round(1.96 * math.sqrt(variance))
+                if denied:
+                    offending[ip]["denylisted"] = True
+
+        return offending
+
+    @staticmethod
+    def _format_anomaly(anomaly: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "minute": _EPOCH + timedelta(minutes=anomaly["minute"]),
+            "count": round(anomaly["count"]),
+            "mean": round(anomaly["mean"], 1),
+            "zscore": round(anomaly["zscore"], 1),
+        }
+
+    def evaluate_subnets(self, summary: Dict[str, Dict[int, List[float]]]) -> Dict[str, Dict[str, Any]]:
+
+        lengths_by_version: Dict[int, List[int]] = defaultdict(list)
+        for version, length in self.subnet_thresholds:
+            lengths_by_version[version].append(length)
+
+        subnets: Dict[Tuple[int, int, int], Dict[str, Any]] = {}
+
+        for ip, buckets in summary.items():
+            packed = pack_ip(ip)
+            if packed is None:
+                continue
+            version, value = packed
+            if self.allowlist and self.allowlist.lookup_packed(version, value):
+                continue
 
-        stats = {
-            "total_logs": len(logs),
-            "parsed_logs": sum(len(v) for v in ip_timestamps.values()),
-            "total_unique_ips": len(ip_timestamps),
+            for length in lengths_by_version.get(version, ()):
+                key = (version, length, prefix_of(version, value, length))
+                subnet = subnets.get(key)
+                if subnet is None:
+                    subnet = subnets[key] = {"minutes": Counter(), "total_requests": 0, "total_bytes_sent": 0, "ips": 0}
+                subnet["ips"] += 1
+                minutes = subnet["minutes"]
+                for minute, (count, sent, _) in buckets.items():
+                    minutes[minute] += count
+                    subnet["total_requests"] += count
+                    subnet["total_bytes_sent"] += sent
+
+        offending: Dict[str, Dict[str, Any]] = {}
+
+        for (version, length, network), subnet in subnets.items():
+            thresholds = self.subnet_thresholds[(version, length)]
+            minutes = subnet["minutes"]
+            max_requests_per_min = max(minutes.values()) if minutes else 0
+
+            is_suspicious = (
+                max_requests_per_min >= thresholds.get("requests_per_minute", float("inf"))
+                or subnet["total_requests"] >= thresholds.get("total_requests", float("inf"))
+                or subnet["total_bytes_sent"] >= thresholds.get("bytes_sent", float("inf"))
+            )
+
+            if is_suspicious:
+                offending[format_prefix(version, network, length)] = {
+                    "prefix_length": length,
+                    "unique_ips": subnet["ips"],
+                    "max_requests_per_min": round(max_requests_per_min),
+                    "total_requests": round(subnet["total_requests"]),
+                    "total_bytes_sent": round(subnet["total_bytes_sent"]),
+                    "top_minute_buckets": [
+                        (_EPOCH + timedelta(minutes=minute), round(count))
+                        for minute, count in minutes.most_common(10)
+                    ],
+                }
+
+        return offending
+
+    @staticmethod
+    def evaluate_sites(sites: Dict[str, Dict[str, Any]], offending: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        for ip, info in offending.items():
+            per_site = {vhost: round(site["ips"][ip]) for vhost, site in sites.items() if ip in site["ips"]}
+            if per_site:
+                info["vhosts"] = dict(sorted(per_site.items(), key=lambda item: item[1], reverse=True))
+
+        result: Dict[str, Dict[str, Any]] = {}
+        for vhost, site in sorted(sites.items(), key=lambda item: sum(item[1]["ips"].values()), reverse=True):
+            ips = site["ips"]
+            result[vhost] = {
+                "total_requests": round(sum(ips.values())),
+                "unique_ips": len(ips),
+                "max_requests_per_min": round(max(site["minutes"].values(), default=0)),
+                "total_bytes_sent": round(site["bytes_sent"]),
+                "offending_ips": sum(1 for ip in offending if ip in ips),
+            }
+        return result
+
+    def summary_stats(self, summary: Dict[str, Dict[int, List[float]]], total_logs: int) -> Dict[str, Any]:
+        overall_total_requests = 0
+        variance = 0
+        for buckets in summary.values():
+            for count, _, bucket_variance in buckets.values():
+                overall_total_requests += count
+                variance += bucket_variance
+        overall_total_requests = round(overall_total_requests)
+        return {
+            "total_logs": total_logs,
+            "parsed_logs": overall_total_requests,
+            "total_unique_ips": len(summary),
             "overall_total_requests": overall_total_requests,
+            "sampling": {
+                "active": variance > 0,
+                "error_bound": round(1.96 * math.sqrt(variance)),
+            },
             "thresholds": {
                 "requests_per_minute_threshold": self.requests_per_minute_threshold,
                 "total_requests_threshold": self.total_requests_threshold,
                 "bytes_sent_threshold": self.bytes_sent_threshold,
+                "ua_category_thresholds": self.ua_category_thresholds,
+                "rate_thresholds": {f"{window}s": threshold for window, threshold in self.rate_thresholds.items()},
+                "excluded_ua_categories": sorted(self.exclude_ua_categories),
+                "subnet_thresholds": {
+                    f"IPv{version} /{length}": thresholds
+                    for (version, length), thresholds in self.subnet_thresholds.items()
+                },
             },
         }
 
-        return {"offending": offending, "stats": stats}
+    def analyze(self, logs: List["AccessLog"]) -> Dict[str, Any]:
+
+        categories: Optional[Dict[str, Counter]] = {} if self.ua_category_thresholds else None
+        rates: Dict[str, Dict[int, Tuple[float, int]]] = {}
+        sites: Dict[str, Dict[str, Any]] = {}
+        anomalies = None
+        if self.baselines is not None and isinstance(logs, LogWindow):
+            anomalies = self.baselines.observe_window(logs)
+        if self.first_seen is not None and isinstance(logs, LogWindow):
+            self.first_seen.observe_window(logs)
+        if self.vectorized and categories is None and isinstance(logs, LogWindow) and _numpy() is not None:
+            samples = _WindowSamples(logs, self.sample_lines_per_ip, self.exclude_ua_categories)
+            summary = self.summarize_window(logs, rates, sites)
+        else:
+            samples = {}
+            summary = self.summarize(logs, samples, categories, rates, sites)
+
+        if not summary:
+            return {"offending": {}, "offending_subnets": {}, "stats": {"total_logs": len(logs), "parsed_logs": 0}}
+
+        offending = self.evaluate(summary, samples, categories, rates, anomalies)
+        offending_subnets = self.evaluate_subnets(summary)
+        stats = self.summary_stats(summary, len(logs))
+        if sites:
+            stats["vhosts"] = self.evaluate_sites(sites, offending)
+        if self.first_seen is not None:
+            for ip, info in offending.items():
+                first_seen = self.first_seen.first_seen("ips", ip)
+                if first_seen is not None:
+                    info["first_seen"] = first_seen
+            stats["first_seen"] = self.first_seen.summary()
+
+        analysis = {"offending": offending, "offending_subnets": offending_subnets, "stats": stats}
+        if anomalies is not None:
+            analysis["anomalies"] = {
+                kind: {key: self._format_anomaly(anomaly) for key, anomaly in anomalies[kind].items()}
+                for kind in ("paths", "global")
+            }
+            stats["thresholds"]["baseline_z_threshold"] = self.baselines.z_threshold
+            if self.first_seen is not None:
+                for key, anomaly in analysis["anomalies"]["paths"].items():
+                    anomaly["new"] = self.first_seen.first_seen("paths", key) is not None
+        return analysis
 
     def _build_report_path(self) -> str:
         ts = datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -118,6 +565,8 @@ class DoSDetector:
         out_path = self._build_report_path()
 
         offending = analysis.get("offending", {})
+        offending_subnets = analysis.get("offending_subnets", {})
+        anomalies = analysis.get("anomalies", {})
         stats = analysis.get("stats", {})
 
         now = datetime.now().astimezone()
@@ -138,12 +587,22 @@ class DoSDetector:
             "th{background:#f2f2f2}"
             ".muted{color:#666;font-size:0.9em}"
             ".ip-row{background:#fff7f7}"
+            ".sampling{background:#fff3cd;padding:8px}"
             "</style></head><body>"
         )
 
         html.append(f"<h1>{title}</h1>")
         html.append(f"<p class='muted'>Generated: {generated_at}</p>")
 
+        sampling = stats.get("sampling", {})
+        if sampling.get("active"):
+            html.append(
+                "<p class='sampling'><strong>Sampling was active:</strong> the analyzer fell behind and parsed a "
+                "sample of the log lines. Request and byte counts are scaled-up estimates; overall requests "
+                f"are accurate to about &plusmn;{sampling.get('error_bound')} (95%). "
+                "IPs flagged in an earlier cycle are counted exactly from then on.</p>"
+            )
+
         html.append("<h2>Summary</h2>")
         html.append("<table>")
         html.append("<tr><th>Metric</th><th>Value</th></tr>")
@@ -159,9 +618,92 @@ class DoSDetector:
             f"total requests: {thr.get('total_requests_threshold')} &nbsp; "
             f"bytes_sent: {thr.get('bytes_sent_threshold')}</td></tr>"
         )
+        if thr.get("rate_thresholds"):
+            windows = " &nbsp; ".join(f"{window}: {limit}" for window, limit in thr["rate_thresholds"].items())
+            html.append(f"<tr><td>Sliding-window rate thresholds</td><td>{windows}</td></tr>")
 
         html.append("</table>")
 
+        vhosts = stats.get("vhosts", {})
+        if vhosts:
+            html.append(f"<h2>Traffic per Virtual Host ({len(vhosts)})</h2>")
+            html.append("<table>")
+            html.append("<tr><th>Virtual host</th><th>Total req</th><th>Unique IPs</th><th>Max req/min</th><th>Total bytes_sent</th><th>Offending IPs</th></tr>")
+            for vhost, info in vhosts.items():
+                html.append(
+                    f"<tr><td>{vhost}</td>"
+                    f"<td>{info['total_requests']}</td>"
+                    f"<td>{info['unique_ips']}</td>"
+                    f"<td>{info['max_requests_per_min']}</td>"
+                    f"<td>{info['total_bytes_sent']}</td>"
+                    f"<td>{info['offending_ips']}</td></tr>"
+                )
+            html.append("</table>")
+
+        if offending_subnets:
+            html.append(f"<h2>Suspected Offending Subnets ({len(offending_subnets)})</h2>")
+            html.append("<table>")
+            html.append("<tr><th>Subnet</th><th>Unique IPs</th><th>Max req/min</th><th>Total req</th><th>Total bytes_sent</th><th>Top minute buckets</th></tr>")
+
+            for network, info in sorted(
+                offending_subnets.items(),
+                key=lambda item: (item[1]["max_requests_per_min"], item[1]["total_requests"]),
+                reverse=True
+            ):
+                buckets = ", ".join(
+                    f"{k.strftime('%Y-%m-%d %H:%M')}:{c}"
+                    for k, c in info.get("top_minute_buckets", [])
+                )
+                html.append(
+                    f"<tr class='ip-row'>"
+                    f"<td>{network}</td>"
+                    f"<td>{info['unique_ips']}</td>"
+                    f"<td>{info['max_requests_per_min']}</td>"
+                    f"<td>{info['total_requests']}</td>"
+                    f"<td>{info['total_bytes_sent']}</td>"
+                    f"<td>{buckets}</td>"
+                    f"</tr>"
+                )
+
+            html.append("</table>")
+
+        first_seen = stats.get("first_seen")
+        if first_seen and first_seen.get("warming_up") and first_seen.get("warm_at"):
+            html.append(
+                "<p class='muted'>First-seen tracking is warming up; IPs and paths are marked as new from "
+                f"{first_seen['warm_at'].strftime('%Y-%m-%d %H:%M')}.</p>"
+            )
+        elif first_seen and first_seen.get("per_minute"):
+            html.append(
+                f"<h2>First-Seen Clients and Paths ({first_seen['new_ips']} IPs, {first_seen['new_paths']} paths)</h2>"
+            )
+            if first_seen.get("saturated"):
+                html.append("<p class='muted'>The first-seen filters reached their memory budget; some new keys may be missed.</p>")
+            html.append("<table>")
+            html.append("<tr><th>Minute</th><th>New IPs</th><th>New paths</th></tr>")
+            for minute, ips, paths in first_seen["per_minute"]:
+                html.append(f"<tr><td>{minute.strftime('%Y-%m-%d %H:%M')}</td><td>{ips}</td><td>{paths}</td></tr>")
+            html.append("</table>")
+
+        if any(anomalies.values()):
+            html.append("<h2>Traffic Above Baseline</h2>")
+            html.append("<table>")
+            html.append("<tr><th>Scope</th><th>Key</th><th>Minute</th><th>Requests</th><th>Baseline req/min</th><th>z-score</th></tr>")
+            for kind, label in (("global", "All traffic"), ("paths", "Path")):
+                for key, info in sorted(anomalies.get(kind, {}).items(), key=lambda item: item[1]["zscore"], reverse=True):
+                    name = "" if kind == "global" else key.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                    if info.get("new"):
+                        name += " <strong>(new)</strong>"
+                    html.append(
+                        f"<tr><td>{label}</td>"
+                        f"<td>{name}</td>"
+                        f"<td>{info['minute'].strftime('%Y-%m-%d %H:%M')}</td>"
+                        f"<td>{info['count']}</td>"
+                        f"<td>{info['mean']}</td>"
+                        f"<td>{info['zscore']}</td></tr>"
+                    )
+            html.append("</table>")
+
         if not offending:
             html.append("<h2>No suspicious IPs detected</h2>")
             html.append("</body></html>")
@@ -171,7 +713,7 @@ class DoSDetector:
 
         html.append(f"<h2>Suspected Offending IPs ({len(offending)})</h2>")
         html.append("<table>")
-        html.append("<tr><th>IP</th><th>Max req/min</th><th>Total req</th><th>Total bytes_sent</th><th>Top minute buckets</th></tr>")
+        html.append("<tr><th>IP</th><th>Client</th><th>Max req/min</th><th>Total req</th><th>Total bytes_sent</th><th>Peak rates</th><th>Top minute buckets</th></tr>")
 
         def severity_key(item: Tuple[str, Dict[str, Any]]):
             _, v = item
@@ -182,12 +724,27 @@ class DoSDetector:
                 f"{k.strftime('%Y-%m-%d %H:%M')}:{c}"
                 for k, c in info.get("top_minute_buckets", [])
             )
+            label = f"{ip} (denylisted)" if info.get("denylisted") else ip
+            if info.get("first_seen"):
+                label += f" <strong>(new since {info['first_seen'].strftime('%H:%M')})</strong>"
+            error = f" &plusmn;{info['error_bound']}" if info.get("error_bound") else ""
+            exceeded = info.get("rate_windows_exceeded", [])
+            rates = ", ".join(
+                (f"<strong>{window}s: {count}</strong>" if window in exceeded else f"{window}s: {count}")
+                + f" @ {start.strftime('%H:%M:%S')}"
+                for window, (start, count) in info.get("rate_peaks", {}).items()
+            )
+            baseline = info.get("baseline")
+            if baseline:
+                rates += f"<br>z={baseline['zscore']} ({baseline['count']} vs {baseline['mean']}/min)"
             html.append(
                 f"<tr class='ip-row'>"
-                f"<td>{ip}</td>"
+                f"<td>{label}</td>"
+                f"<td>{info.get('ua_category') or ''}</td>"
                 f"<td>{info['max_requests_per_min']}</td>"
-                f"<td>{info['total_requests']}</td>"
+                f"<td>{info['total_requests']}{error}</td>"
                 f"<td>{info['total_bytes_sent']}</td>"
+                f"<td>{rates}</td>"
                 f"<td>{buckets}</td>"
                 f"</tr>"
             )
@@ -198,11 +755,14 @@ class DoSDetector:
 
         for ip, info in sorted(offending.items(), key=severity_key, reverse=True):
             html.append(f"<h3>{ip}</h3>")
+            if info.get("vhosts"):
+                sites = ", ".join(f"{vhost} ({count})" for vhost, count in info["vhosts"].items())
+                html.append(f"<p class='muted'>Virtual hosts: {sites}</p>")
             html.append("<table>")
             html.append("<tr><th>Timestamp</th><th>Request</th><th>Status</th><th>Bytes Recv</th><th>Bytes Sent</th><th>User Agent</th></tr>")
 
             for entry in info.get("sample_lines", []):
-                ts = self._parse_log_date(entry.date)
+                ts = entry.timestamp
                 ts_str = ts.strftime("%Y-%m-%d %H:%M:%S") if ts else ""
 
                 req = entry.first_line_of_request.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
@@ -0,0 +1,46 @@
+import mimetypes
+from functools import lru_cache
+
+mimetypes.init()
+
+
+def get_extension(path: str) -> str:
+    end = len(path)
+    for sep in "?#":
+        i = path.find(sep, 0, end)
+        if i >= 0:
+            end = i
+    start = path.rfind("/", 0, end) + 1
+    while start < end and path[start] == ".":
+        start += 1
+    dot = path.rfind(".", start, end)
+    if dot < 0:
+        return ""
+    ext = path[dot:end].lower()
+    if ext in mimetypes.encodings_map:
+        prev = path.rfind(".", start, dot)
+        if prev >= 0:
+            ext = path[prev:end].lower()
+    return ext
+
+
+@lru_cache(maxsize=1024)
+def classify_extension(ext: str) -> str:
+    if not ext:
+        return 'unknown'
+    mime_type, _ = mimetypes.guess_type("file" + ext)
+    if mime_type:
+        main_type = mime_type.split('/')[0]
+        if main_type == 'image':
+            return 'image'
+        elif main_type == 'text':
+            return 'text file'
+        elif mime_type == 'application/pdf':
+            return 'pdf'
+        else:
+            return mime_type
+    return 'unknown'
+
+
+def classify_file_type(path: str) -> str:
+    return classify_extension(get_extension(path))
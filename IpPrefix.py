@@ -0,0 +1,82 @@
+import ipaddress
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+IP_BITS = {4: 32, 6: 128}
+
+
+@lru_cache(maxsize=65536)
+def pack_ip(ip: str) -> Optional[Tuple[int, int]]:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if addr.version == 6 and addr.ipv4_mapped is not None:
+        addr = addr.ipv4_mapped
+    return addr.version, int(addr)
+
+
+def prefix_of(version: int, value: int, length: int) -> int:
+    shift = IP_BITS[version] - length
+    return (value >> shift) << shift
+
+
+def format_prefix(version: int, value: int, length: int) -> str:
+    if version == 4:
+        return str(ipaddress.IPv4Network((value, length)))
+    return str(ipaddress.IPv6Network((value, length)))
+
+
+def parse_network(cidr: str) -> Tuple[int, int, int]:
+    network = ipaddress.ip_network(cidr.strip(), strict=False)
+    return network.version, int(network.network_address), network.prefixlen
+
+
+class PrefixTrie:
+
+    _ZERO, _ONE, _VALUE, _HAS_VALUE = 0, 1, 2, 3
+
+    def __init__(self, networks: Optional[Iterable[str]] = None):
+        self._roots: Dict[int, List[Any]] = {4: [None, None, None, False], 6: [None, None, None, False]}
+        self._size = 0
+        for cidr in networks or ():
+            self.insert(cidr)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, cidr: str, value: Any = True):
+        version, network, length = parse_network(cidr)
+        bits = IP_BITS[version]
+        node = self._roots[version]
+        for i in range(length):
+            bit = (network >> (bits - 1 - i)) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, None, False]
+            node = child
+        if not node[self._HAS_VALUE]:
+            self._size += 1
+        node[self._VALUE] = value
+        node[self._HAS_VALUE] = True
+
+    def lookup_packed(self, version: int, value: int) -> Any:
+        bits = IP_BITS[version]
+        node = self._roots[version]
+        found = node[self._VALUE] if node[self._HAS_VALUE] else None
+        for i in range(bits):
+            node = node[(value >> (bits - 1 - i)) & 1]
+            if node is None:
+                break
+            if node[self._HAS_VALUE]:
+                found = node[self._VALUE]
+        return found
+
+    def lookup(self, ip: str) -> Any:
+        packed = pack_ip(ip)
+        if packed is None:
+            return None
+        return self.lookup_packed(*packed)
+
+    def __contains__(self, ip: str) -> bool:
+        return self.lookup(ip) is not None
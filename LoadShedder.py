@@ -0,0 +1,42 @@
+from typing import Optional
+
+
+class LoadShedder:
+
+    def __init__(
+        self,
+        budget_seconds: float,
+        high_water: float = 0.8,
+        low_water: float = 0.4,
+        min_rate: float = 0.01,
+        smoothing: float = 0.5,
+    ):
+        self.budget_seconds = float(budget_seconds)
+        self.high_water = float(high_water)
+        self.low_water = float(low_water)
+        self.min_rate = float(min_rate)
+        self.smoothing = float(smoothing)
+        self.sample_rate = 1.0
+        self.average_seconds: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.sample_rate < 1.0
+
+    def record_cycle(self, seconds: float) -> float:
+        if self.average_seconds is None:
+            self.average_seconds = seconds
+        else:
+            self.average_seconds += self.smoothing * (seconds - self.average_seconds)
+
+        load = self.average_seconds / self.budget_seconds if self.budget_seconds > 0 else 0.0
+
+        if load > self.high_water:
+            target = self.sample_rate * self.high_water / load
+            self.sample_rate = max(self.min_rate, min(self.sample_rate / 2, target))
+        elif load < self.low_water and self.sample_rate < 1.0:
+            self.sample_rate = min(1.0, self.sample_rate * 2)
+            # start from a fresh estimate so the next cycle at the new rate decides
+            self.average_seconds = None
+
+        return self.sample_rate
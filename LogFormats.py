@@ -0,0 +1,175 @@
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+_MONTHS = {
+    name: number
+    for number, name in enumerate(
+        (b"Jan", b"Feb", b"Mar", b"Apr", b"May", b"Jun", b"Jul", b"Aug", b"Sep", b"Oct", b"Nov", b"Dec"), 1
+    )
+}
+
+FIELDS = ("ip", "datetime", "request", "status", "bytes_received", "bytes_sent", "user_agent")
+
+_DIRECTIVE = re.compile(r"%(?:\{([^}]*)\})?[<>]?([a-zA-Z%])")
+
+_NAMED = {
+    "h": "ip",
+    "a": "ip",
+    "r": "request",
+    "s": "status",
+    "b": "bytes_sent",
+    "B": "bytes_sent",
+    "O": "bytes_sent",
+    "I": "bytes_received",
+    "v": "vhost",
+    "V": "vhost",
+}
+
+_HEADERS = {
+    "user-agent": "user_agent",
+    "referer": "referer",
+}
+
+
+def decode_clf_time(raw: bytes) -> datetime:
+    # 10/Oct/2026:13:55:36 +0000
+    dt = datetime(
+        int(raw[7:11]), _MONTHS[raw[3:6]], int(raw[0:2]),
+        int(raw[12:14]), int(raw[15:17]), int(raw[18:20]),
+    )
+    if len(raw) < 26:
+        return dt
+    offset = int(raw[22:24]) * 60 + int(raw[24:26])
+    if raw[21:22] == b"-":
+        offset = -offset
+    utc = dt - timedelta(minutes=offset)
+    return datetime.fromtimestamp((utc - _EPOCH).total_seconds())
+
+
+def decode_dmy_time(raw: bytes) -> datetime:
+    # 10-10-2026 13:55:36
+    return datetime(
+        int(raw[6:10]), int(raw[3:5]), int(raw[0:2]),
+        int(raw[11:13]), int(raw[14:16]), int(raw[17:19]),
+    )
+
+
+def strftime_decoder(fmt: str) -> Callable[[bytes], datetime]:
+    if fmt == "%d-%m-%Y %H:%M:%S":
+        return decode_dmy_time
+    return lambda raw: datetime.strptime(raw.decode("ascii", errors="replace"), fmt)
+
+
+class LogFormat:
+
+    def __init__(self, name: str, format_string: str):
+        self.name = name
+        self.format_string = format_string
+        self.decode_time: Callable[[bytes], datetime] = decode_clf_time
+        self.fields: List[str] = []
+        self.pattern = re.compile(self._compile(format_string).encode())
+        self.ip_first = format_string.startswith(("%h", "%a"))
+        self.match = self.pattern.match
+
+    def _field(self, name: Optional[str], value: str) -> str:
+        if name is None or name in self.fields:
+            return f"(?:{value})"
+        self.fields.append(name)
+        return f"(?P<{name}>{value})"
+
+    def _compile(self, format_string: str) -> str:
+        parts = [r"[ \t]*"]
+        pos = 0
+        for directive in _DIRECTIVE.finditer(format_string):
+            literal = format_string[pos:directive.start()]
+            parts.append(re.sub(r"(\\ )+", r"\\s+", re.escape(literal)))
+            pos = directive.end()
+
+            argument, code = directive.groups()
+            quoted = literal.endswith('"') and format_string[pos:pos + 1] == '"'
+            anything = r'[^"]*' if quoted else r"\S+"
+
+            if code == "%":
+                parts.append("%")
+            elif code == "t":
+                if argument:
+                    self.decode_time = strftime_decoder(argument)
+                    parts.append(self._field("datetime", anything))
+                else:
+                    parts.append(r"\[" + self._field("datetime", r"[^\]]+") + r"\]")
+            elif code in ("i", "o") and argument and argument.lower() in _HEADERS:
+                parts.append(self._field(_HEADERS[argument.lower()], anything))
+            elif code == "s":
+                parts.append(self._field("status", r"\d+"))
+            elif code in ("b", "O", "I"):
+                parts.append(self._field(_NAMED[code], r"\d+|-"))
+            else:
+                parts.append(self._field(_NAMED.get(code) if not argument else None, anything))
+        parts.append(re.sub(r"(\\ )+", r"\\s+", re.escape(format_string[pos:])))
+
+        if "datetime" not in self.fields or "ip" not in self.fields:
+            raise ValueError(f"Log format {self.name!r} needs %h and %t: {format_string}")
+        # absent fields still get an (empty) group so every format yields the same tuple
+        for name in FIELDS:
+            if name not in self.fields:
+                parts.append(f"(?P<{name}>)")
+        return "".join(parts)
+
+    def parse(self, data: bytes, pos: int = 0, endpos: Optional[int] = None) -> Optional[Tuple]:
+        match = self.match(data, pos, len(data) if endpos is None else endpos)
+        if match is None:
+            return None
+        return fields(match)
+
+    def __repr__(self) -> str:
+        return f"LogFormat({self.name!r}, {self.format_string!r})"
+
+
+def fields(match) -> Tuple:
+    ip, raw_date, request, status, received, sent, user_agent = match.group(*FIELDS)
+    return (
+        ip, raw_date, request, int(status) if status else 0,
+        int(received) if received.isdigit() else 0,
+        int(sent) if sent.isdigit() else 0,
+        user_agent or b"-",
+    )
+
+
+FORMATS: Dict[str, LogFormat] = {}
+
+
+def register_format(name: str, format_string: str) -> LogFormat:
+    log_format = FORMATS[name] = LogFormat(name, format_string)
+    return log_format
+
+
+register_format("custom", '%h "%{%d-%m-%Y %H:%M:%S}t" "%r" %>s %I %O "%{User-Agent}i"')
+register_format("combined", '%h %l %u %t "%r" %>s %b "%{Referer}i" "%{User-Agent}i"')
+register_format("vhost_combined", '%v:%p %h %l %u %t "%r" %>s %O "%{Referer}i" "%{User-Agent}i"')
+register_format("common", '%h %l %u %t "%r" %>s %b')
+
+DEFAULT_FORMAT = "custom"
+
+
+def detect_format(lines: Sequence[bytes], formats: Optional[Sequence[LogFormat]] = None) -> Optional[LogFormat]:
+    best = None
+    best_key = (0, 0)
+    for log_format in formats or FORMATS.values():
+        score = 0
+        for line in lines:
+            parsed = log_format.parse(line)
+            if parsed is None:
+                continue
+            try:
+                log_format.decode_time(parsed[1])
+            except (ValueError, KeyError):
+                continue
+            score += 1
+        key = (score, len(log_format.fields))
+        if score and key > best_key:
+            best, best_key = log_format, key
+    return best
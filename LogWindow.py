@@ -0,0 +1,169 @@
+from array import array
+from collections import deque
+from datetime import datetime
+from heapq import merge
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from AccessLog import AccessLog
+from SymbolTable import SymbolTable
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class LogWindow:
+
+    def __init__(self):
+        self._rows: List[AccessLog] = []
+        self._head = 0
+        self._base = 0
+        self._by_status: Dict[int, Deque[int]] = {}
+        self._by_ip: Dict[str, Deque[int]] = {}
+        self._epochs = array("q")
+        self._ip_codes = array("q")
+        self._bytes_sent = array("q")
+        self._weights = array("d")
+        self._vhost_codes = array("q")
+        self._last_timestamp: Optional[datetime] = None
+        self._last_epoch = 0
+        self.ips_table = SymbolTable()
+        self.dates_table = SymbolTable()
+        self.requests_table = SymbolTable()
+        self.user_agents_table = SymbolTable()
+        self.vhosts_table = SymbolTable()
+
+    def __len__(self) -> int:
+        return len(self._rows) - self._head
+
+    def __iter__(self) -> Iterator[AccessLog]:
+        rows = self._rows
+        for i in range(self._head, len(rows)):
+            yield rows[i]
+
+    def row(self, row_id: int) -> AccessLog:
+        return self._rows[row_id - self._base]
+
+    @property
+    def next_id(self) -> int:
+        return self._base + len(self._rows)
+
+    def since(self, row_id: int) -> Iterator[AccessLog]:
+        rows = self._rows
+        for i in range(max(row_id - self._base, self._head), len(rows)):
+            yield rows[i]
+
+    def append(self, log: AccessLog) -> int:
+        row_id = self._base + len(self._rows)
+        self._rows.append(log)
+
+        ids = self._by_status.get(log.http_status_code)
+        if ids is None:
+            ids = self._by_status[log.http_status_code] = deque()
+        ids.append(row_id)
+
+        ids = self._by_ip.get(log.source_ip)
+        if ids is None:
+            ids = self._by_ip[log.source_ip] = deque()
+        ids.append(row_id)
+
+        timestamp = log.timestamp
+        if timestamp is not self._last_timestamp:
+            self._last_timestamp = timestamp
+            self._last_epoch = int((timestamp - _EPOCH).total_seconds()) if timestamp is not None else 0
+        self._epochs.append(self._last_epoch)
+        code = self.ips_table.code(log.source_ip)
+        if code is None:
+            code = self.ips_table.acquire(log.source_ip)
+        self._ip_codes.append(code)
+        self._bytes_sent.append(int(log.bytes_sent))
+        self._weights.append(log.weight)
+        vhost = log.vhost
+        if vhost is None:
+            self._vhost_codes.append(-1)
+        else:
+            self._vhost_codes.append(self.vhosts_table.acquire(vhost))
+
+        return row_id
+
+    @staticmethod
+    def _drop_index(index: Dict, key):
+        ids = index[key]
+        ids.popleft()
+        if not ids:
+            del index[key]
+
+    def _release(self, log: AccessLog):
+        self.ips_table.release(log.source_ip)
+        self.dates_table.release(log.date)
+        self.requests_table.release(log.first_line_of_request)
+        self.user_agents_table.release(log.user_agent)
+        if log.vhost is not None:
+            self.vhosts_table.release(log.vhost)
+
+    def expire(self, cutoff: datetime) -> int:
+        rows = self._rows
+        expired = 0
+
+        while self._head < len(rows):
+            log = rows[self._head]
+            if log.timestamp is not None and log.timestamp >= cutoff:
+                break
+            self._drop_index(self._by_status, log.http_status_code)
+            self._drop_index(self._by_ip, log.source_ip)
+            self._release(log)
+            rows[self._head] = None
+            self._head += 1
+            expired += 1
+
+        if self._head and self._head * 2 >= len(rows):
+            del rows[: self._head]
+            for column in (self._epochs, self._ip_codes, self._bytes_sent, self._weights, self._vhost_codes):
+                del column[: self._head]
+            self._base += self._head
+            self._head = 0
+
+        return expired
+
+    def clear(self):
+        self.__init__()
+
+    def statuses(self) -> List[int]:
+        return list(self._by_status)
+
+    def status_count(self, *codes: int) -> int:
+        return sum(len(self._by_status.get(code, ())) for code in codes)
+
+    def by_status(self, *codes: int) -> Iterator[AccessLog]:
+        id_lists = [self._by_status[code] for code in codes if code in self._by_status]
+        if not id_lists:
+            return
+        row_ids = id_lists[0] if len(id_lists) == 1 else merge(*id_lists)
+        rows, base = self._rows, self._base
+        for row_id in row_ids:
+            yield rows[row_id - base]
+
+    def columns(self) -> Tuple[array, array, array, array]:
+        head = self._head
+        return (
+            self._epochs[head:],
+            self._ip_codes[head:],
+            self._bytes_sent[head:],
+            self._weights[head:],
+        )
+
+    def vhost_codes(self) -> array:
+        return self._vhost_codes[self._head:]
+
+    def vhosts(self) -> List[str]:
+        return self.vhosts_table.values()
+
+    def rows_for_ip(self, ip: str) -> List[AccessLog]:
+        rows, base = self._rows, self._base
+        return [rows[row_id - base] for row_id in self._by_ip.get(ip, ())]
+
+    def ips(self) -> List[str]:
+        return list(self._by_ip)
+
+    def by_ip(self) -> Iterator[Tuple[str, List[AccessLog]]]:
+        rows, base = self._rows, self._base
+        for ip, ids in self._by_ip.items():
+            yield ip, [rows[row_id - base] for row_id in ids]
@@ -0,0 +1,135 @@
+import gc
+import os
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Iterator, List, Tuple
+
+
+def process_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux; it is the closest fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+class MemoryGuard:
+
+    def __init__(
+        self,
+        budget_bytes: int = 512 * 1024 * 1024,
+        sample_every: int = 10,
+        top_sites: int = 5,
+        frames: int = 1,
+        low_water: float = 0.8,
+        evict_fraction: float = 0.25,
+    ):
+        self.budget_bytes = int(budget_bytes)
+        self.sample_every = max(1, int(sample_every))
+        self.top_sites = int(top_sites)
+        self.frames = int(frames)
+        self.low_water = float(low_water)
+        self.evict_fraction = float(evict_fraction)
+        self.peaks: Dict[str, int] = {}
+        self.sites: Dict[str, List[Tuple[str, int]]] = {}
+        self.actions: List[str] = []
+        self.skip_charts = False
+        self.sampling = False
+        self._cycle = 0
+        self._started_tracing = False
+        self._sample_sizes: Dict[Tuple[int, str], Tuple[object, str, int]] = {}
+
+    def start_cycle(self):
+        self._cycle += 1
+        self.sampling = self._cycle % self.sample_every == 1 or self.sample_every == 1
+        if self.sampling and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+
+    def end_cycle(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.sampling = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.sampling or not tracemalloc.is_tracing():
+            yield
+            return
+        before = tracemalloc.take_snapshot()
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            self.peaks[name] = max(0, peak - baseline)
+            self.sites[name] = [
+                (str(stat.traceback[0]), stat.size_diff)
+                for stat in after.compare_to(before, "lineno")[: self.top_sites]
+                if stat.size_diff > 0
+            ]
+
+    def usage(self) -> int:
+        return process_rss()
+
+    def over_budget(self) -> bool:
+        return self.usage() > self.budget_bytes
+
+    def _shrink(self, owner, attr: str):
+        value = getattr(owner, attr)
+        self._sample_sizes.setdefault((id(owner), attr), (owner, attr, value))
+        setattr(owner, attr, max(1, value // 2))
+
+    def enforce(self, window=None, detectors=()) -> List[str]:
+        self.actions = []
+        usage = self.usage()
+
+        if usage <= self.budget_bytes:
+            if usage <= self.budget_bytes * self.low_water and (self._sample_sizes or self.skip_charts):
+                for owner, attr, value in self._sample_sizes.values():
+                    setattr(owner, attr, value)
+                self._sample_sizes = {}
+                self.skip_charts = False
+                self.actions.append("restored sample sizes and charts")
+            return self.actions
+
+        if window is not None and len(window) > 1:
+            oldest = next(iter(window)).timestamp
+            newest = window.row(window.next_id - 1).timestamp
+            if oldest is not None and newest is not None and newest > oldest:
+                cutoff = oldest + timedelta(seconds=(newest - oldest).total_seconds() * self.evict_fraction)
+                evicted = window.expire(cutoff)
+                if evicted:
+                    self.actions.append(f"evicted {evicted} oldest window rows")
+
+        for detector in detectors:
+            for attr in ("sample_lines_per_ip", "sample_size"):
+                if hasattr(detector, attr) and getattr(detector, attr) > 1:
+                    self._shrink(detector, attr)
+                    self.actions.append(f"halved {type(detector).__name__}.{attr} to {getattr(detector, attr)}")
+
+        if not self.skip_charts:
+            self.skip_charts = True
+            self.actions.append("skipping chart rendering")
+
+        gc.collect()
+        return self.actions
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "budget_bytes": self.budget_bytes,
+            "rss_bytes": self.usage(),
+            "stage_peaks": dict(self.peaks),
+            "top_sites": {stage: list(sites) for stage, sites in self.sites.items()},
+            "actions": list(self.actions),
+        }
@@ -0,0 +1,98 @@
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+_UUID = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+_TOKEN = re.compile(r"[A-Za-z0-9]+")
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+WILDCARD = "{*}"
+
+
+def _replace_token(match) -> str:
+    token = match.group(0)
+    if token.isdigit():
+        return "{n}"
+    has_digit = any(c.isdigit() for c in token)
+    if len(token) >= 8 and has_digit and all(c in _HEX_DIGITS for c in token):
+        return "{hex}"
+    if len(token) >= 16 and has_digit and not token.isalpha():
+        return "{id}"
+    return token
+
+
+def normalize_path(path: str) -> str:
+    path = path.split("?", 1)[0].split("#", 1)[0]
+    path = _UUID.sub("{uuid}", path)
+    return _TOKEN.sub(_replace_token, path)
+
+
+class PathTemplateTrie:
+
+    def __init__(self, max_templates: int = 1000, max_children: int = 100, max_ips_per_template: int = 1000):
+        self.max_templates = int(max_templates)
+        self.max_children = int(max_children)
+        self.max_ips_per_template = int(max_ips_per_template)
+        self.evicted = 0
+        self._root: Dict[str, Any] = {"children": {}, "stats": None}
+        self._lru: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _walk(self, segments: List[str]) -> Tuple[Tuple[str, ...], Dict[str, Any]]:
+        node = self._root
+        key = []
+        for segment in segments:
+            children = node["children"]
+            child = children.get(segment)
+            if child is None:
+                if len(children) >= self.max_children:
+                    segment = WILDCARD
+                    child = children.get(segment)
+                if child is None:
+                    child = children[segment] = {"children": {}, "stats": None}
+            key.append(segment)
+            node = child
+        return tuple(key), node
+
+    def _remove(self, key: Tuple[str, ...]):
+        path = [self._root]
+        for segment in key:
+            path.append(path[-1]["children"][segment])
+        path[-1]["stats"] = None
+        for depth in range(len(key), 0, -1):
+            node = path[depth]
+            if node["stats"] is not None or node["children"]:
+                break
+            del path[depth - 1]["children"][key[depth - 1]]
+
+    def add(self, path: str, ip: Optional[str] = None, count: float = 1) -> str:
+        key, node = self._walk(normalize_path(path).split("/"))
+        stats = node["stats"]
+        if stats is None:
+            stats = node["stats"] = {"count": 0, "ips": set(), "example": path}
+            self._lru[key] = stats
+            if len(self._lru) > self.max_templates:
+                oldest, _ = self._lru.popitem(last=False)
+                self._remove(oldest)
+                self.evicted += 1
+        else:
+            self._lru.move_to_end(key)
+        stats["count"] += count
+        if ip is not None and len(stats["ips"]) < self.max_ips_per_template:
+            stats["ips"].add(ip)
+        return "/".join(key)
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self._lru.items(), key=lambda item: item[1]["count"], reverse=True)[:n]
+        return [
+            {
+                "template": "/".join(key),
+                "count": stats["count"],
+                "unique_ips": len(stats["ips"]),
+                "ips_capped": len(stats["ips"]) >= self.max_ips_per_template,
+                "example": stats["example"],
+            }
+            for key, stats in ranked
+        ]
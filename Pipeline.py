@@ -0,0 +1,502 @@
+import multiprocessing
+import os
+import queue
+import struct
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from AccessLog import AccessLog
+from AccessLogReader import LogReader
+from LogWindow import LogWindow
+from UserAgentClassifier import UserAgentClassifier, load_signatures
+from Checkpoint import save_checkpoint, load_checkpoint
+from Metrics import MetricsRegistry, MetricsFileWriter
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+# timestamp, weight, bytes received, bytes sent, status, ip, date, request, user agent, vhost
+RECORD = struct.Struct("<ddqqH46s32s256s192s64s")
+HEADER = struct.Struct("<QQQ")
+_SEQ = struct.Struct("<Q")
+# longer values are cut to their slot in RECORD, the writer counts how often
+TRUNCATED_FIELDS = {"request": 256, "user_agent": 192, "vhost": 64}
+_TRUNCATED = struct.Struct("<" + "Q" * len(TRUNCATED_FIELDS))
+# one slot per reader: cursor + 1 (0 when detached), records lost so far
+_SLOT = struct.Struct("<QQ")
+MAX_READERS = 8
+_SLOTS = HEADER.size + _TRUNCATED.size
+_DATA = _SLOTS + MAX_READERS * _SLOT.size
+
+
+class RingBuffer:
+
+    def __init__(self, name: Optional[str] = None, capacity: int = 65536, create: bool = False):
+        from multiprocessing import shared_memory
+
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=_DATA + capacity * RECORD.size)
+            HEADER.pack_into(self._shm.buf, 0, 0, capacity, RECORD.size)
+        else:
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self._shm = shared_memory.SharedMemory(name=name)
+            _, capacity, record_size = HEADER.unpack_from(self._shm.buf, 0)
+            if record_size != RECORD.size:
+                raise ValueError(f"Ring buffer {name} holds {record_size}-byte records, expected {RECORD.size}")
+        self.name = self._shm.name
+        self.capacity = int(capacity)
+        # the writer publishes at least this often, so readers know which slots may be rewritten
+        self.chunk = max(1, self.capacity // 16)
+
+    @property
+    def write_seq(self) -> int:
+        return _SEQ.unpack_from(self._shm.buf, 0)[0]
+
+    def oldest_seq(self) -> int:
+        return max(0, self.write_seq + self.chunk - self.capacity)
+
+    def _slot_offset(self, slot: int) -> int:
+        if not 0 <= slot < MAX_READERS:
+            raise ValueError(f"Reader slot {slot} is out of range, the ring buffer has {MAX_READERS}")
+        return _SLOTS + slot * _SLOT.size
+
+    def cursor(self, slot: int) -> Optional[int]:
+        cursor, _ = _SLOT.unpack_from(self._shm.buf, self._slot_offset(slot))
+        return cursor - 1 if cursor else None
+
+    def lost(self, slot: int) -> int:
+        return _SLOT.unpack_from(self._shm.buf, self._slot_offset(slot))[1]
+
+    def ack(self, slot: int, seq: int, lost: int = 0):
+        offset = self._slot_offset(slot)
+        _, total = _SLOT.unpack_from(self._shm.buf, offset)
+        _SLOT.pack_into(self._shm.buf, offset, seq + 1, total + lost)
+
+    def detach(self, slot: int):
+        _SEQ.pack_into(self._shm.buf, self._slot_offset(slot), 0)
+
+    @property
+    def truncated(self) -> Dict[str, int]:
+        return dict(zip(TRUNCATED_FIELDS, _TRUNCATED.unpack_from(self._shm.buf, HEADER.size)))
+
+    def add_truncated(self, counts: Dict[str, int]):
+        totals = self.truncated
+        _TRUNCATED.pack_into(self._shm.buf, HEADER.size, *(totals[name] + counts.get(name, 0) for name in TRUNCATED_FIELDS))
+
+    def _write_limit(self) -> int:
+        cursors = [cursor - 1 for cursor, _ in _SLOT.iter_unpack(self._shm.buf[_SLOTS:_DATA]) if cursor]
+        if not cursors:
+            return sys.maxsize
+        return min(cursors) + self.capacity - self.chunk
+
+    def _wait_for_readers(self, seq: int, max_wait: float) -> int:
+        deadline = time.monotonic() + max_wait
+        limit = self._write_limit()
+        while seq >= limit:
+            if time.monotonic() >= deadline:
+                # a reader is stuck; overwrite rather than stall ingest, the reader counts the loss
+                return sys.maxsize
+            time.sleep(0.01)
+            limit = self._write_limit()
+        return limit
+
+    def push(self, records: Iterable[Tuple], max_wait: float = 30.0) -> int:
+        buf = self._shm.buf
+        pack_into = RECORD.pack_into
+        seq = start = self.write_seq
+        limit = self._write_limit()
+        for record in records:
+            if seq >= limit:
+                _SEQ.pack_into(buf, 0, seq)
+                limit = self._wait_for_readers(seq, max_wait)
+            pack_into(buf, _DATA + (seq % self.capacity) * RECORD.size, *record)
+            seq += 1
+            if (seq - start) % self.chunk == 0:
+                _SEQ.pack_into(buf, 0, seq)
+        _SEQ.pack_into(buf, 0, seq)
+        return seq - start
+
+    def read(self, seq: int) -> Tuple[List[Tuple], int, int]:
+        buf = self._shm.buf
+        end = self.write_seq
+        begin = max(seq, end + self.chunk - self.capacity)
+        if begin >= end:
+            return [], max(seq, end), max(0, begin - seq)
+
+        first = begin % self.capacity
+        last = first + (end - begin)
+        if last <= self.capacity:
+            data = bytes(buf[_DATA + first * RECORD.size:_DATA + last * RECORD.size])
+        else:
+            data = (
+                bytes(buf[_DATA + first * RECORD.size:_DATA + self.capacity * RECORD.size])
+                + bytes(buf[_DATA:_DATA + (last - self.capacity) * RECORD.size])
+            )
+        records = list(RECORD.iter_unpack(data))
+
+        # drop anything the writer may have rewritten while it was being copied
+        overwritten = self.write_seq + self.chunk - self.capacity - begin
+        if overwritten > 0:
+            del records[:overwritten]
+        return records, end, max(0, begin - seq) + max(0, overwritten)
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+def _encode(value: Optional[str], cache: Dict[str, bytes]) -> bytes:
+    if value is None:
+        return b""
+    encoded = cache.get(value)
+    if encoded is None:
+        encoded = cache[value] = value.encode("utf-8", errors="replace")
+    return encoded
+
+
+def to_record(log: AccessLog, cache: Dict[str, bytes], truncated: Optional[Dict[str, int]] = None) -> Tuple:
+    request = _encode(log.first_line_of_request, cache)
+    user_agent = _encode(log.user_agent, cache)
+    vhost = _encode(log.vhost, cache)
+    if truncated is not None:
+        for name, value in (("request", request), ("user_agent", user_agent), ("vhost", vhost)):
+            if len(value) > TRUNCATED_FIELDS[name]:
+                truncated[name] = truncated.get(name, 0) + 1
+    return (
+        (log.timestamp - _EPOCH).total_seconds(),
+        float(log.weight),
+        int(log.bytes_received),
+        int(log.bytes_sent),
+        int(log.http_status_code),
+        _encode(log.source_ip, cache),
+        _encode(log.date, cache),
+        request,
+        user_agent,
+        vhost,
+    )
+
+
+def append_records(window: LogWindow, records: Sequence[Tuple], classifier: UserAgentClassifier) -> int:
+    last_epoch = None
+    timestamp = None
+    for epoch, weight, received, sent, status, ip, date, request, user_agent, vhost in records:
+        if epoch != last_epoch:
+            last_epoch = epoch
+            timestamp = _EPOCH + timedelta(seconds=epoch)
+        user_agent = window.user_agents_table.intern_bytes(user_agent.rstrip(b"\0"))
+        vhost = vhost.rstrip(b"\0")
+        window.append(AccessLog(
+            source_ip=window.ips_table.intern_bytes(ip.rstrip(b"\0")),
+            date=window.dates_table.intern_bytes(date.rstrip(b"\0")),
+            first_line_of_request=window.requests_table.intern_bytes(request.rstrip(b"\0")),
+            http_status_code=status,
+            bytes_received=received,
+            bytes_sent=sent,
+            user_agent=user_agent,
+            timestamp=timestamp,
+            ua_category=classifier.classify(user_agent),
+            weight=int(weight) if weight == 1 else weight,
+            vhost=vhost.decode("utf-8", errors="replace") if vhost else None,
+        ))
+    return len(records)
+
+
+def ingest_worker(
+    ring_name: str,
+    log_dir: Optional[str],
+    window_minutes: int,
+    interval: float,
+    state_path: Optional[str],
+    sources: Optional[Sequence[str]] = None,
+    max_wait: float = 30.0,
+):
+    ring = RingBuffer(ring_name)
+    reader = LogReader(log_dir, sources=sources)
+    state = load_checkpoint(state_path) if state_path else None
+    if state is not None:
+        reader.restore_state(state)
+        reader.window.clear()
+
+    while True:
+        window = reader.load_logs_for_minutes(window_minutes)
+        cache: Dict[str, bytes] = {}
+        truncated: Dict[str, int] = {}
+        pushed = ring.push((to_record(log, cache, truncated) for log in window), max_wait)
+        window.clear()
+        if truncated:
+            ring.add_truncated(truncated)
+        if state_path:
+            save_checkpoint(state_path, reader.get_state())
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Ingested {pushed} logs")
+        time.sleep(interval)
+
+
+def _build_detectors(names: Sequence[str]) -> Dict[str, Any]:
+    from DoSDetector import DoSDetector
+    from DetectHttpNotFoundError import DetectHttpNotFoundError
+    from DetectHttpAuthError import DetectHttpAuthError
+
+    factories = {"dos": DoSDetector, "404": DetectHttpNotFoundError, "auth": DetectHttpAuthError}
+    return {name: factories[name]() for name in names}
+
+
+def _has_issue(name: str, analysis: Dict[str, Any]) -> bool:
+    if name == "dos":
+        return bool(analysis.get("offending") or analysis.get("offending_subnets"))
+    stats = analysis.get("stats", {})
+    return stats.get("total_404_errors", 0) > 0 or stats.get("total_401_403_errors", 0) > 0
+
+
+def detector_worker(
+    ring_name: str,
+    slot: int,
+    names: Sequence[str],
+    window_minutes: int,
+    interval: float,
+    report_cooldown: float,
+    poll: float = 0.1,
+    ua_signatures: Optional[str] = None,
+    reports=None,
+):
+    ring = RingBuffer(ring_name)
+    detectors = _build_detectors(names)
+    classifier = UserAgentClassifier(load_signatures(ua_signatures) if ua_signatures else None)
+    window = LogWindow()
+    seq = ring.cursor(slot)
+    if seq is None:
+        seq = ring.oldest_seq()
+    ring.ack(slot, seq)
+    last_report_time = 0.0
+    last_analysis_time = 0.0
+    received = lost_total = 0
+
+    while True:
+        # drain the ring between analyses so bursts are read before the writer wraps around
+        records, seq, lost = ring.read(seq)
+        ring.ack(slot, seq, lost)
+        append_records(window, records, classifier)
+        received += len(records)
+        lost_total += lost
+        if time.time() - last_analysis_time < interval:
+            time.sleep(poll)
+            continue
+        last_analysis_time = time.time()
+        window.expire(datetime.now() - timedelta(minutes=window_minutes))
+
+        issues = []
+        for name, detector in detectors.items():
+            analysis = detector.analyze(window)
+            if _has_issue(name, analysis):
+                issues.append((detector, analysis))
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] {'/'.join(names)}: {len(window)} logs in window, "
+            f"{received} new, {lost_total} lost, {len(issues)} with issues"
+        )
+        received = lost_total = 0
+        if issues and time.time() - last_report_time >= report_cooldown:
+            paths = [detector.generate_html_report(analysis) for detector, analysis in issues]
+            if reports is not None:
+                # the parent combines the groups' reports and mails them once
+                reports.put(paths)
+            last_report_time = time.time()
+
+
+class Pipeline:
+
+    def __init__(
+        self,
+        log_dir: Optional[str] = None,
+        capacity: int = 65536,
+        detector_groups: Sequence[Sequence[str]] = (("dos",), ("404", "auth")),
+        window_minutes: int = 15,
+        interval: float = 60,
+        report_cooldown: float = 900,
+        state_path: Optional[str] = "ingest-state.ckpt",
+        max_restarts: int = 10,
+        sources: Optional[Sequence[str]] = None,
+        read_poll: float = 0.1,
+        max_wait: float = 30.0,
+        metrics: Optional[MetricsRegistry] = None,
+        metrics_file: Optional[str] = "pipeline-metrics.prom",
+        ua_signatures: Optional[str] = None,
+        mail_receivers: Optional[Sequence[str]] = None,
+        report_delay: float = 5.0,
+    ):
+        self.log_dir = log_dir
+        self.capacity = int(capacity)
+        self.detector_groups = [tuple(group) for group in detector_groups]
+        self.window_minutes = int(window_minutes)
+        self.interval = float(interval)
+        self.report_cooldown = float(report_cooldown)
+        self.state_path = state_path
+        self.max_restarts = int(max_restarts)
+        self.sources = list(sources) if sources else None
+        self.read_poll = float(read_poll)
+        self.max_wait = float(max_wait)
+        if len(self.detector_groups) > MAX_READERS:
+            raise ValueError(f"At most {MAX_READERS} detector groups can share a ring buffer")
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.metrics_file = metrics_file
+        self.ua_signatures = ua_signatures
+        self.mail_receivers = list(mail_receivers or [])
+        self.report_delay = float(report_delay)
+        self.ring: Optional[RingBuffer] = None
+        self.restarts: Dict[str, int] = {}
+        self._workers: Dict[str, Tuple[Any, Tuple, Any]] = {}
+        self._slots: Dict[str, int] = {}
+        self._lost: Dict[str, int] = {}
+        self._truncated: Dict[str, int] = {}
+        self._reports = None
+        self._pending: List[str] = []
+        self._pending_at = 0.0
+
+    def _spawn(self, name: str, target, args: Tuple):
+        process = multiprocessing.Process(target=target, args=args, name=name, daemon=True)
+        process.start()
+        self._workers[name] = (target, args, process)
+
+    def start(self):
+        self.ring = RingBuffer(capacity=self.capacity, create=True)
+        self._reports = multiprocessing.Queue()
+        # readers are registered before ingest starts, so the first burst already waits for them
+        for slot, group in enumerate(self.detector_groups):
+            self._slots["detector-" + "-".join(group)] = slot
+            self.ring.ack(slot, 0)
+        self._spawn(
+            "ingest",
+            ingest_worker,
+            (self.ring.name, self.log_dir, self.window_minutes, self.interval, self.state_path, self.sources, self.max_wait),
+        )
+        for slot, group in enumerate(self.detector_groups):
+            self._spawn(
+                "detector-" + "-".join(group),
+                detector_worker,
+                (self.ring.name, slot, group, self.window_minutes, self.interval, self.report_cooldown, self.read_poll,
+                 self.ua_signatures, self._reports),
+            )
+
+    def check(self) -> List[str]:
+        restarted = []
+        for name, (target, args, process) in list(self._workers.items()):
+            if process.is_alive():
+                continue
+            count = self.restarts.get(name, 0)
+            if count >= self.max_restarts:
+                if name in self._slots and self.ring.cursor(self._slots[name]) is not None:
+                    # stop holding the writer back for a reader that will not come back
+                    self.ring.detach(self._slots[name])
+                continue
+            print(f"Worker {name} exited with code {process.exitcode}, restarting ({count + 1}/{self.max_restarts})")
+            self.restarts[name] = count + 1
+            self._spawn(name, target, args)
+            restarted.append(name)
+        return restarted
+
+    def record_loss(self) -> Dict[str, int]:
+        lost = {}
+        write_seq = self.ring.write_seq
+        for name, slot in self._slots.items():
+            total = self.ring.lost(slot)
+            delta = total - self._lost.get(name, 0)
+            self._lost[name] = total
+            cursor = self.ring.cursor(slot)
+            if cursor is not None:
+                self.metrics.set("ring_reader_lag", write_seq - cursor, labels={"group": name},
+                                 help_text="Records written to the ring buffer but not yet read by a detector group.")
+            if delta > 0:
+                lost[name] = delta
+                self.metrics.inc("ring_lost_records_total", delta, labels={"group": name},
+                                 help_text="Records overwritten in the ring buffer before a detector group read them.")
+                print(f"Warning: {name} fell behind and lost {delta} records from the ring buffer")
+        return lost
+
+    def record_truncation(self) -> Dict[str, int]:
+        truncated = {}
+        for name, total in self.ring.truncated.items():
+            delta = total - self._truncated.get(name, 0)
+            self._truncated[name] = total
+            if delta > 0:
+                truncated[name] = delta
+                self.metrics.inc("ring_truncated_fields_total", delta, labels={"field": name},
+                                 help_text="Field values cut to their fixed size in the ring buffer record.")
+        return truncated
+
+    def collect_reports(self) -> List[str]:
+        while True:
+            try:
+                paths = self._reports.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.extend(paths)
+            self._pending_at = time.time()
+        # wait briefly so groups reporting the same incident share one e-mail
+        if not self._pending or time.time() - self._pending_at < self.report_delay:
+            return []
+        paths, self._pending = self._pending, []
+        self.send_reports(paths)
+        return paths
+
+    def send_reports(self, paths: Sequence[str]) -> str:
+        report_path = f"report{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+        try:
+            import Report
+            Report.main(report_path)
+        except Exception as e:
+            print(f"Error while building the combined report: {e}")
+        if self.mail_receivers:
+            from MailSender import send_email
+            for receiver in self.mail_receivers:
+                send_email(
+                    receiver_email=receiver,
+                    subject=f"Raport Apache2 {datetime.now()}",
+                    body="Wykryto nieprawidłowości! W załącznikach znajduje się zbiorczy raport oraz najnowsze szczegółowe raporty.",
+                    attachments=[report_path, *paths])
+            self.metrics.inc("reports_sent_total", help_text="Number of report e-mails rounds sent.")
+        return report_path
+
+    def stop(self):
+        for _, _, process in self._workers.values():
+            if process.is_alive():
+                process.terminate()
+        for _, _, process in self._workers.values():
+            process.join(timeout=5)
+        self._workers = {}
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+        if self._reports is not None:
+            self._reports.close()
+            self._reports = None
+
+    def run(self, poll: float = 1.0):
+        self.start()
+        print(f"Pipeline running with ring buffer {self.ring.name} ({self.capacity} records)...")
+        writer = MetricsFileWriter(self.metrics, self.metrics_file) if self.metrics_file else None
+        last_write = time.time()
+        try:
+            while True:
+                time.sleep(poll)
+                self.check()
+                self.record_loss()
+                self.record_truncation()
+                self.collect_reports()
+                if writer is not None and time.time() - last_write >= self.interval:
+                    writer.write()
+                    last_write = time.time()
+        finally:
+            self.stop()
+
+
+if __name__ == "__main__":
+    receivers = None
+    if os.path.isfile("mail_recievers.txt"):
+        with open("mail_recievers.txt") as f:
+            receivers = [mail.strip() for mail in f if mail.strip()]
+    Pipeline(log_dir=sys.argv[1] if len(sys.argv) > 1 else None, mail_receivers=receivers).run()
@@ -0,0 +1,255 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from AccessLog import AccessLog
+
+
+SECTIONS = ("dos", "404", "auth", "resources")
+
+TITLES = {
+    "dos": "DoS Offenders",
+    "404": "404 Errors",
+    "auth": "401/403 Errors",
+    "resources": "Resource Usage",
+}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, AccessLog):
+        return {
+            "ip": value.source_ip,
+            "date": value.date,
+            "request": value.first_line_of_request,
+            "status": value.http_status_code,
+            "bytes_received": value.bytes_received,
+            "bytes_sent": value.bytes_sent,
+            "user_agent": value.user_agent,
+            "ua_category": value.ua_category,
+            "vhost": value.vhost,
+        }
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def _table(headers: List[str], rows: List[List[Any]]) -> List[str]:
+    html = ["<table>", "<tr>" + "".join(f"<th>{_escape(h)}</th>" for h in headers) + "</tr>"]
+    for row in rows:
+        html.append("<tr>" + "".join(f"<td>{_escape(cell)}</td>" for cell in row) + "</tr>")
+    html.append("</table>")
+    return html
+
+
+def _render_dos(analysis: Dict[str, Any]) -> List[str]:
+    offending = analysis.get("offending", {})
+    subnets = analysis.get("offending_subnets", {})
+    stats = analysis.get("stats", {})
+    html = [f"<p class='muted'>Logs in window: {stats.get('total_logs', 0)}, unique IPs: {stats.get('total_unique_ips', 0)}</p>"]
+
+    html.append(f"<h3>Offending IPs ({len(offending)})</h3>")
+    html.extend(_table(
+        ["IP", "Client", "Max req/min", "Total req", "Total bytes_sent", "Denylisted"],
+        [
+            [ip, info.get("ua_category") or "", info["max_requests_per_min"], info["total_requests"],
+             info["total_bytes_sent"], "yes" if info.get("denylisted") else ""]
+            for ip, info in sorted(offending.items(), key=lambda item: item[1]["total_requests"], reverse=True)
+        ],
+    ))
+    if subnets:
+        html.append(f"<h3>Offending Subnets ({len(subnets)})</h3>")
+        html.extend(_table(
+            ["Subnet", "Unique IPs", "Max req/min", "Total req", "Total bytes_sent"],
+            [
+                [network, info["unique_ips"], info["max_requests_per_min"], info["total_requests"], info["total_bytes_sent"]]
+                for network, info in subnets.items()
+            ],
+        ))
+    return html
+
+
+def _render_errors(analysis: Dict[str, Any]) -> List[str]:
+    stats = analysis.get("stats", {})
+    total = stats.get("total_404_errors", stats.get("total_401_403_errors", 0))
+    html = [f"<p class='muted'>Errors in window: {total}, unique IPs: {stats.get('unique_ips', 0)}</p>"]
+    for key, label in (("path_freq", "Path Template"), ("ip_freq", "IP"), ("type_freq", "File Type"), ("category_freq", "Client"), ("vhost_freq", "Virtual Host")):
+        entries = analysis.get(key, [])
+        if not entries:
+            continue
+        html.append(f"<h3>Top {label}s</h3>")
+        html.extend(_table([label, "Count", "Severity"], [[e["item"], e["count"], e["severity"]] for e in entries]))
+    return html
+
+
+def _render_resources(samples: List[Dict[str, Any]]) -> List[str]:
+    return _table(
+        ["Time", "CPU (%)", "Memory (MB)", "Read (KB/s)", "Write (KB/s)"],
+        [
+            [s["time"].strftime("%H:%M:%S"), f"{s['cpu']:.2f}", f"{s['memory']:.2f}", f"{s['read_kb']:.2f}", f"{s['write_kb']:.2f}"]
+            for s in reversed(samples)
+        ],
+    )
+
+
+class QueryApi:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9109, history: int = 60):
+        self.host = host
+        self.port = int(port)
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self._published_at: Optional[datetime] = None
+        self._snapshot: Dict[str, Any] = {}
+        self._resources = deque(maxlen=int(history))
+        self._cache: Dict[str, Tuple[int, bytes, str]] = {}
+        self._token = f"{int(time.time()):x}"
+        self._server = None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def publish(
+        self,
+        dos: Optional[Dict[str, Any]] = None,
+        not_found: Optional[Dict[str, Any]] = None,
+        auth: Optional[Dict[str, Any]] = None,
+        resources: Optional[Tuple[float, float, float, float]] = None,
+    ):
+        now = datetime.now()
+        with self._lock:
+            if resources is not None:
+                cpu, memory, read_kb, write_kb = resources
+                self._resources.append({"time": now, "cpu": cpu, "memory": memory, "read_kb": read_kb, "write_kb": write_kb})
+            self._snapshot = {
+                "dos": dos or {},
+                "404": not_found or {},
+                "auth": auth or {},
+                "resources": list(self._resources),
+            }
+            self._published_at = now
+            self._generation += 1
+
+    def etag(self, generation: int) -> str:
+        return f'"{self._token}-{generation}"'
+
+    def _render(self, path: str, generation: int, published_at: Optional[datetime], snapshot: Dict[str, Any]) -> Optional[Tuple[bytes, str]]:
+        if path == "/api" or path.startswith("/api/"):
+            section = path[len("/api/"):] if path != "/api" else None
+            if section is not None and section not in SECTIONS:
+                return None
+            payload = {
+                "generation": generation,
+                "published_at": published_at,
+            }
+            for name in ([section] if section else SECTIONS):
+                payload[name] = snapshot.get(name, {})
+            return json.dumps(payload, default=_json_default).encode("utf-8"), "application/json"
+
+        section = path.lstrip("/")
+        if section and section not in SECTIONS:
+            return None
+        title = TITLES[section] if section else "Apache Log Analysis"
+        generated = published_at.strftime("%Y-%m-%d %H:%M:%S") if published_at else "waiting for the first analysis"
+
+        html = []
+        html.append("<!doctype html>")
+        html.append("<html lang='en'><head><meta charset='utf-8'>")
+        html.append(f"<title>{title}</title>")
+        html.append(
+            "<style>"
+            "body{font-family:Arial,Helvetica,sans-serif;margin:20px}"
+            "table{border-collapse:collapse;width:100%;margin-bottom:20px}"
+            "th,td{border:1px solid #ddd;padding:8px;text-align:left}"
+            "th{background:#f2f2f2}"
+            ".muted{color:#666;font-size:0.9em}"
+            "</style></head><body>"
+        )
+        html.append(f"<h1>{title}</h1>")
+        html.append(f"<p class='muted'>Analysis #{generation}: {generated}</p>")
+        html.append("<p>" + " | ".join(f"<a href='/{name}'>{TITLES[name]}</a>" for name in SECTIONS) + " | <a href='/api'>JSON</a></p>")
+
+        for name in ([section] if section else SECTIONS):
+            html.append(f"<h2>{TITLES[name]}</h2>")
+            if name == "dos":
+                html.extend(_render_dos(snapshot.get(name, {})))
+            elif name == "resources":
+                html.extend(_render_resources(snapshot.get(name, [])))
+            else:
+                html.extend(_render_errors(snapshot.get(name, {})))
+
+        html.append("</body></html>")
+        return "\n".join(html).encode("utf-8"), "text/html; charset=utf-8"
+
+    def response(self, path: str) -> Optional[Tuple[bytes, str, str]]:
+        with self._lock:
+            generation, published_at, snapshot = self._generation, self._published_at, self._snapshot
+
+        with self._cache_lock:
+            cached = self._cache.get(path)
+        if cached is not None and cached[0] == generation:
+            return cached[1], cached[2], self.etag(generation)
+
+        rendered = self._render(path, generation, published_at, snapshot)
+        if rendered is None:
+            return None
+        body, content_type = rendered
+        with self._cache_lock:
+            self._cache[path] = (generation, body, content_type)
+        return body, content_type, self.etag(generation)
+
+    def start(self):
+        self._server = _make_server(self.host, self.port, self)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _make_server(host: str, port: int, api: QueryApi):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class QueryHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].rstrip("/") or "/"
+            result = api.response(path)
+            if result is None:
+                self.send_error(404)
+                return
+            body, content_type, etag = result
+
+            if_none_match = self.headers.get("If-None-Match", "")
+            if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.daemon_threads = True
+    return server
@@ -2,18 +2,18 @@ import os
 import time
 import glob
 import fnmatch
-from bs4 import BeautifulSoup
-import matplotlib.pyplot as plt
 import base64
 from io import BytesIO
 import datetime
 from ResourceMonitor import ResourceMonitor
+from ReportRetention import load_daily_summaries
 
 
 REPORTS_DIR = "/var/www/reports/"
 
 OUTPUT_FILENAME = f"combined_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
 EX_FILENAME = "combined_report_*.html"
+SUMMARY_FILENAME = "daily-summary-*.html"
 
 def get_html_files():
     
@@ -27,13 +27,15 @@ def get_html_files():
     for f in all_files:
         filename = os.path.basename(f)
 
-        if not fnmatch.fnmatch(filename, EX_FILENAME):
+        if not fnmatch.fnmatch(filename, EX_FILENAME) and not fnmatch.fnmatch(filename, SUMMARY_FILENAME):
             files_to_process.append(f)
     
     files_to_process.sort()
     return files_to_process
 
 def parse_html_reports(file_list):
+    from bs4 import BeautifulSoup
+
     stats = {
         "404 Not Found": 0,
         "401/403 Forbidden": 0,
@@ -104,6 +106,8 @@ def parse_html_reports(file_list):
     return stats, reports_processed
 
 def generate_charts(stats, resource_stats):
+    import matplotlib.pyplot as plt
+
     charts_base64 = {}
     
     error_data = {k: v for k, v in stats.items() if k != "Total Requests Analyzed" and v > 0}
@@ -161,7 +165,24 @@ def generate_charts(stats, resource_stats):
 
     return charts_base64
 
-def create_html_report(stats,resource_stats, charts, processed_files):
+def memory_section(memory_stats):
+    if not memory_stats:
+        return ""
+    rows = ''.join(
+        f"<tr><td>{stage}</td><td>{peak / 1048576:.2f}</td></tr>"
+        for stage, peak in sorted(memory_stats.get('stage_peaks', {}).items(), key=lambda item: item[1], reverse=True)
+    )
+    actions = ''.join(f'<li>{action}</li>' for action in memory_stats.get('actions', []))
+    return f"""
+        <h2>Pamięć analizatora</h2>
+        <p>RSS: {memory_stats.get('rss_bytes', 0) / 1048576:.2f} MB / budżet {memory_stats.get('budget_bytes', 0) / 1048576:.2f} MB</p>
+        <table>
+            <tr><th>Etap</th><th>Szczyt (MB)</th></tr>
+            {rows}
+        </table>
+        {'<ul>' + actions + '</ul>' if actions else ''}"""
+
+def create_html_report(stats,resource_stats, charts, processed_files, memory_stats=None):
     html_content = f"""<!doctype html>
 <html lang='pl'>
 <head>
@@ -209,6 +230,7 @@ def create_html_report(stats,resource_stats, charts, processed_files):
             <tr><td>Odczyt dysku (KB/s)</td><td>{resource_stats['Disk Read']:.2f}</td></tr>
             <tr><td>Zapis dysku (KB/s)</td><td>{resource_stats['Disk Write']:.2f}</td></tr>
         </table>
+{memory_section(memory_stats)}
 
         <h2>Wizualizacja</h2>
         <div class="chart-section">
@@ -227,17 +249,23 @@ def create_html_report(stats,resource_stats, charts, processed_files):
 """
     return html_content
 
-def main(name):
+def main(name, skip_charts=False, memory_stats=None):
     files = get_html_files()
+    summaries = load_daily_summaries(REPORTS_DIR)
     
-    if not files:
+    if not files and not summaries:
         print("No .html files found.")
         return
 
-    print(f"Found {len(files)} files to analyze.")
+    print(f"Found {len(files)} files and {len(summaries)} daily summaries to analyze.")
     print("Analyzing...")
     
     stats, processed = parse_html_reports(files)
+    for summary in summaries:
+        for key, value in summary.get("stats", {}).items():
+            if key in stats:
+                stats[key] += value
+        processed.append(summary["path"])
     
     if not processed:
         print("No data could be obtained from files.")
@@ -254,11 +282,15 @@ def main(name):
         'Disk Write': disk_write
     }
     
-    print("Generating plots...")
-    charts = generate_charts(stats, resource_stats)
+    if skip_charts:
+        print("Skipping plots, the analyzer is over its memory budget.")
+        charts = {}
+    else:
+        print("Generating plots...")
+        charts = generate_charts(stats, resource_stats)
     
     print("Writing HTML report...")
-    html_out = create_html_report(stats, resource_stats, charts, processed)
+    html_out = create_html_report(stats, resource_stats, charts, processed, memory_stats)
     
     with open(name, "w", encoding='utf-8') as f:
         f.write(html_out)
@@ -0,0 +1,211 @@
+import glob
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+REPORTS_DIR = "/var/www/reports/"
+
+DETECTOR_PATTERNS = ("dos-report-*.html", "404-report-*.html", "401-403-report-*.html")
+SUMMARY_PATTERN = "daily-summary-*"
+
+STAT_KEYS = ("404 Not Found", "401/403 Forbidden", "DoS Suspected IPs", "Total Requests Analyzed")
+
+
+def summary_paths(directory: str, day: str) -> Tuple[str, str]:
+    base = os.path.join(directory, f"daily-summary-{day}")
+    return base + ".json", base + ".html"
+
+
+def load_daily_summaries(directory: str = REPORTS_DIR) -> List[Dict[str, Any]]:
+    summaries = []
+    for path in sorted(glob.glob(os.path.join(directory, SUMMARY_PATTERN + ".json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error while reading summary: {path}: {e}")
+            continue
+        summary["path"] = path
+        summaries.append(summary)
+    return summaries
+
+
+def _write_atomic(path: str, content: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class ReportRetention:
+
+    def __init__(
+        self,
+        reports_dir: str = REPORTS_DIR,
+        compact_after_hours: float = 24,
+        max_age_days: float = 30,
+        max_total_bytes: int = 200_000_000,
+        extra_patterns: Optional[List[str]] = None,
+    ):
+        self.reports_dir = reports_dir
+        self.compact_after_hours = float(compact_after_hours)
+        self.max_age_days = float(max_age_days)
+        self.max_total_bytes = int(max_total_bytes)
+        self.extra_patterns = list(extra_patterns or [])
+
+    def _files(self, patterns) -> List[Tuple[str, float, int]]:
+        files = []
+        for pattern in patterns:
+            for path in glob.glob(pattern):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, st.st_mtime, st.st_size))
+        files.sort(key=lambda item: item[1])
+        return files
+
+    def _detector_reports(self) -> List[Tuple[str, float, int]]:
+        return self._files(os.path.join(self.reports_dir, pattern) for pattern in DETECTOR_PATTERNS)
+
+    def _load_summary(self, path: str, day: str) -> Dict[str, Any]:
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error while reading summary: {path}: {e}")
+        return {
+            "date": day,
+            "stats": {key: 0 for key in STAT_KEYS},
+            "reports": {pattern.split("-*")[0]: 0 for pattern in DETECTOR_PATTERNS},
+            "first_report": None,
+            "last_report": None,
+            "files": [],
+            "unparsed": [],
+        }
+
+    def compact(self, now: Optional[float] = None) -> int:
+        from Report import parse_html_reports
+
+        cutoff = (now or time.time()) - self.compact_after_hours * 3600
+        by_day: Dict[str, List[Tuple[str, float]]] = {}
+        for path, mtime, _ in self._detector_reports():
+            if mtime >= cutoff:
+                break
+            day = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d")
+            by_day.setdefault(day, []).append((path, mtime))
+
+        compacted = 0
+        for day, reports in by_day.items():
+            json_path, html_path = summary_paths(self.reports_dir, day)
+            summary = self._load_summary(json_path, day)
+            seen = set(summary["files"])
+            fresh = [(path, mtime) for path, mtime in reports if os.path.basename(path) not in seen]
+
+            stats, processed = parse_html_reports([path for path, _ in fresh])
+            processed = set(processed)
+            for key in STAT_KEYS:
+                summary["stats"][key] += stats.get(key, 0)
+            for path, mtime in fresh:
+                name = os.path.basename(path)
+                summary["files"].append(name)
+                if path not in processed:
+                    summary["unparsed"].append(name)
+                kind = name.split("-report-")[0] + "-report"
+                summary["reports"][kind] = summary["reports"].get(kind, 0) + 1
+                stamp = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+                if summary["first_report"] is None or stamp < summary["first_report"]:
+                    summary["first_report"] = stamp
+                if summary["last_report"] is None or stamp > summary["last_report"]:
+                    summary["last_report"] = stamp
+
+            _write_atomic(json_path, json.dumps(summary, indent=2))
+            _write_atomic(html_path, self._render(summary))
+            newest = datetime.strptime(summary["last_report"], "%Y-%m-%d %H:%M:%S").timestamp()
+            for path in (json_path, html_path):
+                os.utime(path, (newest, newest))
+
+            for path, _ in reports:
+                try:
+                    os.remove(path)
+                    compacted += 1
+                except OSError as e:
+                    print(f"Error while removing report: {path}: {e}")
+
+        return compacted
+
+    def enforce_limits(self, now: Optional[float] = None) -> int:
+        patterns = [os.path.join(self.reports_dir, pattern) for pattern in DETECTOR_PATTERNS]
+        patterns.append(os.path.join(self.reports_dir, SUMMARY_PATTERN))
+        patterns.extend(self.extra_patterns)
+        files = self._files(patterns)
+
+        cutoff = (now or time.time()) - self.max_age_days * 86400
+        total = sum(size for _, _, size in files)
+        removed = 0
+        for path, mtime, size in files:
+            if mtime >= cutoff and total <= self.max_total_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Error while removing report: {path}: {e}")
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def run(self, now: Optional[float] = None) -> Dict[str, int]:
+        try:
+            compacted = self.compact(now)
+        except ImportError as e:
+            print(f"Skipping report compaction: {e}")
+            compacted = 0
+        return {"compacted": compacted, "removed": self.enforce_limits(now)}
+
+    @staticmethod
+    def _render(summary: Dict[str, Any]) -> str:
+        title = f"Daily Report Summary {summary['date']}"
+        html = []
+        html.append("<!doctype html>")
+        html.append("<html lang='en'><head><meta charset='utf-8'>")
+        html.append(f"<title>{title}</title>")
+        html.append(
+            "<style>"
+            "body{font-family:Arial,Helvetica,sans-serif;margin:20px}"
+            "table{border-collapse:collapse;width:100%;margin-bottom:20px}"
+            "th,td{border:1px solid #ddd;padding:8px;text-align:left}"
+            "th{background:#f2f2f2}"
+            ".muted{color:#666;font-size:0.9em}"
+            "</style></head><body>"
+        )
+        html.append(f"<h1>{title}</h1>")
+        html.append(
+            f"<p class='muted'>Compacted from {len(summary['files'])} reports written between "
+            f"{summary['first_report']} and {summary['last_report']}.</p>"
+        )
+
+        html.append("<h2>Summary</h2>")
+        html.append("<table>")
+        html.append("<tr><th>Metric</th><th>Value</th></tr>")
+        for key, value in summary["stats"].items():
+            html.append(f"<tr><td>{key}</td><td>{value}</td></tr>")
+        html.append("</table>")
+
+        html.append("<h2>Reports</h2>")
+        html.append("<table>")
+        html.append("<tr><th>Type</th><th>Count</th></tr>")
+        for kind, count in summary["reports"].items():
+            html.append(f"<tr><td>{kind}</td><td>{count}</td></tr>")
+        html.append("</table>")
+
+        if summary["unparsed"]:
+            html.append(f"<p class='muted'>Could not be parsed: {', '.join(summary['unparsed'])}</p>")
+
+        html.append("<p class='muted'>End of report</p>")
+        html.append("</body></html>")
+        return "\n".join(html)
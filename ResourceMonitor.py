@@ -1,5 +1,4 @@
 import time
-import psutil
 
 class ResourceMonitor:
     def __init__(self, user='www-data'):
@@ -9,6 +8,8 @@ class ResourceMonitor:
         self.last_write_bytes = 0
     
     def get_user_resource_usage(self):
+        import psutil
+
         current_time = time.time()
         total_cpu = 0.0
         total_memory = 0.0
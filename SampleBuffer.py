@@ -0,0 +1,38 @@
+import heapq
+from typing import Any, List, Tuple
+
+
+class NewestSampleBuffer:
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._heap: List[Tuple[Any, int, Any]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def accepts(self, key: Any) -> bool:
+        if self.capacity <= 0:
+            return False
+        return len(self._heap) < self.capacity or key > self._heap[0][0]
+
+    def offer(self, key: Any, item: Any) -> bool:
+        if not self.accepts(key):
+            return False
+        # ties keep the earliest offered item, like a stable sort would
+        self._seq -= 1
+        entry = (key, self._seq, item)
+        if len(self._heap) < self.capacity:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+        return True
+
+    def shrink(self, capacity: int):
+        self.capacity = int(capacity)
+        while len(self._heap) > self.capacity:
+            heapq.heappop(self._heap)
+
+    def items(self) -> List[Any]:
+        return [item for _, _, item in sorted(self._heap, reverse=True)]
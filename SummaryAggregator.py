@@ -0,0 +1,282 @@
+import json
+import math
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+from AccessLogReader import LogReader
+from DoSDetector import DoSDetector
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool):
+        raise TypeError("not a number")
+    number = float(value)
+    if not math.isfinite(number) or number < 0:
+        raise ValueError("not a non-negative finite number")
+    return int(number) if number.is_integer() else number
+
+
+def parse_bucket(bucket: Any) -> Optional[List[float]]:
+    if not isinstance(bucket, (list, tuple)) or len(bucket) < 2:
+        return None
+    try:
+        return [_number(bucket[0]), _number(bucket[1]), _number(bucket[2]) if len(bucket) > 2 else 0]
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    if address.startswith("tcp://"):
+        address = address[len("tcp://"):]
+    host, _, port = address.rpartition(":")
+    if host.startswith("[") and host.endswith("]"):
+        return socket.AF_INET6, (host[1:-1] or "::1", int(port))
+    if ":" in host:
+        raise ValueError(f"IPv6 addresses must be bracketed, e.g. tcp://[::1]:{port}")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+class SummaryAgent:
+
+    def __init__(
+        self,
+        address: str,
+        node: Optional[str] = None,
+        reader: Optional[LogReader] = None,
+        detector: Optional[DoSDetector] = None,
+        window_minutes: int = 15,
+    ):
+        self.family, self.address = parse_address(address)
+        self.node = node or socket.gethostname()
+        self.reader = reader or LogReader()
+        self.detector = detector or DoSDetector()
+        self.window_minutes = int(window_minutes)
+        self._sock: Optional[socket.socket] = None
+        self._last_minute: Optional[int] = None
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            sock.connect(self.address)
+            self._sock = sock
+        return self._sock
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def build_message(self, summary: Dict[str, Dict[int, List[float]]]) -> Dict[str, Any]:
+        since = self._last_minute
+        ips: Dict[str, Dict[str, List[int]]] = {}
+        newest = since
+
+        for ip, buckets in summary.items():
+            for minute, bucket in buckets.items():
+                # the newest minute is still filling up, so it is re-sent next time
+                if since is not None and minute < since:
+                    continue
+                ips.setdefault(ip, {})[str(minute)] = bucket
+                if newest is None or minute > newest:
+                    newest = minute
+
+        return {"node": self.node, "since": since, "newest": newest, "ips": ips}
+
+    def send(self, summary: Dict[str, Dict[int, List[float]]]) -> int:
+        message = self.build_message(summary)
+        payload = (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+        try:
+            self._connect().sendall(payload)
+        except OSError:
+            self.close()
+            raise
+        self._last_minute = message["newest"]
+        return len(payload)
+
+    def run_once(self) -> int:
+        logs = self.reader.load_logs_for_minutes(minutes=self.window_minutes)
+        return self.send(self.detector.summarize(logs))
+
+    def run(self, interval: int = 60):
+        print(f"Shipping summaries from {self.node} to {self.address}...")
+        while True:
+            try:
+                sent = self.run_once()
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Sent {sent} bytes")
+            except OSError as e:
+                print(f"Error sending summary: {e}")
+            time.sleep(interval)
+
+
+class _SummaryHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError:
+                self.server.collector.drop()
+                continue
+            self.server.collector.merge(message)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCP6Server(_TCPServer):
+    address_family = socket.AF_INET6
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class SummaryCollector:
+
+    def __init__(
+        self,
+        address: str,
+        detector: Optional[DoSDetector] = None,
+        window_minutes: int = 15,
+    ):
+        self.family, self.address = parse_address(address)
+        self.detector = detector or DoSDetector()
+        self.window_minutes = int(window_minutes)
+        self._nodes: Dict[str, Dict[str, Dict[int, List[float]]]] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def drop(self, count: int = 1):
+        with self._lock:
+            self.dropped += count
+
+    def merge(self, message: Any) -> int:
+        # messages come from the network, so anything malformed is dropped instead of poisoning the state
+        ips = message.get("ips") if isinstance(message, dict) else None
+        if not isinstance(ips, dict):
+            self.drop()
+            return 0
+        node = str(message.get("node", "unknown"))
+        merged = dropped = 0
+        with self._lock:
+            node_summary = self._nodes.setdefault(node, {})
+            for ip, buckets in ips.items():
+                if not isinstance(buckets, dict):
+                    dropped += 1
+                    continue
+                for minute, bucket in buckets.items():
+                    parsed = parse_bucket(bucket)
+                    try:
+                        minute = int(minute)
+                    except (TypeError, ValueError):
+                        parsed = None
+                    if parsed is None:
+                        dropped += 1
+                        continue
+                    node_summary.setdefault(str(ip), {})[minute] = parsed
+                    merged += 1
+            self.dropped += dropped
+        return merged
+
+    def _expire(self, newest: int):
+        cutoff = newest - self.window_minutes
+        for node_summary in self._nodes.values():
+            for ip in list(node_summary):
+                buckets = node_summary[ip]
+                for minute in [m for m in buckets if m <= cutoff]:
+                    del buckets[minute]
+                if not buckets:
+                    del node_summary[ip]
+
+    def global_summary(self) -> Dict[str, Dict[int, List[float]]]:
+        merged: Dict[str, Dict[int, List[float]]] = {}
+        with self._lock:
+            newest = max(
+                (m for s in self._nodes.values() for b in s.values() for m in b),
+                default=None,
+            )
+            if newest is None:
+                return merged
+            self._expire(newest)
+            for node_summary in self._nodes.values():
+                for ip, buckets in node_summary.items():
+                    ip_buckets = merged.setdefault(ip, {})
+                    for minute, (count, sent, variance) in buckets.items():
+                        bucket = ip_buckets.setdefault(minute, [0, 0, 0])
+                        bucket[0] += count
+                        bucket[1] += sent
+                        bucket[2] += variance
+        return merged
+
+    def analyze(self) -> Dict[str, Any]:
+        summary = self.global_summary()
+        stats = self.detector.summary_stats(summary, 0)
+        stats["total_logs"] = stats["overall_total_requests"]
+        with self._lock:
+            stats["nodes"] = sorted(self._nodes)
+        return {
+            "offending": self.detector.evaluate(summary),
+            "offending_subnets": self.detector.evaluate_subnets(summary),
+            "stats": stats,
+        }
+
+    def start(self):
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = _UnixServer(self.address, _SummaryHandler)
+        elif self.family == socket.AF_INET6:
+            self._server = _TCP6Server(self.address, _SummaryHandler)
+        else:
+            self._server = _TCPServer(self.address, _SummaryHandler)
+        self._server.collector = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self._server.server_address
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def run(self, interval: int = 60):
+        print(f"Collecting summaries on {self.start()}...")
+        while True:
+            time.sleep(interval)
+            analysis = self.analyze()
+            offending = analysis["offending"]
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Nodes: {len(analysis['stats']['nodes'])} | "
+                f"IPs: {analysis['stats']['total_unique_ips']} | Offending: {len(offending)} | "
+                f"Dropped entries: {self.dropped}"
+            )
+            if offending or analysis["offending_subnets"]:
+                self.detector.generate_html_report(analysis)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("agent", "collector"):
+        print("Usage: SummaryAggregator.py agent|collector tcp://HOST:PORT|tcp://[HOST]:PORT|unix:///PATH")
+        sys.exit(1)
+    if sys.argv[1] == "agent":
+        SummaryAgent(sys.argv[2]).run()
+    else:
+        SummaryCollector(sys.argv[2]).run()
@@ -0,0 +1,74 @@
+from typing import Dict, List, Optional
+
+
+class SymbolTable:
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._values: List[Optional[str]] = []
+        self._refs: List[int] = []
+        self._free: List[int] = []
+        self._raw_codes: Dict[bytes, int] = {}
+        self._raws: List[Optional[bytes]] = []
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._codes
+
+    def acquire(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is not None:
+            self._refs[code] += 1
+            return code
+
+        if self._free:
+            code = self._free.pop()
+            self._values[code] = value
+            self._refs[code] = 1
+        else:
+            code = len(self._values)
+            self._values.append(value)
+            self._refs.append(1)
+            self._raws.append(None)
+        self._codes[value] = code
+        return code
+
+    def intern(self, value: str) -> str:
+        return self._values[self.acquire(value)]
+
+    def intern_bytes(self, raw: bytes) -> str:
+        code = self._raw_codes.get(raw)
+        if code is not None:
+            self._refs[code] += 1
+            return self._values[code]
+
+        code = self.acquire(raw.decode("utf-8", errors="replace"))
+        if self._raws[code] is None:
+            self._raws[code] = raw
+            self._raw_codes[raw] = code
+        return self._values[code]
+
+    def release(self, value: str):
+        code = self._codes.get(value)
+        if code is None:
+            return
+        self._refs[code] -= 1
+        if self._refs[code] <= 0:
+            del self._codes[value]
+            self._values[code] = None
+            raw = self._raws[code]
+            if raw is not None:
+                del self._raw_codes[raw]
+                self._raws[code] = None
+            self._free.append(code)
+
+    def code(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def value(self, code: int) -> Optional[str]:
+        return self._values[code]
+
+    def values(self) -> List[str]:
+        return list(self._codes)
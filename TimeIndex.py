@@ -0,0 +1,167 @@
+import hashlib
+import mmap
+import os
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import List, Optional
+from Checkpoint import save_checkpoint, load_checkpoint, pack_numbers, unpack_numbers
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def minute_of(dt: datetime) -> int:
+    return int((dt - _EPOCH).total_seconds()) // 60
+
+
+class TimeIndex:
+
+    SUFFIX = ".idx"
+    # a stale sidecar only means build() re-scans a little more, so it is not rewritten every cycle
+    SAVE_INTERVAL = 300
+
+    def __init__(self, log_path: str, index_path: Optional[str] = None):
+        self.log_path = os.path.abspath(log_path)
+        self.index_path = index_path
+        self.minutes: List[int] = []
+        self.offsets: List[int] = []
+        self.indexed_to = 0
+        self.inode = 0
+        self.persistent = index_path is not None
+        self._dirty = False
+        self._saved_at: Optional[float] = None
+
+    @classmethod
+    def path_for(cls, log_path: str, index_dir: str) -> str:
+        log_path = os.path.abspath(log_path)
+        digest = hashlib.sha1(log_path.encode("utf-8", errors="replace")).hexdigest()[:12]
+        return os.path.join(index_dir, f"{os.path.basename(log_path)}-{digest}{cls.SUFFIX}")
+
+    @classmethod
+    def open(cls, log_path: str, index_dir: Optional[str] = None) -> "TimeIndex":
+        index = cls(log_path, cls.path_for(log_path, index_dir) if index_dir is not None else None)
+        index.load()
+        return index
+
+    @classmethod
+    def prune(cls, index_dir: str) -> int:
+        try:
+            names = os.listdir(index_dir)
+        except OSError:
+            return 0
+        removed = 0
+        for name in names:
+            if not name.endswith(cls.SUFFIX):
+                continue
+            path = os.path.join(index_dir, name)
+            state = load_checkpoint(path)
+            log_path = state.get("log_path") if state is not None else None
+            if log_path and os.path.exists(log_path):
+                continue
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    @property
+    def high_water(self) -> int:
+        return self.minutes[-1] if self.minutes else -1
+
+    def reset(self, inode: int = 0):
+        self.minutes = []
+        self.offsets = []
+        self.indexed_to = 0
+        self.inode = inode
+        self._dirty = True
+
+    def load(self):
+        state = load_checkpoint(self.index_path) if self.index_path else None
+        if state is None or state.get("log_path") != self.log_path:
+            return
+        self.minutes = list(unpack_numbers("q", state["minutes"]))
+        self.offsets = list(unpack_numbers("Q", state["offsets"]))
+        self.indexed_to = state["indexed_to"]
+        self.inode = state["inode"]
+        self._saved_at = time.monotonic()
+
+    def save(self, force: bool = False):
+        if not self._dirty or not self.persistent:
+            return
+        if not force and self._saved_at is not None and time.monotonic() - self._saved_at < self.SAVE_INTERVAL:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            save_checkpoint(self.index_path, {
+                "log_path": self.log_path,
+                "inode": self.inode,
+                "indexed_to": self.indexed_to,
+                "minutes": pack_numbers("q", self.minutes),
+                "offsets": pack_numbers("Q", self.offsets),
+            })
+        except OSError as e:
+            print(f"Error while saving time index, keeping it in memory: {self.index_path}: {e}")
+            self.persistent = False
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def validate(self) -> bool:
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            return False
+        if st.st_ino != self.inode or st.st_size < self.indexed_to:
+            self.reset(st.st_ino)
+        return True
+
+    def add(self, minute: int, offset: int):
+        if minute > self.high_water:
+            self.minutes.append(minute)
+            self.offsets.append(offset)
+            self._dirty = True
+
+    def covered(self, offset: int):
+        if offset > self.indexed_to:
+            self.indexed_to = offset
+            self._dirty = True
+
+    def offset_for(self, minute: int) -> int:
+        i = bisect_left(self.minutes, minute)
+        return self.offsets[i] if i < len(self.offsets) else self.indexed_to
+
+    def build(self, log_format) -> int:
+        if not self.validate():
+            return 0
+        with open(self.log_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= self.indexed_to:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = data.rfind(b"\n", self.indexed_to) + 1
+                if not end:
+                    return 0
+
+                match_line = log_format.match
+                decode_time = log_format.decode_time
+                last_raw_date = None
+                pos = start = self.indexed_to
+                while pos < end:
+                    nl = data.find(b"\n", pos, end)
+                    line_start, pos = pos, nl + 1
+                    match = match_line(data, line_start, nl)
+                    if match is None:
+                        continue
+                    raw_date = match.group("datetime")
+                    if raw_date == last_raw_date:
+                        continue
+                    try:
+                        minute = minute_of(decode_time(raw_date))
+                    except (ValueError, KeyError):
+                        continue
+                    last_raw_date = raw_date
+                    if minute > self.high_water:
+                        self.add(minute, line_start)
+        self.covered(end)
+        return end - start
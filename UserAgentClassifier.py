@@ -0,0 +1,137 @@
+from collections import deque, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_SIGNATURES: Dict[str, List[str]] = {
+    "crawler": [
+        "googlebot", "bingbot", "slurp", "duckduckbot", "baiduspider", "yandexbot",
+        "sogou", "exabot", "facebookexternalhit", "facebot", "ia_archiver",
+        "applebot", "linkedinbot", "twitterbot", "pinterestbot", "semrushbot",
+        "ahrefsbot", "mj12bot", "dotbot", "petalbot", "bytespider", "gptbot",
+        "ccbot", "claudebot", "amazonbot", "seznambot", "qwantify", "uptimerobot",
+        "pingdom", "statuscake",
+    ],
+    "scanner": [
+        "nikto", "sqlmap", "nmap", "masscan", "zgrab", "nuclei", "wpscan",
+        "dirbuster", "gobuster", "dirb", "ffuf", "wfuzz", "acunetix", "nessus",
+        "openvas", "qualys", "w3af", "arachni", "burp", "zmeu", "morfeus",
+        "jorgee", "censysinspect", "expanse", "internet-measurement",
+    ],
+    "tool": [
+        "curl/", "wget/", "python-requests", "python-urllib", "aiohttp",
+        "go-http-client", "java/", "okhttp", "libwww-perl", "apache-httpclient",
+        "httpie", "postmanruntime", "node-fetch", "axios/", "scrapy",
+        "headlesschrome", "phantomjs",
+    ],
+}
+
+CATEGORY_PRIORITY = ("scanner", "tool", "crawler")
+DEFAULT_CATEGORY = "browser"
+UNKNOWN_CATEGORY = "unknown"
+
+
+class AhoCorasick:
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+
+        for pattern, label in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            if label not in self._out[state]:
+                self._out[state] = self._out[state] + (label,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                if state:
+                    self._fail[nxt] = self._goto[fail].get(char, 0)
+                inherited = self._out[self._fail[nxt]]
+                self._out[nxt] = self._out[nxt] + tuple(
+                    label for label in inherited if label not in self._out[nxt]
+                )
+
+    def search(self, text: str) -> List[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found: List[str] = []
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for label in out[state]:
+                    if label not in found:
+                        found.append(label)
+        return found
+
+
+def load_signatures(path: str) -> Dict[str, List[str]]:
+    signatures: Dict[str, List[str]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            category, _, signature = line.partition(":")
+            if signature.strip():
+                signatures.setdefault(category.strip(), []).append(signature.strip())
+    return signatures
+
+
+class UserAgentClassifier:
+
+    def __init__(
+        self,
+        signatures: Optional[Dict[str, List[str]]] = None,
+        cache_size: int = 10_000,
+    ):
+        if signatures is None:
+            signatures = DEFAULT_SIGNATURES
+        self.signatures = signatures
+        self.cache_size = int(cache_size)
+        self._automaton = AhoCorasick(
+            (signature.lower(), category)
+            for category, items in signatures.items()
+            for signature in items
+        )
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def _classify(self, user_agent: str) -> str:
+        if not user_agent or user_agent == "-":
+            return UNKNOWN_CATEGORY
+        categories = self._automaton.search(user_agent.lower())
+        if not categories:
+            return DEFAULT_CATEGORY
+        for category in CATEGORY_PRIORITY:
+            if category in categories:
+                return category
+        return categories[0]
+
+    def classify(self, user_agent: str) -> str:
+        cache = self._cache
+        category = cache.get(user_agent)
+        if category is not None:
+            cache.move_to_end(user_agent)
+            return category
+        category = self._classify(user_agent)
+        cache[user_agent] = category
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return category
@@ -0,0 +1,60 @@
+import mimetypes
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FileTypeClassifier import classify_file_type, classify_extension
+
+
+def uncached_file_type(path: str) -> str:
+    mime_type, _ = mimetypes.guess_type(path)
+    if mime_type:
+        main_type = mime_type.split('/')[0]
+        if main_type == 'image':
+            return 'image'
+        elif main_type == 'text':
+            return 'text file'
+        elif mime_type == 'application/pdf':
+            return 'pdf'
+        else:
+            return mime_type
+    return 'unknown'
+
+
+def scan_paths(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    suffixes = ["", ".php", ".html", ".bak", ".env", ".png", ".tar.gz", ".js", ".pdf", "/"]
+    paths = []
+    for _ in range(count):
+        path = f"/page-{rng.randrange(1 << 30)}{rng.choice(suffixes)}"
+        if rng.random() < 0.2:
+            path += f"?id={rng.randrange(1000)}"
+        paths.append(path)
+    return paths
+
+
+def main(count: int = 1_000_000):
+    paths = scan_paths(count)
+
+    start = time.perf_counter()
+    for path in paths:
+        uncached_file_type(path)
+    uncached = time.perf_counter() - start
+
+    classify_extension.cache_clear()
+    start = time.perf_counter()
+    for path in paths:
+        classify_file_type(path)
+    cached = time.perf_counter() - start
+
+    print(f"paths: {count}")
+    print(f"mimetypes.guess_type: {uncached:.3f}s ({count / uncached:,.0f} paths/s)")
+    print(f"classify_file_type:   {cached:.3f}s ({count / cached:,.0f} paths/s)")
+    print(f"cache: {classify_extension.cache_info()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
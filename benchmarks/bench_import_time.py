@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+from typing import Dict, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("matplotlib", "bs4", "psutil", "numpy", "smtplib", "ssl", "http.server")
+BUDGET_MS = 250.0
+
+
+def import_times(module: str = "main") -> Tuple[Dict[str, int], set]:
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        try:
+            cumulative[name.strip()] = int(cum)
+        except ValueError:
+            continue
+    loaded = {m for m in result.stdout.strip().split(",") if m}
+    return cumulative, loaded
+
+
+def best_import_ms(runs: int = 5, module: str = "main") -> Tuple[Optional[float], set]:
+    best = None
+    loaded = set()
+    for _ in range(runs):
+        cumulative, loaded = import_times(module)
+        micros = cumulative.get(module)
+        if micros is not None and (best is None or micros < best):
+            best = micros
+    return (None if best is None else best / 1000), loaded
+
+
+def main(budget_ms: float = BUDGET_MS, runs: int = 5) -> int:
+    best, loaded = best_import_ms(runs)
+    failed = False
+    if best is None:
+        print("import main: no timing reported by -X importtime")
+        failed = True
+    else:
+        print(f"import main: {best:.1f} ms (best of {runs}, budget {budget_ms:.0f} ms)")
+        if best > budget_ms:
+            print("startup import time is over budget")
+            failed = True
+    if loaded:
+        print(f"heavy modules loaded at startup: {', '.join(sorted(loaded))}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS))
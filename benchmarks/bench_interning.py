@@ -0,0 +1,37 @@
+import gc
+import sys
+import tempfile
+import tracemalloc
+
+from synthetic import make_lines, reader_for, write_log
+
+
+def measure(load):
+    gc.collect()
+    tracemalloc.start()
+    logs = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return logs, current
+
+
+def main(count: int = 100_000):
+    lines = make_lines(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_log(tmp, lines)
+
+        reader = reader_for(tmp)
+        plain, plain_bytes = measure(lambda: [reader.parse_log_line(line) for line in lines])
+        del plain
+
+        reader = reader_for(tmp)
+        window, window_bytes = measure(lambda: reader.load_logs_for_minutes(15))
+
+    print(f"rows: {len(window)}")
+    print(f"distinct ips: {len(window.ips_table)}, user agents: {len(window.user_agents_table)}, requests: {len(window.requests_table)}")
+    print(f"without interning: {plain_bytes / 1e6:.1f} MB")
+    print(f"interned window:   {window_bytes / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,81 @@
+import gc
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Optional
+
+from synthetic import make_lines, reader_for, write_log
+from AccessLog import AccessLog
+from UserAgentClassifier import UserAgentClassifier
+
+# frozen copy of the line parser the reader used before the bytes path, kept as the baseline
+TEXT_PATTERN = re.compile(
+    r'(?P<ip>\S+)\s+'
+    r'"(?P<datetime>[^"]+)"\s+'
+    r'"(?P<request>[^"]+)"\s+'
+    r'(?P<status>\d+)\s+'
+    r'(?P<bytes_received>\d+)\s+'
+    r'(?P<bytes_sent>\d+)\s+'
+    r'"(?P<user_agent>[^"]+)"'
+)
+
+
+def text_parse_line(line: str, classifier: UserAgentClassifier) -> Optional[AccessLog]:
+    match = TEXT_PATTERN.match(line.strip())
+    if not match:
+        return None
+    user_agent = match.group("user_agent")
+    return AccessLog(
+        source_ip=match.group("ip"),
+        date=match.group("datetime"),
+        first_line_of_request=match.group("request"),
+        http_status_code=int(match.group("status")),
+        bytes_received=int(match.group("bytes_received")),
+        bytes_sent=int(match.group("bytes_sent")),
+        user_agent=user_agent,
+        timestamp=datetime.strptime(match.group("datetime")[:19], "%d-%m-%Y %H:%M:%S"),
+        ua_category=classifier.classify(user_agent),
+        weight=1,
+    )
+
+
+def text_mode(path: str):
+    classifier = UserAgentClassifier()
+    with open(path, "r", encoding="utf-8") as f:
+        return [text_parse_line(line, classifier) for line in f.readlines()]
+
+
+def measure(load):
+    gc.collect()
+    started = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - started
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(result), elapsed, peak
+
+
+def main(count: int = 200_000):
+    lines = make_lines(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_log(tmp, lines)
+        size = sum(len(line) for line in lines)
+
+        rows, text_seconds, text_peak = measure(lambda: text_mode(path))
+        print(f"text mode:  {rows} rows, {rows / text_seconds:,.0f} lines/s, {size / text_seconds / 1e6:.1f} MB/s, peak {text_peak / 1e6:.1f} MB")
+
+        rows, bytes_seconds, bytes_peak = measure(lambda: reader_for(tmp).load_logs_for_minutes(15))
+        print(f"bytes mode: {rows} rows, {rows / bytes_seconds:,.0f} lines/s, {size / bytes_seconds / 1e6:.1f} MB/s, peak {bytes_peak / 1e6:.1f} MB")
+
+    print(f"speedup: {text_seconds / bytes_seconds:.2f}x, peak memory: {bytes_peak / text_peak:.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,88 @@
+import sys
+import tempfile
+import time
+from typing import Any, List
+
+from synthetic import make_lines, reader_for, write_log
+from DoSDetector import DoSDetector, _numpy
+
+HOT_IP = "203.0.113.7"
+HOT_PREFIX = "198.51.100"
+
+
+def make_attack_lines(count: int) -> List[str]:
+    # shares scaled so the hot IP and the hot /24 cross the default thresholds at any row count
+    per_minute = count / 14
+    return make_lines(
+        count,
+        hot_ip=HOT_IP,
+        hot_ip_share=min(0.5, 150 / per_minute),
+        hot_prefix=HOT_PREFIX,
+        hot_prefix_share=min(0.4, 400 / per_minute),
+    )
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if hasattr(value, "first_line_of_request"):
+        return (value.source_ip, value.timestamp, value.first_line_of_request, value.http_status_code, value.bytes_sent)
+    return value
+
+
+def differences(python: Any, vectorized: Any, path: str = "") -> List[str]:
+    python, vectorized = _plain(python), _plain(vectorized)
+    if isinstance(python, dict) and isinstance(vectorized, dict):
+        found = []
+        if list(python) != list(vectorized):
+            found.append(f"{path or '/'}: keys {list(python)} != {list(vectorized)}")
+        for key in python.keys() & vectorized.keys():
+            found.extend(differences(python[key], vectorized[key], f"{path}/{key}"))
+        return found
+    return [] if python == vectorized else [f"{path or '/'}: {python!r} != {vectorized!r}"]
+
+
+def timed(detector: DoSDetector, window):
+    started = time.perf_counter()
+    analysis = detector.analyze(window)
+    return analysis, time.perf_counter() - started
+
+
+def compare(label: str, window) -> bool:
+    python, python_seconds = timed(DoSDetector(vectorized=False), window)
+    vectorized, vectorized_seconds = timed(DoSDetector(vectorized=True), window)
+
+    found = differences(python, vectorized)
+    # an empty result would compare equal without exercising samples, buckets or rate peaks
+    exercised = HOT_IP in python["offending"] and f"{HOT_PREFIX}.0/24" in python["offending_subnets"]
+    print(
+        f"{label}: {len(window)} rows, {len(python['offending'])} offending IPs, "
+        f"{len(python['offending_subnets'])} offending subnets, "
+        f"python {python_seconds:.2f}s, numpy {vectorized_seconds:.2f}s "
+        f"({python_seconds / vectorized_seconds:.1f}x), identical: {not found}"
+    )
+    for difference in found[:10]:
+        print(f"  {difference}")
+    if not exercised:
+        print(f"  the injected offenders {HOT_IP} and {HOT_PREFIX}.0/24 were not flagged")
+    return not found and exercised
+
+
+def main(count: int = 1_000_000) -> int:
+    if _numpy() is None:
+        print("numpy is not installed, skipping")
+        return 0
+
+    lines = make_attack_lines(count)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        write_log(tmp, lines)
+        ok &= compare("full", reader_for(tmp).load_logs_for_minutes(15))
+        ok &= compare("sampled", reader_for(tmp).load_logs_for_minutes(15, sample_rate=0.3))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
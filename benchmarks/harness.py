@@ -0,0 +1,333 @@
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from synthetic import make_lines, reader_for, write_log
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+BENCHES: List[Tuple[str, Tuple[str, ...], Callable]] = []
+
+
+def bench(name: str, requires: Tuple[str, ...] = ()):
+    def register(factory: Callable):
+        BENCHES.append((name, requires, factory))
+        return factory
+    return register
+
+
+class Fixture:
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.tmp = tempfile.mkdtemp(prefix="apache-bench-")
+        self.log_dir = os.path.join(self.tmp, "logs")
+        self.report_dir = os.path.join(self.tmp, "reports")
+        os.makedirs(self.report_dir)
+        write_log(self.log_dir, make_lines(rows))
+        self._window = None
+        self._analyses = None
+        self._reports = None
+
+        from DoSDetector import DoSDetector
+        from DetectHttpNotFoundError import DetectHttpNotFoundError
+        from DetectHttpAuthError import DetectHttpAuthError
+        for detector in (DoSDetector, DetectHttpNotFoundError, DetectHttpAuthError):
+            detector.REPORT_DIR = self.report_dir
+
+    def close(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    @property
+    def window(self):
+        if self._window is None:
+            self._window = reader_for(self.log_dir).load_logs_for_minutes(15)
+        return self._window
+
+    @property
+    def analyses(self) -> List[Tuple[Any, Dict[str, Any]]]:
+        if self._analyses is None:
+            from DoSDetector import DoSDetector
+            from DetectHttpNotFoundError import DetectHttpNotFoundError
+            from DetectHttpAuthError import DetectHttpAuthError
+            self._analyses = []
+            for detector in (DoSDetector(vectorized=False), DetectHttpNotFoundError(), DetectHttpAuthError()):
+                self._analyses.append((detector, detector.analyze(self.window)))
+        return self._analyses
+
+    @property
+    def reports(self) -> List[str]:
+        if self._reports is None:
+            directory = os.path.join(self.tmp, "parsed-reports")
+            os.makedirs(directory)
+            self._reports = []
+            for copy in range(10):
+                for detector, analysis in self.analyses:
+                    path = detector.generate_html_report(analysis)
+                    target = os.path.join(directory, f"{copy}-{os.path.basename(path)}")
+                    shutil.move(path, target)
+                    self._reports.append(target)
+        return self._reports
+
+
+@bench("parse")
+def bench_parse(fixture: Fixture):
+    return lambda: reader_for(fixture.log_dir).load_logs_for_minutes(15)
+
+
+@bench("dos_analyze")
+def bench_dos_analyze(fixture: Fixture):
+    from DoSDetector import DoSDetector
+    detector = DoSDetector(vectorized=False)
+    window = fixture.window
+    return lambda: detector.analyze(window)
+
+
+@bench("dos_analyze_numpy", requires=("numpy",))
+def bench_dos_analyze_numpy(fixture: Fixture):
+    from DoSDetector import DoSDetector
+    detector = DoSDetector(vectorized=True)
+    window = fixture.window
+    return lambda: detector.analyze(window)
+
+
+@bench("not_found_analyze")
+def bench_not_found_analyze(fixture: Fixture):
+    from DetectHttpNotFoundError import DetectHttpNotFoundError
+    detector = DetectHttpNotFoundError()
+    window = fixture.window
+    return lambda: detector.analyze(window)
+
+
+@bench("auth_analyze")
+def bench_auth_analyze(fixture: Fixture):
+    from DetectHttpAuthError import DetectHttpAuthError
+    detector = DetectHttpAuthError()
+    window = fixture.window
+    return lambda: detector.analyze(window)
+
+
+@bench("html_render")
+def bench_html_render(fixture: Fixture):
+    analyses = fixture.analyses
+
+    def render():
+        for detector, analysis in analyses:
+            os.remove(detector.generate_html_report(analysis))
+    return render
+
+
+@bench("report_parse", requires=("bs4",))
+def bench_report_parse(fixture: Fixture):
+    from Report import parse_html_reports
+    reports = fixture.reports
+    return lambda: parse_html_reports(reports)
+
+
+@bench("resource_monitor", requires=("psutil",))
+def bench_resource_monitor(fixture: Fixture):
+    import psutil
+    from ResourceMonitor import ResourceMonitor
+
+    memory = namedtuple("memory", "rss")
+    io = namedtuple("io", "read_bytes write_bytes")
+
+    class FakeProcess:
+
+        def __init__(self, pid: int):
+            self.info = {
+                "pid": pid,
+                "username": "www-data" if pid % 4 else "root",
+                "cpu_percent": 0.0,
+                "memory_info": memory(pid * 4096),
+                "io_counters": io(pid * 512, pid * 256),
+            }
+
+        def cpu_percent(self, interval=None) -> float:
+            return 0.5
+
+    table = [FakeProcess(pid) for pid in range(1, 2001)]
+    monitor = ResourceMonitor(user="www-data")
+
+    def run():
+        original = psutil.process_iter
+        psutil.process_iter = lambda attrs=None: iter(table)
+        try:
+            return monitor.get_user_resource_usage()
+        finally:
+            psutil.process_iter = original
+    return run
+
+
+@bench("file_type")
+def bench_file_type(fixture: Fixture):
+    from bench_file_type import scan_paths
+    from FileTypeClassifier import classify_file_type, classify_extension
+    paths = scan_paths(200_000)
+
+    def run():
+        classify_extension.cache_clear()
+        for path in paths:
+            classify_file_type(path)
+    return run
+
+
+@bench("import_main")
+def bench_import_main(fixture: Fixture):
+    from bench_import_time import import_times
+    return import_times
+
+
+def measure(run: Callable, repeat: int) -> Dict[str, Any]:
+    run()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "median": median,
+        "mad": statistics.median(abs(t - median) for t in timings),
+        "min": min(timings),
+        "runs": len(timings),
+        "peak_bytes": peak,
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]],
+    time_tolerance: float,
+    memory_tolerance: float,
+    noise_factor: float,
+) -> List[str]:
+    if baseline is None:
+        return []
+    problems = []
+    noise = noise_factor * max(current["mad"], baseline["mad"])
+    slower = current["median"] - baseline["median"]
+    if current["median"] > baseline["median"] * (1 + time_tolerance) and slower > noise:
+        problems.append("slower")
+    grown = current["peak_bytes"] - baseline["peak_bytes"]
+    if current["peak_bytes"] > baseline["peak_bytes"] * (1 + memory_tolerance) and grown > 64 * 1024:
+        problems.append("memory")
+    return problems
+
+
+def machine_id() -> str:
+    name = f"{platform.node()}-{platform.machine()}-py{sys.version_info[0]}{sys.version_info[1]}-{os.cpu_count()}cpu"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+def baseline_path(machine: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{machine}.json")
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, baseline: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmarks and compare them with this machine's baseline.")
+    parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    parser.add_argument("--save", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--rows", type=int, default=100_000, help="synthetic log lines")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--time-tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="allowed relative peak memory growth")
+    parser.add_argument("--noise-factor", type=float, default=3.0, help="slowdowns within this many MADs are noise")
+    parser.add_argument("--baseline", help="baseline file, defaults to baselines/<machine>.json")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, requires, _ in BENCHES:
+            print(name + (f" (requires {', '.join(requires)})" if requires else ""))
+        return 0
+
+    machine = machine_id()
+    path = args.baseline or baseline_path(machine)
+    stored = load_baseline(path)
+    if stored and stored.get("rows") != args.rows:
+        print(f"Baseline {path} was recorded with {stored.get('rows')} rows, ignoring it")
+        stored = {}
+    baseline = stored.get("results", {})
+
+    fixture = Fixture(args.rows)
+    results: Dict[str, Dict[str, Any]] = {}
+    regressions = 0
+    try:
+        print(f"{'benchmark':<20} {'median':>10} {'baseline':>10} {'change':>8} {'peak MB':>9}  status")
+        for name, requires, factory in BENCHES:
+            if args.only and name not in args.only:
+                continue
+            missing = [module for module in requires if importlib.util.find_spec(module) is None]
+            if missing:
+                print(f"{name:<20} {'':>10} {'':>10} {'':>8} {'':>9}  skipped, missing {', '.join(missing)}")
+                continue
+
+            result = results[name] = measure(factory(fixture), args.repeat)
+            previous = baseline.get(name)
+            problems = compare(result, previous, args.time_tolerance, args.memory_tolerance, args.noise_factor)
+            regressions += bool(problems)
+
+            if previous is None:
+                reference, change, status = "", "", "new"
+            else:
+                reference = f"{previous['median'] * 1000:.1f}ms"
+                change = f"{(result['median'] / previous['median'] - 1) * 100:+.1f}%"
+                status = ", ".join(problems).upper() if problems else "ok"
+            print(
+                f"{name:<20} {result['median'] * 1000:>8.1f}ms {reference:>10} {change:>8} "
+                f"{result['peak_bytes'] / 1e6:>9.1f}  {status}"
+            )
+    finally:
+        fixture.close()
+
+    added = {name: result for name, result in results.items() if name not in baseline}
+    if args.save or added:
+        merged = dict(baseline)
+        merged.update(results if args.save else added)
+        save_baseline(path, {"machine": machine, "rows": args.rows, "saved_at": time.time(), "results": merged})
+        print(f"Baseline saved to {path}")
+
+    if regressions and not args.save:
+        print(f"{regressions} benchmark(s) regressed against {path}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
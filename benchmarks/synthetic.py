@@ -0,0 +1,66 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+STATUSES = [200] * 80 + [304] * 5 + [404] * 10 + [401, 403, 500, 301, 302]
+
+
+def make_lines(
+    count: int,
+    end: datetime = None,
+    minutes: int = 14,
+    ips: int = 3000,
+    user_agents: int = 300,
+    paths: int = 2000,
+    seed: int = 1,
+    hot_ip: Optional[str] = None,
+    hot_ip_share: float = 0.0,
+    hot_prefix: Optional[str] = None,
+    hot_prefix_share: float = 0.0,
+) -> List[str]:
+    rng = random.Random(seed)
+    end = end or datetime.now()
+    start = end - timedelta(minutes=minutes)
+    span = minutes * 60
+    ip_pool = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(ips)]
+    ua_pool = [f"Mozilla/5.0 (X11; Linux x86_64) Agent/{i}.0" for i in range(user_agents)]
+    path_pool = [f"/section-{i % 50}/item-{i}.html" for i in range(paths)]
+
+    lines = []
+    for i in range(count):
+        dt = start + timedelta(seconds=span * i // count)
+        ip = rng.choice(ip_pool)
+        if hot_ip or hot_prefix:
+            # one flooding IP and a /24 whose hosts each stay under the per-IP thresholds
+            roll = rng.random()
+            if roll < hot_ip_share:
+                ip = hot_ip
+            elif roll < hot_ip_share + hot_prefix_share:
+                ip = f"{hot_prefix}.{rng.randrange(1, 255)}"
+        lines.append(
+            f'{ip} "{dt.strftime("%d-%m-%Y %H:%M:%S")}" '
+            f'"GET {rng.choice(path_pool)} HTTP/1.1" {rng.choice(STATUSES)} '
+            f'{rng.randrange(200, 900)} {rng.randrange(100, 50000)} "{rng.choice(ua_pool)}"\n'
+        )
+    return lines
+
+
+def reader_for(directory: str, **kwargs):
+    from AccessLogReader import LogReader
+
+    # keep the minute index sidecars inside the fixture instead of the working directory
+    return LogReader(directory, index_dir=os.path.join(directory, "index"), **kwargs)
+
+
+def write_log(directory: str, lines: List[str], date: datetime = None) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = reader_for(directory)._build_log_path(date or datetime.now())
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    return path
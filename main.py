@@ -1,21 +1,49 @@
+import atexit
+import signal
+import sys
 import time
-from datetime import datetime, timedelta
-import collections
+from datetime import datetime
+from contextlib import contextmanager
 from ResourceMonitor import ResourceMonitor
 from AccessLogReader import LogReader
 from DoSDetector import DoSDetector
+from Baselines import BaselineTracker
+from BloomFilter import FirstSeenTracker
 from DetectHttpNotFoundError import DetectHttpNotFoundError
 from DetectHttpAuthError import DetectHttpAuthError
-from MailSender import send_email
-import Report
+from Metrics import MetricsRegistry, MetricsServer, MetricsFileWriter
+from LoadShedder import LoadShedder
+from Checkpoint import save_checkpoint, load_checkpoint
+from ReportRetention import ReportRetention
+from QueryApi import QueryApi
+from MemoryGuard import MemoryGuard
+
+def record_reader_metrics(metrics, reader, previous, window_size):
+    current = reader.stats
+    delta = {key: current[key] - previous.get(key, 0) for key in current}
+    metrics.observe_stage("read", delta["read_seconds"])
+    metrics.observe_stage("parse", delta["parse_seconds"])
+    metrics.inc("bytes_read_total", delta["bytes_read"], help_text="Bytes read from access logs.")
+    metrics.inc("lines_parsed_total", delta["lines_parsed"], help_text="Lines parsed into the window.")
+    metrics.inc("malformed_lines_total", delta["malformed_lines"], help_text="Lines that did not match the log format.")
+    metrics.inc("dropped_lines_total", delta["dropped_lines"], help_text="Parsed lines older than the window.")
+    if delta["parse_seconds"] > 0:
+        metrics.set("lines_parsed_per_second", delta["lines_read"] / delta["parse_seconds"],
+                    help_text="Parse throughput of the last cycle.")
+    metrics.set("window_rows", window_size, help_text="Rows in the analysis window.")
+
 
 def main():
     with open("mail_recievers.txt") as f:
         mail_recievers = [mail.strip() for mail in f]
-    reader = LogReader()
-    detector = DoSDetector()
-    error_detector = DetectHttpNotFoundError()
-    auth_error_detector = DetectHttpAuthError()
+    log_sources = None  # e.g. ["*/access_log-%Y-%m-%d", "*-access.log"] to analyze every vhost together
+    ua_signatures = None  # e.g. "ua-signatures.txt" with "category: substring" lines replacing the built-in list
+    reader = LogReader(sources=log_sources, ua_signatures=ua_signatures)
+    first_seen = FirstSeenTracker("first-seen.bloom", days=30, max_bytes=32 * 1024 * 1024)
+    first_seen.load()
+    detector = DoSDetector(baselines=BaselineTracker(), first_seen=first_seen, vectorized=True)
+    error_detector = DetectHttpNotFoundError(first_seen=first_seen)
+    auth_error_detector = DetectHttpAuthError(first_seen=first_seen)
     resource_monitor = ResourceMonitor(user='www-data')
 
     report_cooldown = 900  # 15 minutes
@@ -23,27 +51,108 @@ def main():
     last_report_time = 0.0
     last_analysis_time = 0.0
 
+    metrics_port = None  # e.g. 9108 to serve http://127.0.0.1:9108/metrics
+    metrics_file = "analyzer-metrics.prom"
+    metrics = MetricsRegistry()
+    if metrics_port:
+        MetricsServer(metrics, port=metrics_port).start()
+    metrics_writer = MetricsFileWriter(metrics, metrics_file) if metrics_file else None
+    reader_totals = dict(reader.stats)
+
+    api_port = None  # e.g. 9109 to serve the dashboard on http://127.0.0.1:9109/
+    api = QueryApi(port=api_port) if api_port else None
+    if api is not None:
+        api.start()
+
+    shedder = LoadShedder(budget_seconds=analysis_interval)
+    guard = MemoryGuard(budget_bytes=512 * 1024 * 1024, sample_every=10)
+
+    @contextmanager
+    def stage(name):
+        with metrics.time(name), guard.stage(name):
+            yield
+    flagged_ips = {}
+
+    checkpoint_path = "analyzer-state.ckpt"
+    checkpoint_interval = 300
+    last_checkpoint_time = time.time()
+    state = load_checkpoint(checkpoint_path)
+    if state is not None:
+        reader.restore_state(state["reader"])
+        last_report_time = state.get("last_report_time", 0.0)
+        flagged_ips = dict(state.get("flagged_ips", {}))
+        if "baselines" in state:
+            detector.baselines.restore_state(state["baselines"])
+            detector.baselines.mark_observed(reader.window)
+        first_seen.mark_observed(reader.window)
+        print(f"Resumed from checkpoint with {len(reader.window)} logs in the window.")
+
+    def write_checkpoint(final=False):
+        save_checkpoint(checkpoint_path, {
+            "reader": reader.get_state(),
+            "last_report_time": last_report_time,
+            "flagged_ips": flagged_ips,
+            "baselines": detector.baselines.get_state(),
+        })
+        first_seen.save(force=final)
+        reader.save_indexes()
+
+    retention = ReportRetention(extra_patterns=["report*.html"])
+    retention_interval = 3600
+    last_retention_time = 0.0
+
+    atexit.register(write_checkpoint, True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     print("Starting periodic analysis of daily Apache log file...")
 
     while True:
         now = datetime.now()
 
         if time.time() - last_analysis_time >= analysis_interval:
-
-            logs = reader.load_logs_for_minutes(minutes=int(report_cooldown/60))
+            cycle_started = time.perf_counter()
+            guard.start_cycle()
+
+            with guard.stage("load"):
+                logs = reader.load_logs_for_minutes(
+                    minutes=int(report_cooldown/60),
+                    sample_rate=shedder.sample_rate,
+                    exact_ips=flagged_ips,
+                )
+            record_reader_metrics(metrics, reader, reader_totals, len(logs))
+            reader_totals = dict(reader.stats)
 
             if not logs:
                 print(f"[{now.strftime('%H:%M:%S')}] No logs found in the last {int(report_cooldown/60)} minutes.")
+                guard.end_cycle()
                 time.sleep(analysis_interval)
                 continue
 
-            analysis = detector.analyze(logs)
-            error_analysis = error_detector.analyze(logs)
-            auth_error_analysis = auth_error_detector.analyze(logs)
+            with stage("dos_detector"):
+                analysis = detector.analyze(logs)
+            with stage("not_found_detector"):
+                error_analysis = error_detector.analyze(logs)
+            with stage("auth_detector"):
+                auth_error_analysis = auth_error_detector.analyze(logs)
+
+            with stage("resource_monitor"):
+                cpu, memory, read_kb, write_kb = resource_monitor.get_user_resource_usage()
 
-            cpu, memory, read_kb, write_kb = resource_monitor.get_user_resource_usage()
+            for action in guard.enforce(reader.window, (detector, error_detector, auth_error_detector)):
+                print(f"Memory over budget ({guard.usage() / 1048576:.0f} MB): {action}")
 
-            offending = analysis.get("offending", {})
+            for kind, keys in first_seen.new.items():
+                metrics.set("first_seen_keys", len(keys), labels={"kind": kind},
+                            help_text="IPs and paths seen for the first time within the last hour.")
+
+            if api is not None:
+                api.publish(analysis, error_analysis, auth_error_analysis, (cpu, memory, read_kb, write_kb))
+
+            for ip in analysis.get("offending", {}):
+                flagged_ips[ip] = time.time()
+            for ip in [ip for ip, flagged_at in flagged_ips.items() if time.time() - flagged_at > report_cooldown]:
+                del flagged_ips[ip]
+            offending = analysis.get("offending", {}) or analysis.get("offending_subnets", {})
             total_404 = error_analysis.get("stats", {}).get("total_404_errors", 0)
             total_auth = auth_error_analysis.get("stats", {}).get("total_401_403_errors", 0)
 
@@ -61,25 +170,61 @@ def main():
 
             if issue_detected and (time.time() - last_report_time >= report_cooldown):
 
-                dos_path = detector.generate_html_report(analysis)
-                error_path = error_detector.generate_html_report(error_analysis)
-                auth_error_path = auth_error_detector.generate_html_report(auth_error_analysis)
+                with stage("detector_reports"):
+                    dos_path = detector.generate_html_report(analysis)
+                    error_path = error_detector.generate_html_report(error_analysis)
+                    auth_error_path = auth_error_detector.generate_html_report(auth_error_analysis)
                 report_path=f"report{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
                 try:
-                    Report.main(report_path)
+                    with stage("combined_report"):
+                        import Report
+                        Report.main(report_path, skip_charts=guard.skip_charts, memory_stats=guard.summary())
                 except Exception as e:
                     print(f"Wystąpił błąd podczas uruchamiania analizy: {e}")
 
-                for reciever in mail_recievers:
-                    send_email(
-                        receiver_email=reciever,
-                        subject=f"Raport Apache2 {datetime.now()}",
-                        body="Wykryto nieprawidłowości! W załącznikach znajduje się zbiorczy raport oraz najnowsze szczegółowe raporty.",
-                        attachments=[report_path, dos_path, error_path, auth_error_path])
+                with stage("mail"):
+                    from MailSender import send_email
+                    for reciever in mail_recievers:
+                        send_email(
+                            receiver_email=reciever,
+                            subject=f"Raport Apache2 {datetime.now()}",
+                            body="Wykryto nieprawidłowości! W załącznikach znajduje się zbiorczy raport oraz najnowsze szczegółowe raporty.",
+                            attachments=[report_path, dos_path, error_path, auth_error_path])
                 last_report_time = time.time()
-
+                metrics.inc("reports_sent_total", help_text="Number of report e-mails rounds sent.")
+
+            if guard.sampling:
+                print("Peak memory per stage: " + ", ".join(
+                    f"{name} {peak / 1048576:.1f} MB" for name, peak in guard.peaks.items()))
+                for name, peak in guard.peaks.items():
+                    metrics.set("stage_peak_bytes", peak, labels={"stage": name},
+                                help_text="Peak traced memory of a stage in the last sampled cycle.")
+            guard.end_cycle()
+            metrics.set("rss_bytes", guard.usage(), help_text="Resident memory of the analyzer.")
+
+            cycle_seconds = time.perf_counter() - cycle_started
+            metrics.observe_stage("cycle", cycle_seconds)
+            previous_rate = shedder.sample_rate
+            shedder.record_cycle(cycle_seconds)
+            metrics.set("sample_rate", shedder.sample_rate, help_text="Fraction of new log lines parsed.")
+            if shedder.sample_rate != previous_rate:
+                print(f"Cycle took {cycle_seconds:.1f}s, sampling rate changed to {shedder.sample_rate:.2%}")
+            if metrics_writer is not None:
+                metrics_writer.write()
             last_analysis_time = time.time()
 
+            if time.time() - last_checkpoint_time >= checkpoint_interval:
+                with stage("checkpoint"):
+                    write_checkpoint()
+                last_checkpoint_time = time.time()
+
+            if time.time() - last_retention_time >= retention_interval:
+                with stage("retention"):
+                    cleaned = retention.run()
+                if cleaned["compacted"] or cleaned["removed"]:
+                    print(f"Compacted {cleaned['compacted']} and removed {cleaned['removed']} old reports.")
+                last_retention_time = time.time()
+
         time.sleep(1)
         
 
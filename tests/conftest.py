@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    from AccessLogReader import LogReader
+
+    # readers built without an explicit index_dir must not write sidecars into the working directory
+    directory = tmp_path / "default-index"
+    monkeypatch.setattr(LogReader, "INDEX_DIR", str(directory))
+    return directory
+
+
+@pytest.fixture
+def report_dir(tmp_path, monkeypatch):
+    from DoSDetector import DoSDetector
+    from DetectHttpNotFoundError import DetectHttpNotFoundError
+    from DetectHttpAuthError import DetectHttpAuthError
+
+    for detector in (DoSDetector, DetectHttpNotFoundError, DetectHttpAuthError):
+        monkeypatch.setattr(detector, "REPORT_DIR", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,46 @@
+from Baselines import GLOBAL_KEY, BaselineTracker, EwmaTable, path_key
+
+
+def test_ewma_converges_and_scores_spikes():
+    table = EwmaTable(min_periods=5)
+    assert table.update("ip", 10, 0) is None
+    for period in range(1, 30):
+        table.update("ip", 10, period)
+    mean, std = table.baseline("ip")
+    assert abs(mean - 10) < 1e-9 and std < 1e-6
+
+    z, mean, std = table.update("ip", 40, 30)
+    assert z > 4 and std >= 1.0
+
+
+def test_idle_periods_decay_the_mean_and_keys_are_bounded():
+    table = EwmaTable(max_keys=2)
+    table.update("a", 100, 0)
+    table.update("a", 100, 1)
+    table.update("a", 0, 50)
+    assert table.baseline("a")[0] < 1
+    table.update("b", 1, 50)
+    table.update("c", 1, 50)
+    assert "a" not in table and len(table) == 2 and table.evicted == 1
+
+
+def test_tracker_flags_a_burst_against_its_own_history():
+    tracker = BaselineTracker(min_periods=10, z_threshold=4, min_count=10)
+    for minute in range(30):
+        for i in range(5):
+            tracker.observe(minute, "10.0.0.1", path_key("GET /home HTTP/1.1"))
+    for i in range(60):
+        tracker.observe(30, "10.0.0.1", path_key(f"GET /home?page={i} HTTP/1.1"))
+    tracker.observe(30, "10.0.0.3", path_key("GET /item/1 HTTP/1.1"))
+    tracker.observe(31, "10.0.0.2", "/")
+
+    assert list(tracker.anomalies["ips"]) == ["10.0.0.1"]
+    assert tracker.anomalies["ips"]["10.0.0.1"]["count"] == 60
+    # keys without history are not scored
+    assert list(tracker.anomalies["paths"]) == ["/home"]
+    assert list(tracker.anomalies["global"]) == [GLOBAL_KEY]
+
+    restored = BaselineTracker()
+    restored.restore_state(tracker.get_state())
+    assert restored.tables["ips"].baseline("10.0.0.1") == tracker.tables["ips"].baseline("10.0.0.1")
+    assert restored.get_state() == tracker.get_state()
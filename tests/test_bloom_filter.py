@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from AccessLog import AccessLog
+from LogWindow import LogWindow
+from BloomFilter import BloomFilter, FirstSeenTracker, key_hashes
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def row(ip: str, path: str, timestamp: datetime) -> AccessLog:
+    return AccessLog(
+        source_ip=ip,
+        date=timestamp.strftime("%d-%m-%Y %H:%M:%S"),
+        first_line_of_request=f"GET {path} HTTP/1.1",
+        http_status_code=200,
+        bytes_received=100,
+        bytes_sent=1000,
+        user_agent="test",
+        timestamp=timestamp,
+        ua_category="browser",
+        weight=1,
+    )
+
+
+def test_false_positive_rate():
+    bloom = BloomFilter(20000, 0.01)
+    for i in range(20000):
+        bloom.add_hashes(*key_hashes(f"seen-{i}"))
+    assert all(f"seen-{i}" in bloom for i in range(20000))
+    assert sum(f"other-{i}" in bloom for i in range(20000)) < 20000 * 0.02
+
+
+def test_no_first_seen_flags_while_warming_up(tmp_path):
+    tracker = FirstSeenTracker(str(tmp_path / "first-seen.bloom"))
+    window = LogWindow()
+    for i in range(100):
+        window.append(row(f"10.0.0.{i}", f"/page-{i}", START + timedelta(minutes=i)))
+    tracker.observe_window(window)
+    assert tracker.warming_up
+    assert tracker.new == {"ips": {}, "paths": {}}
+
+    later = START + timedelta(minutes=FirstSeenTracker.WARMUP_MINUTES + 5)
+    window.append(row("10.0.0.1", "/page-1", later))
+    window.append(row("192.0.2.1", "/admin", later))
+    tracker.observe_window(window)
+    assert not tracker.warming_up
+    assert list(tracker.new["ips"]) == ["192.0.2.1"]
+    assert list(tracker.new["paths"]) == ["/admin"]
+
+
+def test_state_is_saved_on_rotation_or_shutdown(tmp_path):
+    path = tmp_path / "first-seen.bloom"
+    tracker = FirstSeenTracker(str(path))
+    window = LogWindow()
+    window.append(row("10.0.0.1", "/", START))
+    tracker.observe_window(window)
+    assert tracker.save()
+
+    window.append(row("10.0.0.2", "/", START + timedelta(minutes=5)))
+    tracker.observe_window(window)
+    assert not tracker.save()
+    assert tracker.save(force=True)
+
+    window.append(row("10.0.0.3", "/", START + timedelta(days=1)))
+    tracker.observe_window(window)
+    assert tracker.save()
+
+    restored = FirstSeenTracker(str(path))
+    restored.load()
+    assert restored.started == tracker.started
+    assert restored.newest == tracker.newest
+    assert restored.filters["ips"].add("10.0.0.3", tracker.newest // 1440) is False
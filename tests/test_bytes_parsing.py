@@ -0,0 +1,53 @@
+import threading
+from datetime import datetime, timedelta
+
+from AccessLogReader import LogReader
+from LogFormats import FORMATS
+from LogWindow import LogWindow
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def parse(data: bytes):
+    reader = LogReader()
+    window = LogWindow()
+    stats = dict.fromkeys(reader.stats, 0)
+    done = threading.Event()
+
+    def run():
+        reader._parse_into(window, data, 0, FORMATS["custom"], START, None, 1.0, None, None, stats)
+        done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    assert done.wait(5), "parsing did not finish"
+    return list(window), stats
+
+
+def line(ip: str, seconds: int, sent: bytes = b"1200", ua: bytes = b"Mozilla/5.0") -> bytes:
+    dt = (START + timedelta(seconds=seconds)).strftime("%d-%m-%Y %H:%M:%S").encode()
+    return ip.encode() + b' "' + dt + b'" "GET /a HTTP/1.1" 200 300 ' + sent + b' "' + ua + b'"'
+
+
+def test_last_line_without_newline_is_parsed():
+    rows, stats = parse(line("10.0.0.1", 1) + b"\n" + line("10.0.0.2", 2))
+    assert [log.source_ip for log in rows] == ["10.0.0.1", "10.0.0.2"]
+    assert stats["lines_parsed"] == 2
+
+    rows, stats = parse(b"truncated line")
+    assert rows == [] and stats["malformed_lines"] == 1
+
+
+def test_fields_are_decoded_and_shared():
+    data = b"\n".join([
+        line("10.0.0.1", 1),
+        line("10.0.0.1", 1, sent=b"-", ua=b"caf\xc3\xa9 \xff"),
+        line("10.0.0.2", -60),
+        b"",
+    ])
+    rows, stats = parse(data)
+    assert (stats["lines_parsed"], stats["dropped_lines"], stats["malformed_lines"]) == (2, 1, 0)
+    first, second = rows
+    assert first.source_ip is second.source_ip
+    assert first.timestamp is second.timestamp
+    assert second.bytes_sent == 0
+    assert second.user_agent == "café �"
@@ -0,0 +1,49 @@
+import os
+from datetime import datetime, timedelta
+
+from AccessLogReader import LogReader
+from Checkpoint import decode_column, encode_column, load_checkpoint, pack_numbers, save_checkpoint, unpack_numbers
+
+
+def test_columns_and_numbers_round_trip():
+    symbols, codes = encode_column(["a", "b", "a", "c", "a"])
+    assert symbols == ["a", "b", "c"]
+    assert decode_column(symbols, codes) == ["a", "b", "a", "c", "a"]
+    assert list(unpack_numbers("d", pack_numbers("d", [1.5, 2.0]))) == [1.5, 2.0]
+
+
+def test_save_is_atomic_and_bad_files_are_ignored(tmp_path):
+    path = tmp_path / "state.ckpt"
+    save_checkpoint(str(path), {"offsets": {"/var/log/a": 10}, "blob": b"\x00" * 100})
+    save_checkpoint(str(path), {"offsets": {"/var/log/a": 20}})
+    assert load_checkpoint(str(path)) == {"offsets": {"/var/log/a": 20}}
+    assert os.listdir(tmp_path) == ["state.ckpt"]
+
+    data = path.read_bytes()
+    for broken in (data[:5], b"XXXX" + data[4:], data[:-3]):
+        path.write_bytes(broken)
+        assert load_checkpoint(str(path)) is None
+    assert load_checkpoint(str(tmp_path / "missing.ckpt")) is None
+
+
+def test_restore_rereads_a_truncated_log(tmp_path):
+    now = datetime.now().replace(microsecond=0)
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    path = reader._build_log_path(now)
+    line = '10.0.0.{} "{}" "GET / HTTP/1.1" 200 300 1200 "Mozilla/5.0"\n'
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(line.format(i, (now - timedelta(seconds=i)).strftime("%d-%m-%Y %H:%M:%S")) for i in range(20, 0, -1))
+    reader.load_logs_for_minutes(15)
+    state = reader.get_state()
+    del state["vhosts"]
+
+    # the log was rotated and restarted after the checkpoint was written
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(line.format(99, now.strftime("%d-%m-%Y %H:%M:%S")))
+
+    restored = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    restored.restore_state(state)
+    assert all(log.vhost is None for log in restored.window)
+    window = restored.load_logs_for_minutes(15)
+    assert len(window) == 21
+    assert list(window)[-1].source_ip == "10.0.0.99"
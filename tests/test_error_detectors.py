@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from AccessLog import AccessLog
+from LogWindow import LogWindow
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def window_of(rows, weight=1):
+    window = LogWindow()
+    for i, (status, category) in enumerate(rows):
+        timestamp = START + timedelta(seconds=i)
+        window.append(AccessLog(
+            source_ip=f"10.0.0.{i % 5}",
+            date=timestamp.strftime("%d-%m-%Y %H:%M:%S"),
+            first_line_of_request=f"GET /missing-{i}.php HTTP/1.1",
+            http_status_code=status,
+            bytes_received=100,
+            bytes_sent=1000,
+            user_agent=category,
+            timestamp=timestamp,
+            ua_category=category,
+            weight=weight,
+        ))
+    return window
+
+
+@pytest.mark.parametrize("module, status, total", [
+    ("DetectHttpNotFoundError", 404, "total_404_errors"),
+    ("DetectHttpAuthError", 403, "total_401_403_errors"),
+])
+def test_all_excluded_errors_keep_totals_and_keys(report_dir, module, status, total):
+    detector_class = getattr(__import__(module), module)
+    detector = detector_class(exclude_ua_categories=["bot"])
+
+    normal = detector.analyze(window_of([(status, "browser")] * 3))
+    excluded = detector.analyze(window_of([(status, "bot")] * 4))
+
+    assert excluded.keys() == normal.keys()
+    assert excluded["stats"].keys() == normal["stats"].keys()
+    assert excluded["stats"][total] == 4
+    assert excluded["stats"]["excluded_by_ua_category"] == 4
+    assert excluded["stats"]["parsed_errors"] == 0
+    assert excluded["path_freq"] == [] and excluded["vhost_freq"] == []
+    detector.generate_html_report(excluded)
+
+
+
+@pytest.mark.parametrize("module, status, total", [
+    ("DetectHttpNotFoundError", 404, "total_404_errors"),
+    ("DetectHttpAuthError", 401, "total_401_403_errors"),
+])
+def test_sampled_counts_are_weighted_and_samples_bounded(report_dir, module, status, total):
+    detector_class = getattr(__import__(module), module)
+    detector = detector_class(exclude_ua_categories=["bot"], sample_size=4)
+
+    analysis = detector.analyze(window_of([(status, "browser")] * 30 + [(status, "bot")] * 20, weight=10))
+    stats = analysis["stats"]
+    assert stats[total] == 500
+    assert stats["parsed_errors"] == 300
+    assert stats["excluded_by_ua_category"] == 200
+    assert stats["parsed_errors"] + stats["excluded_by_ua_category"] == stats[total]
+    assert stats["sampling"]["active"]
+
+    # only the newest rows are kept as samples
+    samples = analysis["sample_data"]
+    assert [sample["timestamp"] for sample in samples] == [START + timedelta(seconds=i) for i in (29, 28, 27, 26)]
@@ -0,0 +1,26 @@
+import pytest
+
+from FileTypeClassifier import classify_extension, classify_file_type, get_extension
+
+
+@pytest.mark.parametrize("path, ext", [
+    ("/images/logo.PNG", ".png"),
+    ("/backup/site.tar.gz?download=1", ".tar.gz"),
+    ("/dir.v2/readme", ""),
+    ("/.env", ""),
+    ("/.git/config.bak#top", ".bak"),
+    ("/", ""),
+])
+def test_get_extension(path, ext):
+    assert get_extension(path) == ext
+
+
+def test_classification_is_cached_per_extension():
+    classify_extension.cache_clear()
+    assert classify_file_type("/a/photo.jpg") == "image"
+    assert classify_file_type("/b/other.JPG?x=1") == "image"
+    assert classify_file_type("/docs/manual.pdf") == "pdf"
+    assert classify_file_type("/robots.txt") == "text file"
+    assert classify_file_type("/wp-login") == "unknown"
+    info = classify_extension.cache_info()
+    assert info.hits == 1 and info.misses == 4
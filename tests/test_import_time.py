@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("matplotlib", "bs4", "psutil")
+
+
+def test_main_does_not_import_heavy_modules():
+    probe = (
+        "import sys, main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    loaded = [module for module in result.stdout.strip().split(",") if module]
+    assert loaded == [], f"importing main loaded {', '.join(loaded)} eagerly"
+
+
+def test_main_imports_within_the_startup_budget():
+    from bench_import_time import BUDGET_MS, best_import_ms
+
+    best, _ = best_import_ms(runs=3)
+    assert best is not None, "-X importtime reported no timing for main"
+    assert best <= BUDGET_MS, f"importing main took {best:.1f} ms, budget is {BUDGET_MS:.0f} ms"
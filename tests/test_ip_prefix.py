@@ -0,0 +1,42 @@
+from IpPrefix import PrefixTrie, format_prefix, pack_ip, prefix_of
+
+MINUTE = 29_000_000
+
+
+def test_pack_ip_and_prefixes():
+    assert pack_ip("10.1.2.3") == (4, 0x0A010203)
+    assert pack_ip("::ffff:10.1.2.3") == (4, 0x0A010203)
+    assert pack_ip("2001:db8::1")[0] == 6
+    assert pack_ip("unknown") is None
+    assert format_prefix(4, prefix_of(4, 0x0A010203, 24), 24) == "10.1.2.0/24"
+    version, value = pack_ip("2001:db8:1:2:3::1")
+    assert format_prefix(version, prefix_of(version, value, 48), 48) == "2001:db8:1::/48"
+
+
+def test_prefix_trie_longest_match():
+    trie = PrefixTrie(["10.0.0.0/8", "2001:db8::/32"])
+    trie.insert("10.1.0.0/16", "office")
+    assert len(trie) == 3
+    assert trie.lookup("10.1.2.3") == "office"
+    assert trie.lookup("10.9.9.9") is True
+    assert "192.0.2.1" not in trie
+    assert "2001:db8::5" in trie
+    assert "2001:db9::5" not in trie
+
+
+def test_distributed_subnet_is_flagged_without_its_hosts(report_dir):
+    from DoSDetector import DoSDetector
+
+    # 100 hosts with 5 requests each stay far below the per-IP limits, the /24 does not
+    summary = {f"203.0.113.{i}": {MINUTE: [5, 5000, 0]} for i in range(1, 101)}
+    summary["198.51.100.1"] = {MINUTE: [5, 5000, 0]}
+    detector = DoSDetector(allowlist=["198.51.100.0/24"])
+
+    assert detector.evaluate(summary) == {}
+    subnets = detector.evaluate_subnets(summary)
+    assert list(subnets) == ["203.0.113.0/24"]
+    assert subnets["203.0.113.0/24"]["unique_ips"] == 100
+    assert subnets["203.0.113.0/24"]["max_requests_per_min"] == 500
+
+    denied = DoSDetector(denylist=["198.51.100.0/24"]).evaluate(summary)
+    assert list(denied) == ["198.51.100.1"]
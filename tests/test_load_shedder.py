@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from LoadShedder import LoadShedder
+from AccessLogReader import LogReader
+from synthetic import make_lines, write_log
+
+
+def test_sample_rate_drops_under_load_and_recovers():
+    shedder = LoadShedder(budget_seconds=60, min_rate=0.05)
+    assert shedder.record_cycle(30) == 1.0
+    assert not shedder.active
+
+    rates = [shedder.record_cycle(240) for _ in range(6)]
+    assert rates == sorted(rates, reverse=True)
+    assert rates[0] <= 0.5
+    assert rates[-1] == 0.05
+
+    while shedder.active:
+        shedder.record_cycle(5)
+    assert shedder.sample_rate == 1.0
+
+
+def test_sampled_rows_are_weighted_and_exact_ips_kept(tmp_path):
+    offender = "203.0.113.7"
+    lines = make_lines(20000, end=datetime.now(), hot_ip=offender, hot_ip_share=0.01)
+    write_log(str(tmp_path), lines)
+    exact = sum(offender in line for line in lines)
+
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    window = reader.load_logs_for_minutes(15, sample_rate=0.1, exact_ips={offender})
+    rows = list(window)
+    assert sum(log.source_ip == offender for log in rows) == exact
+    assert all(log.weight == 1 for log in rows if log.source_ip == offender)
+    assert all(log.weight == 10 for log in rows if log.source_ip != offender)
+    estimate = sum(log.weight for log in rows)
+    assert abs(estimate - len(lines)) < len(lines) * 0.1
+    assert reader.stats["sampled_out_lines"] > 15000
@@ -0,0 +1,73 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import LogFormats
+from AccessLogReader import LogReader
+from LogFormats import FORMATS, LogFormat, decode_clf_time, detect_format, register_format
+
+COMBINED = b'192.0.2.1 - alice [01/Oct/2026:12:00:05 +0000] "GET /a?b=1 HTTP/1.1" 404 512 "https://example.com/" "curl/8.0"'
+VHOST = b'shop.example.com:443 192.0.2.2 - - [01/Oct/2026:12:00:06 +0000] "POST /cart HTTP/2.0" 200 1024 "-" "Mozilla/5.0"'
+COMMON = b'192.0.2.3 - - [01/Oct/2026:12:00:07 +0000] "GET / HTTP/1.0" 200 -'
+
+
+def test_parse_standard_formats():
+    assert FORMATS["combined"].parse(COMBINED) == (
+        b"192.0.2.1", b"01/Oct/2026:12:00:05 +0000", b"GET /a?b=1 HTTP/1.1", 404, 0, 512, b"curl/8.0",
+    )
+    match = FORMATS["vhost_combined"].match(VHOST)
+    assert match.group("vhost") == b"shop.example.com"
+    assert FORMATS["vhost_combined"].parse(VHOST)[:4] == (b"192.0.2.2", b"01/Oct/2026:12:00:06 +0000", b"POST /cart HTTP/2.0", 200)
+    assert FORMATS["common"].parse(COMMON)[5:] == (0, b"-")
+    assert FORMATS["custom"].parse(COMBINED) is None
+
+
+def test_clf_time_applies_the_offset():
+    utc = decode_clf_time(b"01/Oct/2026:12:00:05 +0000")
+    assert decode_clf_time(b"01/Oct/2026:14:00:05 +0200") == utc
+    assert decode_clf_time(b"01/Oct/2026:07:30:05 -0430") == utc
+    assert decode_clf_time(b"01/Oct/2026:12:00:05") == datetime(2026, 10, 1, 12, 0, 5)
+
+
+def test_detect_and_register_formats(monkeypatch):
+    assert detect_format([COMBINED, COMBINED]) is FORMATS["combined"]
+    assert detect_format([VHOST]) is FORMATS["vhost_combined"]
+    assert detect_format([COMMON]) is FORMATS["common"]
+    assert detect_format([b"garbage"]) is None
+
+    monkeypatch.setattr(LogFormats, "FORMATS", dict(FORMATS))
+    tab = register_format("tab", "%h\t%{%Y-%m-%dT%H:%M:%S}t\t%>s\t%r")
+    line = b"192.0.2.4\t2026-10-01T12:00:08\t503\tGET /health HTTP/1.1"
+    assert LogFormats.FORMATS["tab"] is tab
+    parsed = tab.parse(line)
+    assert parsed[3] == 503 and tab.decode_time(parsed[1]) == datetime(2026, 10, 1, 12, 0, 8)
+    assert detect_format([line], LogFormats.FORMATS.values()) is tab
+
+    with pytest.raises(ValueError):
+        LogFormat("no-time", '%h "%r" %>s')
+
+
+def test_reader_detects_the_format_per_file(tmp_path):
+    start = datetime(2026, 10, 1, 12, 0)
+    lines = {
+        "shop-access.log": [
+            f'shop.example.com:443 10.0.0.{i} - - [{(start + timedelta(seconds=2 * i)).strftime("%d/%b/%Y:%H:%M:%S")}] '
+            f'"GET /p{i} HTTP/1.1" 200 100 "-" "Mozilla/5.0"\n'
+            for i in range(10)
+        ],
+        "blog-access.log": [
+            f'10.1.0.{i} "{(start + timedelta(seconds=2 * i + 1)).strftime("%d-%m-%Y %H:%M:%S")}" '
+            f'"GET /q{i} HTTP/1.1" 200 50 100 "Mozilla/5.0"\n'
+            for i in range(10)
+        ],
+    }
+    for name, content in lines.items():
+        with open(os.path.join(tmp_path, name), "w", encoding="utf-8") as f:
+            f.writelines(content)
+
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"), sources=["*-access.log"])
+    rows = list(reader.load_logs_between(start, start + timedelta(minutes=1)))
+    assert len(rows) == 20
+    assert [row.vhost for row in rows[:4]] == ["shop.example.com", "blog", "shop.example.com", "blog"]
+    assert {reader._format_for(os.path.join(tmp_path, name)).name for name in lines} == {"vhost_combined", "custom"}
@@ -0,0 +1,134 @@
+import os
+from datetime import datetime, timedelta
+
+from AccessLogReader import LogReader
+from Checkpoint import save_checkpoint, load_checkpoint
+from TimeIndex import TimeIndex, minute_of
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def line(ip: str, dt: datetime, path: str = "/", status: int = 200, ua: str = "Mozilla/5.0") -> str:
+    return f'{ip} "{dt.strftime("%d-%m-%Y %H:%M:%S")}" "GET {path} HTTP/1.1" {status} 300 1200 "{ua}"\n'
+
+
+def fields(window):
+    return [tuple(getattr(log, slot) for slot in log.__slots__) for log in window]
+
+
+def write(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    return str(path)
+
+
+def test_parse_log_line():
+    reader = LogReader()
+    log = reader.parse_log_line(line("192.0.2.1", START, "/login.php", 404, "curl/8.0"))
+    assert log.source_ip == "192.0.2.1"
+    assert log.timestamp == START
+    assert log.first_line_of_request == "GET /login.php HTTP/1.1"
+    assert log.http_status_code == 404
+    assert (log.bytes_received, log.bytes_sent) == (300, 1200)
+    assert log.user_agent == "curl/8.0"
+
+    combined = '192.0.2.2 - - [01/Oct/2026:12:00:05 +0000] "GET /a HTTP/1.1" 200 512 "-" "Mozilla/5.0"'
+    log = reader.parse_log_line(combined)
+    assert log.source_ip == "192.0.2.2" and log.http_status_code == 200
+    assert reader.parse_log_line("not a log line") is None
+
+
+def test_load_logs_for_minutes_tails_the_file(tmp_path):
+    now = datetime.now().replace(microsecond=0)
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    path = reader._build_log_path(now)
+    write(path, [
+        line("10.0.0.1", now - timedelta(hours=2)),
+        line("10.0.0.2", now - timedelta(minutes=5)),
+        "garbage\n",
+        line("10.0.0.3", now - timedelta(minutes=1), status=500),
+    ])
+
+    window = reader.load_logs_for_minutes(15)
+    assert [log.source_ip for log in window] == ["10.0.0.2", "10.0.0.3"]
+    assert reader.stats["malformed_lines"] == 1
+    assert reader.stats["dropped_lines"] == 1
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line("10.0.0.4", now))
+    window = reader.load_logs_for_minutes(15)
+    assert [log.source_ip for log in window] == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+    assert reader.stats["lines_parsed"] == 3
+
+
+def test_checkpoint_round_trip(tmp_path):
+    now = datetime.now().replace(microsecond=0)
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    path = reader._build_log_path(now)
+    write(path, [line(f"10.0.0.{i}", now - timedelta(seconds=60 - i), f"/p{i}", 200 + i) for i in range(10)])
+    reader.load_logs_for_minutes(15)
+
+    checkpoint = str(tmp_path / "reader.ckpt")
+    save_checkpoint(checkpoint, reader.get_state())
+    state = load_checkpoint(checkpoint)
+    assert state is not None
+
+    restored = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    restored.restore_state(state)
+    assert fields(restored.window) == fields(reader.window)
+    assert restored._offsets == reader._offsets
+
+    # a restored reader resumes from the saved offset instead of re-reading the file
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line("10.0.0.99", now))
+    restored.load_logs_for_minutes(15)
+    assert restored.stats["lines_parsed"] == 1
+    assert len(restored.window) == 11
+
+
+def test_corrupt_checkpoint_is_ignored(tmp_path):
+    checkpoint = tmp_path / "reader.ckpt"
+    save_checkpoint(str(checkpoint), {"rows": 0})
+    data = bytearray(checkpoint.read_bytes())
+    data[-1] ^= 0xFF
+    checkpoint.write_bytes(bytes(data))
+    assert load_checkpoint(str(checkpoint)) is None
+
+
+def test_time_index_range_reads(tmp_path):
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    path = reader._build_log_path(START)
+    lines = [line(f"10.0.{minute}.{i}", START + timedelta(minutes=minute, seconds=i)) for minute in range(60) for i in range(5)]
+    write(path, lines)
+
+    window = reader.load_logs_between(START + timedelta(minutes=20), START + timedelta(minutes=25))
+    assert len(window) == 25
+    assert {log.timestamp.minute for log in window} == set(range(20, 25))
+
+    index = TimeIndex.open(path, str(tmp_path / "index"))
+    assert index.minutes == [minute_of(START) + minute for minute in range(60)]
+    offset = index.offset_for(minute_of(START) + 30)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        assert f.readline().decode() == lines[30 * 5]
+
+    # a fresh reader picks up the saved sidecar
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"))
+    window = reader.load_logs_between(START + timedelta(minutes=59), START + timedelta(minutes=61))
+    assert [log.source_ip for log in window] == [f"10.0.59.{i}" for i in range(5)]
+
+
+def test_vhost_sources_are_merged_by_timestamp(tmp_path):
+    for vhost, offset in (("shop", 0), ("blog", 1), ("api", 2)):
+        write(tmp_path / vhost / START.strftime("access_log-%Y-%m-%d"), [
+            line(f"10.{offset}.0.{i}", START + timedelta(seconds=3 * i + offset)) for i in range(20)
+        ])
+
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"), sources=["*/access_log-%Y-%m-%d"])
+    window = reader.load_logs_between(START, START + timedelta(minutes=5))
+    rows = list(window)
+    assert len(rows) == 60
+    assert [log.timestamp for log in rows] == sorted(log.timestamp for log in rows)
+    assert [log.vhost for log in rows[:3]] == ["shop", "blog", "api"]
+    assert not any(name.endswith(TimeIndex.SUFFIX) for name in os.listdir(tmp_path / "shop"))
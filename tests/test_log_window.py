@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from AccessLog import AccessLog
+from LogWindow import LogWindow
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def row(ip: str, status: int, timestamp: datetime) -> AccessLog:
+    return AccessLog(
+        source_ip=ip,
+        date=timestamp.strftime("%d-%m-%Y %H:%M:%S"),
+        first_line_of_request="GET / HTTP/1.1",
+        http_status_code=status,
+        bytes_received=100,
+        bytes_sent=1000,
+        user_agent="test",
+        timestamp=timestamp,
+        weight=1,
+    )
+
+
+def test_status_and_ip_indexes():
+    window = LogWindow()
+    for i in range(12):
+        window.append(row(f"10.0.0.{i % 3}", (200, 404, 403)[i % 3], START + timedelta(seconds=i)))
+
+    assert sorted(window.statuses()) == [200, 403, 404]
+    assert window.status_count(404) == 4
+    assert window.status_count(401, 403) == 4
+    assert [log.timestamp.second for log in window.by_status(404, 403)] == [1, 2, 4, 5, 7, 8, 10, 11]
+    assert [log.http_status_code for log in window.rows_for_ip("10.0.0.2")] == [403] * 4
+    assert dict((ip, len(rows)) for ip, rows in window.by_ip()) == {"10.0.0.0": 4, "10.0.0.1": 4, "10.0.0.2": 4}
+
+
+def test_expire_keeps_indexes_consistent():
+    window = LogWindow()
+    for i in range(10):
+        window.append(row(f"10.0.0.{i}", 404 if i < 5 else 200, START + timedelta(minutes=i)))
+
+    assert window.expire(START + timedelta(minutes=6)) == 6
+    assert len(window) == 4
+    assert window.status_count(404) == 0
+    assert 404 not in window.statuses()
+    assert window.ips() == ["10.0.0.6", "10.0.0.7", "10.0.0.8", "10.0.0.9"]
+    assert len(window.columns()[0]) == 4
+
+    row_id = window.append(row("10.0.0.6", 500, START + timedelta(minutes=11)))
+    assert window.row(row_id).http_status_code == 500
+    assert [log.http_status_code for log in window.rows_for_ip("10.0.0.6")] == [200, 500]
+    assert [log.source_ip for log in window.since(row_id - 1)] == ["10.0.0.9", "10.0.0.6"]
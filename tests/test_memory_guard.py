@@ -0,0 +1,24 @@
+from MemoryGuard import MemoryGuard
+
+
+class Detector:
+
+    def __init__(self):
+        self.sample_lines_per_ip = 10
+        self.sample_size = 40
+
+
+def test_enforce_restores_every_shrunk_attribute(monkeypatch):
+    guard = MemoryGuard(budget_bytes=1000)
+    detector = Detector()
+
+    monkeypatch.setattr(guard, "usage", lambda: 2000)
+    guard.enforce(None, [detector])
+    assert (detector.sample_lines_per_ip, detector.sample_size) == (5, 20)
+    guard.enforce(None, [detector])
+    assert (detector.sample_lines_per_ip, detector.sample_size) == (2, 10)
+
+    monkeypatch.setattr(guard, "usage", lambda: 100)
+    guard.enforce(None, [detector])
+    assert (detector.sample_lines_per_ip, detector.sample_size) == (10, 40)
+    assert not guard.skip_charts
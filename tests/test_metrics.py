@@ -0,0 +1,44 @@
+from urllib.request import urlopen
+
+from Metrics import MetricsFileWriter, MetricsRegistry, MetricsServer
+
+
+def test_render_prometheus_text():
+    metrics = MetricsRegistry()
+    metrics.inc("lines_parsed_total", 10, help_text="Lines parsed.")
+    metrics.inc("lines_parsed_total", 5)
+    metrics.set("window_rows", 42, labels={"group": "dos"})
+    metrics.observe_stage("parse", 0.003)
+    metrics.observe_stage("parse", 0.2)
+    with metrics.time("detect"):
+        pass
+
+    text = metrics.render()
+    assert "# HELP apache_analyzer_lines_parsed_total Lines parsed.\n" in text
+    assert "# TYPE apache_analyzer_lines_parsed_total counter\napache_analyzer_lines_parsed_total 15\n" in text
+    assert 'apache_analyzer_window_rows{group="dos"} 42\n' in text
+    assert 'apache_analyzer_stage_duration_seconds_bucket{stage="parse",le="0.001"} 0\n' in text
+    assert 'apache_analyzer_stage_duration_seconds_bucket{stage="parse",le="0.005"} 1\n' in text
+    assert 'apache_analyzer_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 2\n' in text
+    assert 'apache_analyzer_stage_duration_seconds_count{stage="detect"} 1\n' in text
+
+
+def test_server_and_file_writer(tmp_path):
+    metrics = MetricsRegistry()
+    metrics.set("window_rows", 7)
+
+    server = MetricsServer(metrics, port=0)
+    host, port = server.start()
+    try:
+        with urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert b"apache_analyzer_window_rows 7" in response.read()
+    finally:
+        server.stop()
+
+    path = tmp_path / "metrics.prom"
+    writer = MetricsFileWriter(metrics, str(path))
+    writer.write()
+    for handler in writer._logger.handlers:
+        handler.flush()
+    assert "apache_analyzer_window_rows 7" in path.read_text(encoding="utf-8")
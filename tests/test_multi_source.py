@@ -0,0 +1,82 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from AccessLogReader import LogReader
+from TimeIndex import TimeIndex
+
+START = datetime(2026, 10, 1, 12, 0)
+ATTACKER = "203.0.113.7"
+
+
+def line(ip: str, dt: datetime, path: str = "/") -> str:
+    return f'{ip} "{dt.strftime("%d-%m-%Y %H:%M:%S")}" "GET {path} HTTP/1.1" 200 300 1200 "Mozilla/5.0"\n'
+
+
+def append(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+@pytest.mark.parametrize("path, vhost", [
+    ("logs/shop-access.log", "shop"),
+    ("logs/blog_access_log", "blog"),
+    ("logs/api.example.org-access.log-2026-10-01", "api.example.org"),
+    ("logs/shop/access_log-2026-10-01", "shop"),
+    ("logs/www/access.log", "www"),
+])
+def test_vhost_names(path, vhost):
+    reader = LogReader("logs", sources=["*"])
+    assert reader._vhost_for(path) == vhost
+    assert LogReader("logs")._vhost_for(path) is None
+
+
+def test_sources_are_tailed_and_merged(tmp_path):
+    now = datetime.now().replace(microsecond=0)
+    shop, blog = str(tmp_path / "shop-access.log"), str(tmp_path / "blog-access.log")
+    append(shop, [line("10.0.0.1", now - timedelta(seconds=50)), line("10.0.0.3", now - timedelta(seconds=30))])
+    append(blog, [line("10.0.0.2", now - timedelta(seconds=40)), line("10.0.0.4", now - timedelta(seconds=20))])
+    # sidecars that match the glob are not read as logs
+    append(str(tmp_path / ("shop-access.log" + TimeIndex.SUFFIX)), ["not a log\n"])
+
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"), sources=["*-access.log*"])
+    window = reader.load_logs_for_minutes(15)
+    assert [(log.source_ip, log.vhost) for log in window] == [
+        ("10.0.0.1", "shop"), ("10.0.0.2", "blog"), ("10.0.0.3", "shop"), ("10.0.0.4", "blog"),
+    ]
+    assert reader.stats["malformed_lines"] == 0
+
+    append(blog, [line("10.0.0.5", now - timedelta(seconds=10))])
+    append(shop, [line("10.0.0.6", now - timedelta(seconds=5))])
+    window = reader.load_logs_for_minutes(15)
+    assert [log.source_ip for log in window][-2:] == ["10.0.0.5", "10.0.0.6"]
+    assert reader.stats["lines_parsed"] == 6
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_attacks_spread_across_sites_are_flagged_globally(tmp_path, report_dir, vectorized):
+    from DoSDetector import DoSDetector
+
+    for vhost in ("shop", "blog", "api"):
+        append(str(tmp_path / vhost / START.strftime("access_log-%Y-%m-%d")), [
+            line(ATTACKER, START + timedelta(seconds=i), f"/{vhost}/{i}") for i in range(40)
+        ] + [line("10.0.0.1", START + timedelta(seconds=45))])
+
+    reader = LogReader(str(tmp_path), index_dir=str(tmp_path / "index"), sources=["*/access_log-%Y-%m-%d"])
+    window = reader.load_logs_between(START, START + timedelta(minutes=5))
+    analysis = DoSDetector(vectorized=vectorized).analyze(window)
+
+    # 40 requests a minute per site stay under the limit, 120 across the sites do not
+    assert list(analysis["offending"]) == [ATTACKER]
+    assert analysis["offending"][ATTACKER]["vhosts"] == {"shop": 40, "blog": 40, "api": 40}
+    sites = analysis["stats"]["vhosts"]
+    assert sorted(sites) == ["api", "blog", "shop"]
+    assert sites["shop"] == {
+        "total_requests": 41,
+        "unique_ips": 2,
+        "max_requests_per_min": 41,
+        "total_bytes_sent": 41 * 1200,
+        "offending_ips": 1,
+    }
@@ -0,0 +1,36 @@
+from PathClustering import WILDCARD, PathTemplateTrie, normalize_path
+
+
+def test_normalize_path():
+    assert normalize_path("/user/12345/profile?tab=1") == "/user/{n}/profile"
+    assert normalize_path("/files/3f2a9c1d0b/raw") == "/files/{hex}/raw"
+    assert normalize_path("/o/123e4567-e89b-12d3-a456-426614174000") == "/o/{uuid}"
+    assert normalize_path("/s/abcDEF123456ghiJKL") == "/s/{id}"
+    assert normalize_path("/wp-admin/setup-config.php") == "/wp-admin/setup-config.php"
+
+
+def test_scan_paths_collapse_into_one_template():
+    trie = PathTemplateTrie()
+    for i in range(500):
+        trie.add(f"/backup/{i}.zip", ip=f"10.0.0.{i % 7}")
+    trie.add("/.env", ip="10.0.0.1")
+    top = trie.top(2)
+    assert top[0]["template"] == "/backup/{n}.zip"
+    assert top[0]["count"] == 500 and top[0]["unique_ips"] == 7
+    assert top[1]["template"] == "/.env"
+
+
+def test_cardinality_stays_bounded():
+    trie = PathTemplateTrie(max_templates=50, max_children=10, max_ips_per_template=3)
+    for i in range(200):
+        trie.add(f"/scan-{chr(97 + i % 26)}{chr(97 + i // 26)}/index.php", ip=f"10.0.{i}.1")
+    assert len(trie) <= 50
+    top = trie.top(1)[0]
+    assert top["template"] == f"/{WILDCARD}/index.php"
+    assert top["unique_ips"] == 3 and top["ips_capped"]
+
+    trie = PathTemplateTrie(max_templates=5)
+    for i in range(20):
+        trie.add(f"/page-{chr(97 + i)}")
+    assert len(trie) == 5 and trie.evicted == 15
+    assert [item["template"] for item in trie.top(5)] == [f"/page-{chr(97 + i)}" for i in range(15, 20)]
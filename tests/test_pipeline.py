@@ -0,0 +1,119 @@
+import multiprocessing
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from AccessLog import AccessLog
+from LogWindow import LogWindow
+from Metrics import MetricsRegistry
+from Pipeline import Pipeline, RingBuffer, append_records, to_record
+from UserAgentClassifier import UserAgentClassifier
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def log(i: int, request: str = "GET / HTTP/1.1", user_agent: str = "Mozilla/5.0") -> AccessLog:
+    timestamp = START + timedelta(seconds=i)
+    return AccessLog(
+        source_ip=f"10.0.{i // 256 % 256}.{i % 256}",
+        date=timestamp.strftime("%d-%m-%Y %H:%M:%S"),
+        first_line_of_request=request,
+        http_status_code=200,
+        bytes_received=100,
+        bytes_sent=1000 + i,
+        user_agent=user_agent,
+        timestamp=timestamp,
+        weight=1,
+        vhost="shop",
+    )
+
+
+@pytest.fixture
+def ring():
+    ring = RingBuffer(capacity=256, create=True)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def test_records_round_trip(ring):
+    cache = {}
+    pushed = ring.push(to_record(log(i), cache) for i in range(100))
+    records, seq, lost = ring.read(0)
+    assert (pushed, seq, lost) == (100, 100, 0)
+
+    window = LogWindow()
+    append_records(window, records, UserAgentClassifier())
+    rows = list(window)
+    assert [row.bytes_sent for row in rows] == [1000 + i for i in range(100)]
+    assert rows[5].source_ip == "10.0.0.5" and rows[5].vhost == "shop" and rows[5].timestamp == START + timedelta(seconds=5)
+    assert rows[5].ua_category == "browser"
+
+
+def test_writer_waits_for_a_slow_reader(ring):
+    ring.ack(0, 0)
+    received = []
+
+    def drain():
+        seq = 0
+        while seq < 1000:
+            records, seq, lost = ring.read(seq)
+            assert lost == 0
+            received.extend(records)
+            ring.ack(0, seq, lost)
+            time.sleep(0.001)
+
+    reader = threading.Thread(target=drain)
+    reader.start()
+    cache = {}
+    assert ring.push((to_record(log(i), cache) for i in range(1000)), max_wait=10) == 1000
+    reader.join(10)
+    assert len(received) == 1000 and ring.lost(0) == 0
+
+
+def test_truncated_fields_are_counted(ring):
+    pipeline = Pipeline(metrics=MetricsRegistry())
+    pipeline.ring = ring
+    cache, truncated = {}, {}
+    records = [
+        to_record(log(0, request="GET /" + "a" * 300 + " HTTP/1.1"), cache, truncated),
+        to_record(log(1, user_agent="x" * 200), cache, truncated),
+        to_record(log(2, user_agent="x" * 200), cache, truncated),
+        to_record(log(3), cache, truncated),
+    ]
+    assert truncated == {"request": 1, "user_agent": 2}
+    ring.push(records)
+    ring.add_truncated(truncated)
+
+    assert pipeline.record_truncation() == {"request": 1, "user_agent": 2}
+    assert pipeline.record_truncation() == {}
+    text = pipeline.metrics.render()
+    assert 'apache_analyzer_ring_truncated_fields_total{field="user_agent"} 2' in text
+
+
+def test_group_reports_are_combined_and_mailed_once(monkeypatch, tmp_path):
+    import MailSender
+    import Report
+
+    sent, combined = [], []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Report, "main", lambda name, **kwargs: combined.append(name))
+    monkeypatch.setattr(MailSender, "send_email", lambda **kwargs: sent.append(kwargs))
+
+    pipeline = Pipeline(mail_receivers=["ops@example.com", "dev@example.com"], report_delay=0.2, metrics=MetricsRegistry())
+    pipeline._reports = multiprocessing.Queue()
+    try:
+        pipeline._reports.put(["dos-report-1.html"])
+        pipeline._reports.put(["404-report-1.html", "401-403-report-1.html"])
+        time.sleep(0.1)
+        assert pipeline.collect_reports() == []
+        time.sleep(0.3)
+        assert pipeline.collect_reports() == ["dos-report-1.html", "404-report-1.html", "401-403-report-1.html"]
+    finally:
+        pipeline._reports.close()
+
+    assert len(combined) == 1
+    assert [mail["receiver_email"] for mail in sent] == ["ops@example.com", "dev@example.com"]
+    assert sent[0]["attachments"] == [combined[0], "dos-report-1.html", "404-report-1.html", "401-403-report-1.html"]
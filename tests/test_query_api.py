@@ -0,0 +1,60 @@
+import json
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from QueryApi import QueryApi
+
+DOS = {
+    "offending": {"203.0.113.7": {"max_requests_per_min": 250, "total_requests": 900, "total_bytes_sent": 5_000_000, "ua_category": "tool"}},
+    "stats": {"total_logs": 1000},
+}
+
+
+def test_responses_are_cached_per_generation():
+    api = QueryApi()
+    api.publish(dos=DOS, resources=(12.5, 40.0, 1.0, 2.0))
+    body, content_type, etag = api.response("/api/dos")
+    assert content_type == "application/json"
+    payload = json.loads(body)
+    assert payload["generation"] == 1
+    assert payload["dos"]["offending"]["203.0.113.7"]["total_requests"] == 900
+    assert api.response("/api/dos")[0] is body
+
+    api.publish(dos={})
+    body2, _, etag2 = api.response("/api/dos")
+    assert etag2 != etag and json.loads(body2)["dos"] == {}
+    assert len(json.loads(api.response("/api")[0])["resources"]) == 1
+    assert api.response("/api/unknown") is None
+    assert api.response("/elsewhere") is None
+
+
+@pytest.fixture
+def server():
+    api = QueryApi(port=0)
+    host, port = api.start()
+    yield api, f"http://{host}:{port}"
+    api.stop()
+
+
+def test_http_endpoint_honours_etags(server):
+    api, base = server
+    api.publish(dos=DOS)
+
+    with urlopen(f"{base}/dos", timeout=5) as response:
+        etag = response.headers["ETag"]
+        assert response.headers["Content-Type"].startswith("text/html")
+        assert b"203.0.113.7" in response.read()
+
+    with pytest.raises(HTTPError) as error:
+        urlopen(Request(f"{base}/dos", headers={"If-None-Match": etag}), timeout=5)
+    assert error.value.code == 304
+
+    api.publish(dos=DOS)
+    with urlopen(Request(f"{base}/dos/", headers={"If-None-Match": etag}), timeout=5) as response:
+        assert response.status == 200 and response.headers["ETag"] != etag
+
+    with pytest.raises(HTTPError) as error:
+        urlopen(f"{base}/missing", timeout=5)
+    assert error.value.code == 404
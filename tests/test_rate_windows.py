@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from AccessLog import AccessLog
+from LogWindow import LogWindow
+
+START = datetime(2026, 10, 1, 12, 0)
+VISITOR = "192.0.2.10"
+
+
+def page_loads(window: LogWindow, ip: str, starts, assets: int = 60):
+    # the HTML and its assets arrive within about two seconds
+    for start in starts:
+        for i in range(assets):
+            timestamp = START + timedelta(seconds=start + i * 2 // assets)
+            window.append(AccessLog(
+                source_ip=ip,
+                date=timestamp.strftime("%d-%m-%Y %H:%M:%S"),
+                first_line_of_request=f"GET /static/asset-{i}.js HTTP/1.1",
+                http_status_code=200,
+                bytes_received=400,
+                bytes_sent=20000,
+                user_agent="Mozilla/5.0",
+                timestamp=timestamp,
+                ua_category="browser",
+                weight=1,
+            ))
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_page_load_bursts_are_not_flagged_by_default(report_dir, vectorized):
+    from DoSDetector import DoSDetector
+
+    window = LogWindow()
+    page_loads(window, VISITOR, (0, 90, 200))
+
+    detector = DoSDetector(vectorized=vectorized)
+    assert sorted(detector.rate_thresholds) == [60, 300]
+    assert detector.analyze(window)["offending"] == {}
+
+    strict = DoSDetector(vectorized=vectorized, sub_minute_rates=True)
+    assert sorted(strict.rate_thresholds) == [1, 10, 60, 300]
+    offender = strict.analyze(window)["offending"][VISITOR]
+    assert offender["rate_windows_exceeded"] == [1, 10]
+
+
+def test_sustained_flood_is_still_flagged(report_dir):
+    from DoSDetector import DoSDetector
+
+    window = LogWindow()
+    page_loads(window, VISITOR, range(0, 240, 20), assets=40)
+    offender = DoSDetector().analyze(window)["offending"][VISITOR]
+    assert 300 in offender["rate_windows_exceeded"]
@@ -0,0 +1,79 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from AccessLog import AccessLog
+from LogWindow import LogWindow
+from ReportRetention import ReportRetention, summary_paths
+
+pytest.importorskip("bs4")
+
+DAY = 86400
+
+
+def not_found_report() -> str:
+    from DetectHttpNotFoundError import DetectHttpNotFoundError
+
+    window = LogWindow()
+    start = datetime(2026, 10, 1, 12, 0)
+    for i in range(7):
+        timestamp = start + timedelta(seconds=i)
+        window.append(AccessLog(
+            source_ip="192.0.2.1",
+            date=timestamp.strftime("%d-%m-%Y %H:%M:%S"),
+            first_line_of_request=f"GET /missing-{i}.php HTTP/1.1",
+            http_status_code=404,
+            bytes_received=100,
+            bytes_sent=1000,
+            user_agent="curl/8.0",
+            timestamp=timestamp,
+            ua_category="tool",
+            weight=1,
+        ))
+    detector = DetectHttpNotFoundError()
+    return detector.generate_html_report(detector.analyze(window))
+
+
+def age(path, seconds: float, now: float):
+    os.utime(path, (now - seconds, now - seconds))
+
+
+def test_old_reports_are_compacted_into_a_daily_summary(report_dir):
+    now = time.time()
+    report = not_found_report()
+    broken = report_dir / "dos-report-20260101-000000.html"
+    broken.write_text("<html>not a report", encoding="utf-8")
+    fresh = report_dir / "401-403-report-20261001-000000.html"
+    fresh.write_text("<html></html>", encoding="utf-8")
+    age(report, 2 * DAY, now)
+    age(broken, 2 * DAY, now)
+
+    retention = ReportRetention(str(report_dir))
+    assert retention.run(now) == {"compacted": 2, "removed": 0}
+    json_path, html_path = summary_paths(str(report_dir), datetime.fromtimestamp(now - 2 * DAY).strftime("%Y-%m-%d"))
+    assert sorted(os.listdir(report_dir)) == sorted([os.path.basename(json_path), os.path.basename(html_path), fresh.name])
+
+    with open(json_path, encoding="utf-8") as f:
+        summary = json.load(f)
+    assert summary["stats"]["404 Not Found"] == 7
+    assert summary["reports"]["404-report"] == 1 and summary["reports"]["dos-report"] == 1
+    assert summary["unparsed"] == [broken.name]
+    assert os.path.getmtime(json_path) == pytest.approx(now - 2 * DAY, abs=1)
+
+
+def test_limits_remove_the_oldest_files_first(report_dir):
+    now = time.time()
+    paths = []
+    for i in range(5):
+        path = report_dir / f"dos-report-2026100{i}-000000.html"
+        path.write_bytes(b"x" * 1000)
+        age(path, (5 - i) * 3600, now)
+        paths.append(path)
+    age(paths[0], 40 * DAY, now)
+
+    retention = ReportRetention(str(report_dir), compact_after_hours=1000, max_total_bytes=2500)
+    assert retention.enforce_limits(now) == 3
+    assert sorted(os.listdir(report_dir)) == [paths[3].name, paths[4].name]
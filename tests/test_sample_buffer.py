@@ -0,0 +1,24 @@
+from SampleBuffer import NewestSampleBuffer
+
+
+def test_keeps_the_newest_items():
+    buffer = NewestSampleBuffer(3)
+    for key in (5, 1, 9, 3, 7, 9):
+        buffer.offer(key, f"item-{key}")
+    assert buffer.items() == ["item-9", "item-9", "item-7"]
+    assert not buffer.accepts(6)
+    assert buffer.accepts(8)
+
+
+def test_ties_keep_the_earliest_and_shrink_drops_oldest():
+    buffer = NewestSampleBuffer(2)
+    for name in ("first", "second", "third"):
+        buffer.offer(1, name)
+    assert buffer.items() == ["first", "second"]
+
+    buffer = NewestSampleBuffer(5)
+    for key in range(5):
+        buffer.offer(key, key)
+    buffer.shrink(2)
+    assert buffer.items() == [4, 3]
+    assert not NewestSampleBuffer(0).accepts(1)
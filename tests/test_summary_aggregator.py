@@ -0,0 +1,108 @@
+import json
+import os
+import socket
+import time
+
+import pytest
+
+from synthetic import make_lines, reader_for, write_log
+
+OFFENDER = "203.0.113.7"
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def collector(report_dir):
+    from SummaryAggregator import SummaryCollector
+
+    collector = SummaryCollector("tcp://127.0.0.1:0")
+    collector.start()
+    yield collector
+    collector.stop()
+
+
+def test_offender_visible_only_across_agents(tmp_path, collector):
+    from DoSDetector import DoSDetector
+    from SummaryAggregator import SummaryAgent
+
+    host, port = collector._server.server_address
+    agents = []
+    for node in range(3):
+        # about 300 requests per node stay under the 500 total, together they cross it
+        log_dir = os.path.join(str(tmp_path), f"node{node}")
+        write_log(log_dir, make_lines(2000, seed=node + 1, hot_ip=OFFENDER, hot_ip_share=0.15))
+        reader = reader_for(log_dir)
+        assert OFFENDER not in DoSDetector().analyze(reader_for(log_dir).load_logs_for_minutes(15))["offending"]
+        agents.append(SummaryAgent(f"tcp://{host}:{port}", node=f"node{node}", reader=reader))
+
+    try:
+        for agent in agents:
+            agent.run_once()
+        wait_for(lambda: len(collector.analyze()["stats"]["nodes"]) == 3)
+        wait_for(lambda: OFFENDER in collector.analyze()["offending"])
+    finally:
+        for agent in agents:
+            agent.close()
+
+    analysis = collector.analyze()
+    assert analysis["stats"]["nodes"] == ["node0", "node1", "node2"]
+    assert analysis["offending"][OFFENDER]["total_requests"] > 500
+
+
+def test_malformed_messages_are_dropped(collector):
+    host, port = collector._server.server_address
+    minute = int(time.time()) // 60
+    messages = [
+        b"not json",
+        json.dumps([1, 2, 3]).encode(),
+        json.dumps({"node": "bad", "ips": "10.0.0.1"}).encode(),
+        json.dumps({"node": "bad", "ips": {"10.0.0.1": "lots"}}).encode(),
+        json.dumps({"node": "bad", "ips": {"10.0.0.2": {str(minute): ["12", "x"]}}}).encode(),
+        json.dumps({"node": "bad", "ips": {"10.0.0.3": {"soon": [1, 2, 0]}}}).encode(),
+        json.dumps({"node": "bad", "ips": {"10.0.0.4": {str(minute): "12"}}}).encode(),
+        json.dumps({"node": "good", "ips": {"10.0.0.5": {str(minute): ["7", 700, 0]}}}).encode(),
+    ]
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall(b"\n".join(messages) + b"\n")
+    wait_for(lambda: collector.dropped >= 7 and "good" in collector.analyze()["stats"]["nodes"])
+
+    analysis = collector.analyze()
+    assert collector.dropped == 7
+    assert analysis["stats"]["overall_total_requests"] == 7
+
+
+def test_parse_address():
+    from SummaryAggregator import parse_address
+
+    assert parse_address("tcp://10.0.0.1:9000") == (socket.AF_INET, ("10.0.0.1", 9000))
+    assert parse_address(":9000") == (socket.AF_INET, ("127.0.0.1", 9000))
+    assert parse_address("tcp://[::1]:9000") == (socket.AF_INET6, ("::1", 9000))
+    assert parse_address("unix:///run/collector.sock") == (socket.AF_UNIX, "/run/collector.sock")
+    with pytest.raises(ValueError):
+        parse_address("tcp://::1:9000")
+
+
+@pytest.mark.skipif(not socket.has_ipv6, reason="no IPv6 support")
+def test_collector_over_ipv6(report_dir):
+    from SummaryAggregator import SummaryAgent, SummaryCollector
+
+    try:
+        collector = SummaryCollector("tcp://[::1]:0")
+        host, port = collector.start()[:2]
+    except OSError:
+        pytest.skip("IPv6 loopback unavailable")
+    agent = SummaryAgent(f"tcp://[{host}]:{port}", node="v6")
+    minute = int(time.time()) // 60
+    try:
+        agent.send({"10.0.0.1": {minute: [3, 300, 0]}})
+        wait_for(lambda: collector.analyze()["stats"]["nodes"] == ["v6"])
+    finally:
+        agent.close()
+        collector.stop()
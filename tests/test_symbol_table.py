@@ -0,0 +1,32 @@
+from SymbolTable import SymbolTable
+
+
+def test_intern_returns_one_shared_string():
+    table = SymbolTable()
+    first = table.intern("".join(["10.0.", "0.1"]))
+    second = table.intern_bytes(b"10.0.0.1")
+    third = table.intern_bytes(b"10.0.0.1")
+    assert first is second is third
+    assert len(table) == 1
+    assert table.value(table.code("10.0.0.1")) == "10.0.0.1"
+
+
+def test_release_frees_and_reuses_codes():
+    table = SymbolTable()
+    table.intern_bytes(b"Mozilla/5.0")
+    table.intern("Mozilla/5.0")
+    code = table.code("Mozilla/5.0")
+    table.intern("curl/8.0")
+
+    table.release("Mozilla/5.0")
+    assert "Mozilla/5.0" in table
+    table.release("Mozilla/5.0")
+    assert "Mozilla/5.0" not in table
+    assert table.value(code) is None
+
+    assert table.intern_bytes(b"Wget/1.21") == "Wget/1.21"
+    assert table.code("Wget/1.21") == code
+    assert sorted(table.values()) == ["Wget/1.21", "curl/8.0"]
+    # the freed raw key no longer maps to the reused code
+    assert table.intern_bytes(b"Mozilla/5.0") == "Mozilla/5.0"
+    assert table.code("Mozilla/5.0") != code
@@ -0,0 +1,56 @@
+import os
+from datetime import datetime, timedelta
+
+from AccessLogReader import LogReader
+from LogFormats import FORMATS
+from TimeIndex import TimeIndex, minute_of
+from synthetic import make_lines, reader_for, write_log
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+def test_write_log_leaves_the_reader_defaults_alone(tmp_path, index_dir):
+    write_log(str(tmp_path / "logs"), make_lines(10))
+    assert LogReader.INDEX_DIR == str(index_dir)
+    assert reader_for(str(tmp_path / "logs")).INDEX_DIR == str(tmp_path / "logs" / "index")
+
+
+def test_sidecars_live_in_the_index_dir_and_are_pruned(tmp_path):
+    log_dir, index_dir = tmp_path / "logs", tmp_path / "index"
+    path = write_log(str(log_dir), make_lines(600, end=START, minutes=10), date=START)
+    other = write_log(str(log_dir), make_lines(600, end=START - timedelta(days=1), minutes=10), date=START - timedelta(days=1))
+
+    reader = LogReader(str(log_dir), index_dir=str(index_dir))
+    assert len(reader.load_logs_between(START - timedelta(minutes=5), START)) > 0
+    reader.load_logs_between(START - timedelta(days=1, minutes=5), START - timedelta(days=1))
+    assert sorted(os.listdir(log_dir)) == sorted(os.path.basename(p) for p in (path, other))
+    sidecars = sorted(os.listdir(index_dir))
+    assert sidecars == sorted(os.path.basename(TimeIndex.path_for(p, str(index_dir))) for p in (path, other))
+
+    os.unlink(other)
+    assert TimeIndex.prune(str(index_dir)) == 1
+    assert os.listdir(index_dir) == [os.path.basename(TimeIndex.path_for(path, str(index_dir)))]
+
+
+def test_index_is_extended_and_rebuilt_after_rotation(tmp_path):
+    path = str(tmp_path / "access_log")
+    line = '10.0.0.1 "{}" "GET / HTTP/1.1" 200 300 1200 "Mozilla/5.0"\n'
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(line.format((START + timedelta(minutes=m)).strftime("%d-%m-%Y %H:%M:%S")) for m in range(5))
+
+    index = TimeIndex.open(path, str(tmp_path / "index"))
+    index.build(FORMATS["custom"])
+    assert index.minutes == [minute_of(START) + m for m in range(5)]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line.format((START + timedelta(minutes=9)).strftime("%d-%m-%Y %H:%M:%S")))
+    index.build(FORMATS["custom"])
+    assert index.minutes[-1] == minute_of(START) + 9
+    assert index.offset_for(minute_of(START) + 7) == index.offsets[-1]
+
+    # a new file under the same name starts over
+    os.unlink(path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(line.format((START + timedelta(hours=1)).strftime("%d-%m-%Y %H:%M:%S")))
+    index.build(FORMATS["custom"])
+    assert index.minutes == [minute_of(START) + 60]
+    assert index.offsets == [0]
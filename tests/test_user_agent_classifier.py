@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from AccessLogReader import LogReader
+from UserAgentClassifier import AhoCorasick, UserAgentClassifier, load_signatures
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick([("he", "a"), ("she", "b"), ("hers", "c"), ("his", "d")])
+    assert automaton.search("ushers") == ["b", "a", "c"]
+    assert automaton.search("this") == ["d"]
+    assert automaton.search("nothing") == []
+
+
+def test_default_categories():
+    classifier = UserAgentClassifier(cache_size=2)
+    assert classifier.classify("Mozilla/5.0 (compatible; Googlebot/2.1)") == "crawler"
+    assert classifier.classify("sqlmap/1.7 (curl/8.0)") == "scanner"
+    assert classifier.classify("curl/8.0") == "tool"
+    assert classifier.classify("Mozilla/5.0 (X11; Linux x86_64) Firefox/118.0") == "browser"
+    assert classifier.classify("-") == "unknown"
+    assert len(classifier._cache) == 2
+
+
+def test_signature_file_reaches_the_reader(tmp_path):
+    path = tmp_path / "ua-signatures.txt"
+    path.write_text("# custom list\nmonitor: InternalProbe\n\ncrawler: ExampleBot\nbroken line\n", encoding="utf-8")
+    assert load_signatures(str(path)) == {"monitor": ["InternalProbe"], "crawler": ["ExampleBot"]}
+
+    reader = LogReader(index_dir=str(tmp_path / "index"), ua_signatures=str(path))
+    line = '192.0.2.1 "{}" "GET / HTTP/1.1" 200 300 1200 "{}"'
+    now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    assert reader.parse_log_line(line.format(now, "internalprobe/1.0")).ua_category == "monitor"
+    assert reader.parse_log_line(line.format(now, "Googlebot/2.1")).ua_category == "browser"
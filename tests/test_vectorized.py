@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from synthetic import reader_for, write_log
+from bench_vectorized import HOT_IP, HOT_PREFIX, differences, make_attack_lines
+
+
+@pytest.fixture(scope="module")
+def log_dir(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("logs"))
+    write_log(directory, make_attack_lines(30000))
+    return directory
+
+
+@pytest.mark.parametrize("sample_rate", [1.0, 0.3])
+def test_numpy_matches_python(log_dir, report_dir, sample_rate):
+    from DoSDetector import DoSDetector
+
+    window = reader_for(log_dir).load_logs_for_minutes(15, sample_rate=sample_rate)
+    python = DoSDetector(vectorized=False).analyze(window)
+    vectorized = DoSDetector(vectorized=True).analyze(window)
+
+    assert HOT_IP in python["offending"]
+    assert f"{HOT_PREFIX}.0/24" in python["offending_subnets"]
+    offender = python["offending"][HOT_IP]
+    assert offender["sample_lines"] and offender["top_minute_buckets"] and offender["rate_peaks"]
+    assert differences(python, vectorized) == []
+
+
+def test_differences_reports_mismatches():
+    assert differences({"a": [1, 2]}, {"a": [1, 3]}) == ["/a: [1, 2] != [1, 3]"]
+    assert differences({"a": 1, "b": 2}, {"b": 2, "a": 1})
+
+
+def test_python_path_is_the_default(log_dir, report_dir, monkeypatch):
+    from DoSDetector import DoSDetector
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the numpy path runs only when requested")
+
+    monkeypatch.setattr(DoSDetector, "summarize_window", fail)
+    window = reader_for(log_dir).load_logs_for_minutes(15)
+    assert HOT_IP in DoSDetector().analyze(window)["offending"]